@@ -16,6 +16,20 @@ from app.api.v1.endpoints.auth import get_current_user
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Document type enum values -> display names used by the queue page
+_DOC_TYPE_DISPLAY_NAMES = {
+    'medical_history': 'Medical History',
+    'serology_report': 'Serology Report',
+    'lab_results': 'Laboratory Results',
+    'recovery_cultures': 'Recovery Cultures',
+    'consent_form': 'Consent Form',
+    'death_certificate': 'Death Certificate',
+    'other': 'Other'
+}
+# Document statuses shown as "processing" on the queue page
+_IN_PROGRESS_STATUS_VALUES = frozenset(["processing", "analyzing", "reviewing"])
+_IN_PROGRESS_STATUSES = frozenset([DocumentStatus.PROCESSING, DocumentStatus.ANALYZING, DocumentStatus.REVIEWING])
+
 def component_name_to_extraction_key(component_name: str) -> str:
     """
     Convert component name to extraction key format.
@@ -170,21 +184,11 @@ async def get_queue_details(
         documents = db.query(Document).filter(Document.donor_id == donor.id).all()
         
         # Map documents by type - convert enum values to display names
-        doc_type_mapping = {
-            'medical_history': 'Medical History',
-            'serology_report': 'Serology Report',
-            'lab_results': 'Laboratory Results',
-            'recovery_cultures': 'Recovery Cultures',
-            'consent_form': 'Consent Form',
-            'death_certificate': 'Death Certificate',
-            'other': 'Other'
-        }
-        
         doc_by_type: Dict[str, Document] = {}
         for doc in documents:
             if doc.document_type:
                 doc_type_enum = doc.document_type.value if hasattr(doc.document_type, 'value') else str(doc.document_type)
-                doc_type_display = doc_type_mapping.get(doc_type_enum, doc_type_enum.replace('_', ' ').title())
+                doc_type_display = _DOC_TYPE_DISPLAY_NAMES.get(doc_type_enum, doc_type_enum.replace('_', ' ').title())
                 doc_by_type[doc_type_display] = doc
         
         # Build required documents list
@@ -198,7 +202,7 @@ async def get_queue_details(
                     "name": req_type,
                     "type": req_type.lower().replace(' ', '_'),
                     "label": req_type,
-                    "status": "processing" if status in ["processing", "analyzing", "reviewing"] else "completed" if status == "completed" else "missing",
+                    "status": "processing" if status in _IN_PROGRESS_STATUS_VALUES else "completed" if status == "completed" else "missing",
                     "isRequired": True,
                     "uploadDate": doc.created_at.isoformat() if doc.created_at else None,
                     "reviewedBy": None,
@@ -224,7 +228,7 @@ async def get_queue_details(
             processing_status = "pending"
         else:
             all_completed = all(doc.status == DocumentStatus.COMPLETED for doc in documents)
-            has_processing = any(doc.status in [DocumentStatus.PROCESSING, DocumentStatus.ANALYZING, DocumentStatus.REVIEWING] for doc in documents)
+            has_processing = any(doc.status in _IN_PROGRESS_STATUSES for doc in documents)
             has_failed = any(doc.status == DocumentStatus.FAILED for doc in documents)
             has_rejected = any(doc.status == DocumentStatus.REJECTED for doc in documents)
             
@@ -311,7 +315,7 @@ async def get_queue_details(
                 status = matching_doc.status.value if hasattr(matching_doc.status, 'value') else str(matching_doc.status)
                 if status == "completed":
                     req_doc["status"] = "completed"
-                elif status in ["processing", "analyzing", "reviewing"]:
+                elif status in _IN_PROGRESS_STATUS_VALUES:
                     req_doc["status"] = "processing"
                 else:
                     req_doc["status"] = "missing"
@@ -82,6 +82,15 @@ class Settings(BaseSettings):
     # Summary Deduplication
     ENABLE_SUMMARY_DEDUPLICATION: bool = True  # Enable LLM-based summary deduplication
     
+    # LLM Calls
+    LLM_CACHE_ENABLED: bool = True  # Reuse responses for identical prompts (temperature 0 calls only)
+    LLM_CACHE_MAX_ENTRIES: int = 512  # max cached responses held in memory
+    LLM_CACHE_TTL_SECONDS: int = 3600  # seconds before a cached response expires
+    LLM_MAX_CONCURRENT_CALLS: int = 4  # max in-flight LLM requests per process (shared by all fan-out)
+    
+    # Embeddings
+    EMBEDDING_CACHE_DIR: str = ""  # directory for FAISS indexes cached by PDF content hash, chunk embeddings and OCR page text (empty = disabled)
+    
     @field_validator('DEBUG', mode='before')
     @classmethod
     def parse_bool(cls, v):
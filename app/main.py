@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
+import asyncio
 import logging
 import time
 import uuid
@@ -102,7 +103,22 @@ async def startup_event():
     except Exception as e:
         logger.error(f"Error resetting stuck documents: {e}")
         # Don't raise - continue with startup even if reset fails
-    
+
+    # Preload the static extraction configs (cached per process) so the first
+    # document doesn't pay for reading and parsing them. The loaders read files,
+    # so run them in an executor instead of blocking the event loop
+    try:
+        from app.services.document_processing import load_prompt_components
+        from app.services.lab_test_extraction import load_required_tests_config
+        from app.services.criteria_extraction import load_acceptance_criteria_config
+        loop = asyncio.get_event_loop()
+        for load_config in (load_prompt_components, load_required_tests_config, load_acceptance_criteria_config):
+            await loop.run_in_executor(None, load_config)
+        logger.info("Extraction configs preloaded")
+    except Exception as e:
+        logger.warning(f"Could not preload extraction configs: {e}")
+        # Don't raise - configs are loaded on first use anyway
+
     # Start background worker
     try:
         await start_worker()
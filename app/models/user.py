@@ -8,6 +8,15 @@ class UserRole(str, enum.Enum):
     DOC_UPLOADER = "doc_uploader"
     MEDICAL_DIRECTOR = "medical_director"
 
+# Common variations of stored role values -> enum values
+_ROLE_ALIASES = {
+    'admin': UserRole.ADMIN,
+    'doc_uploader': UserRole.DOC_UPLOADER,
+    'doc uploader': UserRole.DOC_UPLOADER,
+    'medical_director': UserRole.MEDICAL_DIRECTOR,
+    'medical director': UserRole.MEDICAL_DIRECTOR,
+}
+
 class UserRoleType(TypeDecorator):
     """
     Custom type decorator that handles case-insensitive conversion for UserRole enum.
@@ -35,22 +44,14 @@ class UserRoleType(TypeDecorator):
         # Convert to string and normalize to lowercase
         value_str = str(value).lower()
         
-        # Map common variations to correct enum values
-        role_mapping = {
-            'admin': UserRole.ADMIN,
-            'doc_uploader': UserRole.DOC_UPLOADER,
-            'doc uploader': UserRole.DOC_UPLOADER,
-            'medical_director': UserRole.MEDICAL_DIRECTOR,
-            'medical director': UserRole.MEDICAL_DIRECTOR,
-        }
-        
         # Try exact match first
         try:
             return UserRole(value_str)
         except ValueError:
             # Try mapping
-            if value_str in role_mapping:
-                return role_mapping[value_str]
+            # Map common variations to correct enum values
+            if value_str in _ROLE_ALIASES:
+                return _ROLE_ALIASES[value_str]
             # If still not found, log warning and return ADMIN as fallback
             import logging
             logger = logging.getLogger(__name__)
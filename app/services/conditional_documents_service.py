@@ -241,7 +241,7 @@ def determine_conditional_documents_from_criteria(
                     doc_data['source_document'] = source_docs[0].original_filename
                     # Extract pages from document chunks if available
                     from app.models.document_chunk import DocumentChunk
-                    chunks = db.query(DocumentChunk).filter(
+                    chunks = db.query(DocumentChunk.page_number).filter(
                         DocumentChunk.document_id == source_docs[0].id,
                         DocumentChunk.page_number.isnot(None)
                     ).limit(5).all()
@@ -2,8 +2,6 @@
 Criteria evaluation engine.
 Evaluates extracted data against acceptance criteria rules and generates eligibility decisions.
 """
-import json
-import os
 import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
@@ -12,6 +10,8 @@ from app.models.criteria_evaluation import CriteriaEvaluation, EvaluationResult,
 from app.models.donor_eligibility import DonorEligibility, EligibilityStatus, TissueType
 from app.models.laboratory_result import LaboratoryResult, TestType
 from app.models.donor import Donor
+# Shares the cached config parsed for extraction instead of reading the file again
+from app.services.criteria_extraction import load_acceptance_criteria_config
 from app.services.criteria_evaluator.rules import (
     evaluate_age_criteria, evaluate_cancer_criteria, evaluate_hiv_criteria,
     evaluate_hiv_aids_criteria, evaluate_hepatitis_criteria, evaluate_sepsis_criteria,
@@ -50,15 +50,88 @@ from app.services.criteria_evaluator.rules import (
 
 logger = logging.getLogger(__name__)
 
-# Get config directory
-_CONFIG_DIR = os.path.join(os.path.dirname(__file__), 'processing', 'config')
 
-
-def load_acceptance_criteria_config() -> Dict[str, Any]:
-    """Load acceptance criteria configuration."""
-    criteria_path = os.path.join(_CONFIG_DIR, 'acceptance_criteria.json')
-    with open(criteria_path, 'r') as f:
-        return json.load(f)
+# Dispatch table from a criterion's evaluation_logic to its rule function
+_EVAL_FUNCTION_MAP = {
+    'age_criteria': evaluate_age_criteria,
+    'cancer_criteria': evaluate_cancer_criteria,
+    'hiv_criteria': evaluate_hiv_criteria,
+    'hiv_aids_criteria': evaluate_hiv_aids_criteria,
+    'hepatitis_criteria': evaluate_hepatitis_criteria,
+    'sepsis_criteria': evaluate_sepsis_criteria,
+    'septicemia_criteria': evaluate_septicemia_criteria,
+    'tuberculosis_criteria': evaluate_tuberculosis_criteria,
+    'high_risk_behavior_criteria': evaluate_high_risk_behavior_criteria,
+    'iv_drug_use_criteria': evaluate_iv_drug_use_criteria,
+    'incarceration_criteria': evaluate_incarceration_criteria,
+    'syphilis_criteria': evaluate_syphilis_criteria,
+    'htlv_criteria': evaluate_htlv_criteria,
+    'west_nile_virus_criteria': evaluate_west_nile_virus_criteria,
+    'infection_criteria': evaluate_infection_criteria,
+    'cooling_criteria': evaluate_cooling_criteria,
+    'autopsy_criteria': evaluate_autopsy_criteria,
+    'toxicology_criteria': evaluate_toxicology_criteria,
+    'autoimmune_criteria': evaluate_autoimmune_criteria,
+    'dementia_criteria': evaluate_dementia_criteria,
+    'bleeding_disorder_criteria': evaluate_bleeding_disorder_criteria,
+    'bone_disease_criteria': evaluate_bone_disease_criteria,
+    'bowel_perforation_criteria': evaluate_bowel_perforation_criteria,
+    'chagas_disease_criteria': evaluate_chagas_disease_criteria,
+    'chicken_pox_criteria': evaluate_chicken_pox_criteria,
+    'contamination_criteria': evaluate_contamination_criteria,
+    'covid_criteria': evaluate_covid_criteria,
+    'creutzfeldt_jakob_disease_criteria': evaluate_creutzfeldt_jakob_disease_criteria,
+    'delirium_criteria': evaluate_delirium_criteria,
+    'diabetes_criteria': evaluate_diabetes_criteria,
+    'drowning_criteria': evaluate_drowning_criteria,
+    'encephalitis_criteria': evaluate_encephalitis_criteria,
+    'fracture_criteria': evaluate_fracture_criteria,
+    'gout_criteria': evaluate_gout_criteria,
+    'growth_hormone_criteria': evaluate_growth_hormone_criteria,
+    'guillain_barre_criteria': evaluate_guillain_barre_criteria,
+    'hemodialysis_criteria': evaluate_hemodialysis_criteria,
+    'herpes_ii_criteria': evaluate_herpes_ii_criteria,
+    'high_risk_non_iv_drug_use_criteria': evaluate_high_risk_non_iv_drug_use_criteria,
+    'hiv_group_o_criteria': evaluate_hiv_group_o_criteria,
+    'hiv_hepatitis_criteria': evaluate_hiv_hepatitis_criteria,
+    'hiv_hepatitis_communicable_disease_criteria': evaluate_hiv_hepatitis_communicable_disease_criteria,
+    'immunizations_criteria': evaluate_immunizations_criteria,
+    'jaundice_criteria': evaluate_jaundice_criteria,
+    'leprosy_criteria': evaluate_leprosy_criteria,
+    'liver_disease_criteria': evaluate_liver_disease_criteria,
+    'long_term_illness_criteria': evaluate_long_term_illness_criteria,
+    'long_term_steroid_therapy_criteria': evaluate_long_term_steroid_therapy_criteria,
+    'long_term_infection_criteria': evaluate_long_term_infection_criteria,
+    'lou_gehrig_disease_criteria': evaluate_lou_gehrig_disease_criteria,
+    'malaria_criteria': evaluate_malaria_criteria,
+    'measles_criteria': evaluate_measles_criteria,
+    'meningitis_criteria': evaluate_meningitis_criteria,
+    'multiple_sclerosis_criteria': evaluate_multiple_sclerosis_criteria,
+    'mumps_criteria': evaluate_mumps_criteria,
+    'muscular_dystrophy_criteria': evaluate_muscular_dystrophy_criteria,
+    'needle_stick_criteria': evaluate_needle_stick_criteria,
+    'non_tumor_related_shunts_criteria': evaluate_non_tumor_related_shunts_criteria,
+    'osteomyelitis_criteria': evaluate_osteomyelitis_criteria,
+    'perianal_condyloma_criteria': evaluate_perianal_condyloma_criteria,
+    'genitalia_piercing_criteria': evaluate_genitalia_piercing_criteria,
+    'piercing_acupuncture_criteria': evaluate_piercing_acupuncture_criteria,
+    'prosthetic_implants_criteria': evaluate_prosthetic_implants_criteria,
+    'rabies_criteria': evaluate_rabies_criteria,
+    'refused_blood_donor_criteria': evaluate_refused_blood_donor_criteria,
+    'reyes_syndrome_criteria': evaluate_reyes_syndrome_criteria,
+    'rheumatic_fever_criteria': evaluate_rheumatic_fever_criteria,
+    'rubella_criteria': evaluate_rubella_criteria,
+    'std_sti_criteria': evaluate_std_sti_criteria,
+    'smallpox_criteria': evaluate_smallpox_criteria,
+    'sirs_criteria': evaluate_sirs_criteria,
+    'tattoo_criteria': evaluate_tattoo_criteria,
+    'transplant_criteria': evaluate_transplant_criteria,
+    'trauma_criteria': evaluate_trauma_criteria,
+    'travel_criteria': evaluate_travel_criteria,
+    'aatb_new_tb_criteria': evaluate_aatb_new_tb_criteria,
+    'typhus_criteria': evaluate_typhus_criteria,
+    'us_military_criteria': evaluate_us_military_criteria
+}
 
 
 class CriteriaEvaluator:
@@ -186,90 +259,8 @@ class CriteriaEvaluator:
             evaluation_logic = criterion_info.get('evaluation_logic', '')
             
             # Get evaluation function from rules module
-            eval_function_name = f"evaluate_{evaluation_logic}"
-            eval_function_map = {
-                'age_criteria': evaluate_age_criteria,
-                'cancer_criteria': evaluate_cancer_criteria,
-                'hiv_criteria': evaluate_hiv_criteria,
-                'hiv_aids_criteria': evaluate_hiv_aids_criteria,
-                'hepatitis_criteria': evaluate_hepatitis_criteria,
-                'sepsis_criteria': evaluate_sepsis_criteria,
-                'septicemia_criteria': evaluate_septicemia_criteria,
-                'tuberculosis_criteria': evaluate_tuberculosis_criteria,
-                'high_risk_behavior_criteria': evaluate_high_risk_behavior_criteria,
-                'iv_drug_use_criteria': evaluate_iv_drug_use_criteria,
-                'incarceration_criteria': evaluate_incarceration_criteria,
-                'syphilis_criteria': evaluate_syphilis_criteria,
-                'htlv_criteria': evaluate_htlv_criteria,
-                'west_nile_virus_criteria': evaluate_west_nile_virus_criteria,
-                'infection_criteria': evaluate_infection_criteria,
-                'cooling_criteria': evaluate_cooling_criteria,
-                'autopsy_criteria': evaluate_autopsy_criteria,
-                'toxicology_criteria': evaluate_toxicology_criteria,
-                'autoimmune_criteria': evaluate_autoimmune_criteria,
-                'dementia_criteria': evaluate_dementia_criteria,
-                'bleeding_disorder_criteria': evaluate_bleeding_disorder_criteria,
-                'bone_disease_criteria': evaluate_bone_disease_criteria,
-                'bowel_perforation_criteria': evaluate_bowel_perforation_criteria,
-                'chagas_disease_criteria': evaluate_chagas_disease_criteria,
-                'chicken_pox_criteria': evaluate_chicken_pox_criteria,
-                'contamination_criteria': evaluate_contamination_criteria,
-                'covid_criteria': evaluate_covid_criteria,
-                'creutzfeldt_jakob_disease_criteria': evaluate_creutzfeldt_jakob_disease_criteria,
-                'delirium_criteria': evaluate_delirium_criteria,
-                'diabetes_criteria': evaluate_diabetes_criteria,
-                'drowning_criteria': evaluate_drowning_criteria,
-                'encephalitis_criteria': evaluate_encephalitis_criteria,
-                'fracture_criteria': evaluate_fracture_criteria,
-                'gout_criteria': evaluate_gout_criteria,
-                'growth_hormone_criteria': evaluate_growth_hormone_criteria,
-                'guillain_barre_criteria': evaluate_guillain_barre_criteria,
-                'hemodialysis_criteria': evaluate_hemodialysis_criteria,
-                'herpes_ii_criteria': evaluate_herpes_ii_criteria,
-                'high_risk_non_iv_drug_use_criteria': evaluate_high_risk_non_iv_drug_use_criteria,
-                'hiv_group_o_criteria': evaluate_hiv_group_o_criteria,
-                'hiv_hepatitis_criteria': evaluate_hiv_hepatitis_criteria,
-                'hiv_hepatitis_communicable_disease_criteria': evaluate_hiv_hepatitis_communicable_disease_criteria,
-                'immunizations_criteria': evaluate_immunizations_criteria,
-                'jaundice_criteria': evaluate_jaundice_criteria,
-                'leprosy_criteria': evaluate_leprosy_criteria,
-                'liver_disease_criteria': evaluate_liver_disease_criteria,
-                'long_term_illness_criteria': evaluate_long_term_illness_criteria,
-                'long_term_steroid_therapy_criteria': evaluate_long_term_steroid_therapy_criteria,
-                'long_term_infection_criteria': evaluate_long_term_infection_criteria,
-                'lou_gehrig_disease_criteria': evaluate_lou_gehrig_disease_criteria,
-                'malaria_criteria': evaluate_malaria_criteria,
-                'measles_criteria': evaluate_measles_criteria,
-                'meningitis_criteria': evaluate_meningitis_criteria,
-                'multiple_sclerosis_criteria': evaluate_multiple_sclerosis_criteria,
-                'mumps_criteria': evaluate_mumps_criteria,
-                'muscular_dystrophy_criteria': evaluate_muscular_dystrophy_criteria,
-                'needle_stick_criteria': evaluate_needle_stick_criteria,
-                'non_tumor_related_shunts_criteria': evaluate_non_tumor_related_shunts_criteria,
-                'osteomyelitis_criteria': evaluate_osteomyelitis_criteria,
-                'perianal_condyloma_criteria': evaluate_perianal_condyloma_criteria,
-                'genitalia_piercing_criteria': evaluate_genitalia_piercing_criteria,
-                'piercing_acupuncture_criteria': evaluate_piercing_acupuncture_criteria,
-                'prosthetic_implants_criteria': evaluate_prosthetic_implants_criteria,
-                'rabies_criteria': evaluate_rabies_criteria,
-                'refused_blood_donor_criteria': evaluate_refused_blood_donor_criteria,
-                'reyes_syndrome_criteria': evaluate_reyes_syndrome_criteria,
-                'rheumatic_fever_criteria': evaluate_rheumatic_fever_criteria,
-                'rubella_criteria': evaluate_rubella_criteria,
-                'std_sti_criteria': evaluate_std_sti_criteria,
-                'smallpox_criteria': evaluate_smallpox_criteria,
-                'sirs_criteria': evaluate_sirs_criteria,
-                'tattoo_criteria': evaluate_tattoo_criteria,
-                'transplant_criteria': evaluate_transplant_criteria,
-                'trauma_criteria': evaluate_trauma_criteria,
-                'travel_criteria': evaluate_travel_criteria,
-                'aatb_new_tb_criteria': evaluate_aatb_new_tb_criteria,
-                'typhus_criteria': evaluate_typhus_criteria,
-                'us_military_criteria': evaluate_us_military_criteria
-            }
-            
-            if evaluation_logic in eval_function_map:
-                eval_function = eval_function_map[evaluation_logic]
+            eval_function = _EVAL_FUNCTION_MAP.get(evaluation_logic)
+            if eval_function is not None:
                 return eval_function(extracted_data, lab_results, donor_info, criterion_info)
             else:
                 logger.warning(f"Evaluation function for {evaluation_logic} not found, using default")
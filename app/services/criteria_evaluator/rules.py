@@ -12,6 +12,43 @@ from app.models.laboratory_result import LaboratoryResult, TestType
 logger = logging.getLogger(__name__)
 
 
+# Explicit negative indicators take precedence over positive ones
+_NEGATIVE_RESULT_PATTERN = re.compile(r'\bnon[- ]?reactive\b|\bnot[- ]?detected\b|\bnegative\b|\bneg\b')
+# "reactive"/"detected" only count once the negated forms above are ruled out
+_POSITIVE_RESULT_PATTERN = re.compile(r'\bpositive\b|\breactive\b|\bdetected\b')
+
+# Raw result string -> classification. Lab results repeat the same handful of
+# strings ("Non-Reactive", "Negative", ...) across tests and donors, so most
+# lookups skip normalization and regex matching entirely.
+_RESULT_CLASSIFICATION_CACHE: Dict[str, bool] = {}
+_RESULT_CLASSIFICATION_CACHE_MAX = 512
+
+# String values treated as an explicit "yes"
+_TRUE_STRINGS = frozenset(['yes', 'true', '1'])
+
+# Condition classification terms, built once instead of on every evaluation.
+# Tuples are matched as substrings of the extracted type; frozensets by exact value.
+_UNACCEPTABLE_CANCERS = (
+    'breast', 'colon', 'melanoma', 'hematologic', 'unknown primary',
+    'metastasizing cns', 'glioblastoma', 'astrocytoma', 'medulloblastoma'
+)
+_ACCEPTABLE_BRAIN_NEOPLASMS = (
+    'pituitary adenoma', 'optic nerve glioma', 'hemangioblastoma',
+    'schwannoma', 'neurofibroma', 'hamartoma', 'meningioma',
+    'colloid cyst', 'dermoid cyst', 'craniopharyngioma', 'lipoma'
+)
+_HEPATITIS_TEST_TERMS = ('hepatitis', 'hbsag', 'hbv', 'hcv', 'anti-hbc', 'anti-hcv')
+_LIMITED_AUTOPSY_TISSUE_TYPES = frozenset(['en_bloc_oa_grafts'])
+_UNACCEPTABLE_AUTOIMMUNE = ('polyarteritis nodosa', 'sarcoidosis', 'progressive systemic sclerosis', 'scleroderma')
+_MD_DISCRETION_AUTOIMMUNE = (
+    'rheumatoid arthritis', 'systemic lupus erythematosus', 'lupus', 'sle',
+    'polymyositis', 'sjogren', 'ankylosing spondylitis', 'psoriatic arthritis', 'reiters'
+)
+_UNACCEPTABLE_BONE_DISEASES = ('osteomalacia', 'metabolic_bone_disease', 'osteoporosis')
+_ACCEPTABLE_BONE_DISEASES = ('osteoarthritis', 'overuse')
+_RECENT_TREATMENT_STD_STI_TYPES = frozenset(['syphilis', 'gonorrhea'])
+
+
 def is_positive_test_result(result: str) -> bool:
     """
     Check if a test result indicates a positive/reactive result.
@@ -26,33 +63,21 @@ def is_positive_test_result(result: str) -> bool:
     if not result:
         return False
     
-    result_lower = result.lower().strip()
-    
-    # First check for explicit negative indicators (these take precedence)
-    negative_patterns = [
-        r'\bnon[- ]?reactive\b',
-        r'\bnot detected\b',
-        r'\bnot[- ]?detected\b',
-        r'\bnegative\b',
-        r'\bneg\b',
-    ]
-    
-    for pattern in negative_patterns:
-        if re.search(pattern, result_lower):
-            return False
+    cached = _RESULT_CLASSIFICATION_CACHE.get(result)
+    if cached is not None:
+        return cached
     
-    # Then check for positive indicators (only if not negative)
-    positive_patterns = [
-        r'\bpositive\b',
-        r'\breactive\b',  # Only matches if not preceded by "non"
-        r'\bdetected\b',  # Only matches if not preceded by "not"
-    ]
+    result_lower = result.lower().strip()
     
-    for pattern in positive_patterns:
-        if re.search(pattern, result_lower):
-            return True
+    if _NEGATIVE_RESULT_PATTERN.search(result_lower):
+        is_positive = False
+    else:
+        is_positive = bool(_POSITIVE_RESULT_PATTERN.search(result_lower))
     
-    return False
+    if len(_RESULT_CLASSIFICATION_CACHE) >= _RESULT_CLASSIFICATION_CACHE_MAX:
+        _RESULT_CLASSIFICATION_CACHE.clear()
+    _RESULT_CLASSIFICATION_CACHE[result] = is_positive
+    return is_positive
 
 
 def is_explicitly_true(value: Any) -> bool:
@@ -62,7 +87,7 @@ def is_explicitly_true(value: Any) -> bool:
     if isinstance(value, bool):
         return value
     if isinstance(value, str):
-        return value.lower().strip() in ['yes', 'true', '1']
+        return value.lower().strip() in _TRUE_STRINGS
     return bool(value)
 
 
@@ -144,12 +169,7 @@ def evaluate_cancer_criteria(
     time_since_death = extracted_data.get('time_since_death')
     
     # Check for unacceptable cancers (regardless of time)
-    unacceptable_cancers = [
-        'breast', 'colon', 'melanoma', 'hematologic', 'unknown primary',
-        'metastasizing cns', 'glioblastoma', 'astrocytoma', 'medulloblastoma'
-    ]
-    
-    if any(uc in cancer_type for uc in unacceptable_cancers):
+    if any(uc in cancer_type for uc in _UNACCEPTABLE_CANCERS):
         return {
             'result': EvaluationResult.UNACCEPTABLE,
             'reasoning': f"History of {cancer_type} - unacceptable regardless of time"
@@ -169,13 +189,7 @@ def evaluate_cancer_criteria(
             pass
     
     # Check for acceptable benign brain neoplasms
-    acceptable_neoplasms = [
-        'pituitary adenoma', 'optic nerve glioma', 'hemangioblastoma',
-        'schwannoma', 'neurofibroma', 'hamartoma', 'meningioma',
-        'colloid cyst', 'dermoid cyst', 'craniopharyngioma', 'lipoma'
-    ]
-    
-    if any(an in cancer_type for an in acceptable_neoplasms) and 'benign' in str(extracted_data.get('benign', '')).lower():
+    if any(an in cancer_type for an in _ACCEPTABLE_BRAIN_NEOPLASMS) and 'benign' in str(extracted_data.get('benign', '')).lower():
         return {
             'result': EvaluationResult.ACCEPTABLE,
             'reasoning': f"Benign brain neoplasm: {cancer_type}"
@@ -302,7 +316,7 @@ def evaluate_hepatitis_criteria(
     # Check lab results for hepatitis tests
     hep_tests = [lr for lr in lab_results 
                  if lr.test_type == TestType.SEROLOGY and 
-                 any(hep in lr.test_name.lower() for hep in ['hepatitis', 'hbsag', 'hbv', 'hcv', 'anti-hbc', 'anti-hcv'])]
+                 any(hep in lr.test_name.lower() for hep in _HEPATITIS_TEST_TERMS)]
     
     # Check for positive/reactive results
     for test in hep_tests:
@@ -807,7 +821,7 @@ def evaluate_autopsy_criteria(
         }
     
     # For musculoskeletal: en bloc and OA grafts require limited autopsy
-    if tissue_type in ['en_bloc_oa_grafts']:
+    if tissue_type in _LIMITED_AUTOPSY_TISSUE_TYPES:
         if autopsy_performed and 'limited' not in autopsy_type.lower():
             return {
                 'result': EvaluationResult.MD_DISCRETION,
@@ -860,20 +874,14 @@ def evaluate_autoimmune_criteria(
     tissue_type = extracted_data.get('tissue_type', '')
     
     # Unacceptable for both
-    unacceptable_autoimmune = ['polyarteritis nodosa', 'sarcoidosis', 'progressive systemic sclerosis', 'scleroderma']
-    if any(ua in autoimmune_type for ua in unacceptable_autoimmune):
+    if any(ua in autoimmune_type for ua in _UNACCEPTABLE_AUTOIMMUNE):
         return {
             'result': EvaluationResult.UNACCEPTABLE,
             'reasoning': f'History of {autoimmune_type} - unacceptable for both tissue types'
         }
     
     # MD discretion for skin if no skin manifestations
-    md_discretion_autoimmune = [
-        'rheumatoid arthritis', 'systemic lupus erythematosus', 'lupus', 'sle',
-        'polymyositis', 'sjogren', 'ankylosing spondylitis', 'psoriatic arthritis', 'reiters'
-    ]
-    
-    if any(md in autoimmune_type for md in md_discretion_autoimmune):
+    if any(md in autoimmune_type for md in _MD_DISCRETION_AUTOIMMUNE):
         if tissue_type == 'skin' and not skin_manifestations:
             return {
                 'result': EvaluationResult.MD_DISCRETION,
@@ -952,17 +960,14 @@ def evaluate_bone_disease_criteria(
     bone_disease_type = (extracted_data.get('bone_disease_type') or '').lower()
     tissue_type = extracted_data.get('tissue_type', '')
     
-    unacceptable_bone_diseases = ['osteomalacia', 'metabolic_bone_disease', 'osteoporosis']
-    acceptable_bone_diseases = ['osteoarthritis', 'overuse']
-    
-    if any(ubd in bone_disease_type for ubd in unacceptable_bone_diseases):
+    if any(ubd in bone_disease_type for ubd in _UNACCEPTABLE_BONE_DISEASES):
         if tissue_type == 'musculoskeletal':
             return {
                 'result': EvaluationResult.UNACCEPTABLE,
                 'reasoning': f'History of {bone_disease_type} - unacceptable for musculoskeletal'
             }
     
-    if any(abd in bone_disease_type for abd in acceptable_bone_diseases):
+    if any(abd in bone_disease_type for abd in _ACCEPTABLE_BONE_DISEASES):
         return {
             'result': EvaluationResult.ACCEPTABLE,
             'reasoning': f'Stiff and sore joints caused by {bone_disease_type} - acceptable'
@@ -2142,7 +2147,7 @@ def evaluate_std_sti_criteria(
     std_sti_history_more_than_12_months = is_explicitly_true(extracted_data.get('std_sti_history_more_than_12_months'))
     sexual_relations_active_std_sti_12_months = is_explicitly_true(extracted_data.get('sexual_relations_active_std_sti_12_months'))
     
-    if (std_sti_type in ['syphilis', 'gonorrhea']) and treated_within_12_months:
+    if (std_sti_type in _RECENT_TREATMENT_STD_STI_TYPES) and treated_within_12_months:
         return {
             'result': EvaluationResult.UNACCEPTABLE,
             'reasoning': 'Donors diagnosed with or treated for syphilis or gonorrhea within preceding 12 months'
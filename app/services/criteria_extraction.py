@@ -5,14 +5,20 @@ Extracts only data points needed for each criterion in the acceptance criteria t
 import json
 import os
 import logging
-from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, Any, Iterator, List, Optional, Tuple
 from sqlalchemy.orm import Session
 from app.models.criteria_evaluation import CriteriaEvaluation, EvaluationResult, TissueType
-from app.services.processing.utils.llm_wrapper import call_llm_with_retry, LLMCallError
+from app.services.processing.utils.llm_wrapper import call_llm_with_retry, cache_llm_response, LLMRateLimitError
 from app.services.processing.utils.json_parser import safe_parse_llm_json, LLMResponseParseError
+from app.services.processing.utils.retrieval import cached_retrieve, dedupe_documents, format_page_context, retrieve_for_queries
 
 logger = logging.getLogger(__name__)
 
+# Bookkeeping keys stored alongside extracted criterion data
+_METADATA_FIELDS = frozenset(['_criterion_name', '_extraction_timestamp'])
+
 
 def _has_actual_data(extracted_data: Dict[str, Any]) -> bool:
     """
@@ -28,30 +34,198 @@ def _has_actual_data(extracted_data: Dict[str, Any]) -> bool:
     if not extracted_data:
         return False
     
-    metadata_fields = {'_criterion_name', '_extraction_timestamp'}
     for key, value in extracted_data.items():
-        if key not in metadata_fields and value is not None:
-            # Check if value is not empty string, empty list, or empty dict
-            if isinstance(value, str) and value.strip():
-                return True
-            elif isinstance(value, (list, dict)) and len(value) > 0:
-                return True
-            elif not isinstance(value, (str, list, dict)):
+        if value is None or key in _METADATA_FIELDS:
+            continue
+        # Strings count when non-blank, lists/dicts when non-empty, anything else always
+        if isinstance(value, str):
+            if value.strip():
                 return True
+        elif not isinstance(value, (list, dict)) or value:
+            return True
     
     return False
 
 # Get config directory
 _CONFIG_DIR = os.path.join(os.path.dirname(__file__), 'processing', 'config')
 
+# Number of criteria sent per LLM call when extracting criteria outside the single batched call
+CRITERIA_FALLBACK_BATCH_SIZE = 10
+# Max criteria groups (or single criteria) extracted at the same time in that path
+MAX_CRITERIA_EXTRACTION_WORKERS = 4
+
+
+# Static part of the single-call criteria prompt. Only the criteria list is filled in
+# (it comes from config, so it is the same for every document); the document content
+# is appended last so calls share a stable prompt prefix.
+_BATCHED_CRITERIA_PROMPT_TEMPLATE = """You are an expert medical document analyst specializing in donor eligibility assessment. Analyze the provided donor document and extract ALL required data points for each of the 79 acceptance criteria listed below.
+
+CRITICAL INSTRUCTIONS:
+1. Extract ONLY information that is explicitly present in the document
+2. If a data point is not found, set it to null (not false, not empty string, but null)
+3. Be thorough - check all pages and sections of the document
+4. Extract exact values as they appear (dates, numbers, text)
+5. For boolean/yes-no questions, extract as true/false/null based on what's stated
+6. For dates, extract in the format found in the document (or convert to YYYY-MM-DD if possible)
+7. STRICT RULE FOR DIAGNOSIS FIELDS (sepsis_diagnosis, tb_diagnosis, etc.):
+   - Extract true/Yes ONLY if the document contains a statement that indicates the patient 
+     HAS or HAD the condition as a medical fact/diagnosis
+   - The statement must indicate the condition is/was present in the patient, not just mentioned
+   - Accept ANY phrasing that clearly indicates a diagnosis (e.g., "diagnosed with", "has", 
+     "confirmed", "present", "active", "history of", "noted", "diagnosis:", etc.)
+   - Extract null (NOT true) if:
+     * The condition word appears only in test names (e.g., "Sepsis Protocol", "TB Test")
+     * The condition word appears only in lab results without a diagnosis statement
+     * Document says "rule out [condition]" or "R/O [condition]" (this means checking, not diagnosing)
+     * Document says "no evidence of [condition]" or "negative for [condition]"
+     * Document says "suspected [condition]" or "possible [condition]" (uncertainty, not diagnosis)
+     * Test results are positive/negative but no explicit diagnosis statement exists
+     * The word appears only in passing without indicating the patient has the condition
+   
+   KEY PRINCIPLE: A diagnosis field should be true ONLY when the document states that the 
+   patient has/had the condition as a medical fact. If you're inferring it from test results 
+   alone, or if it's only mentioned in test names/protocols, it must be null.
+   
+   CRITICAL FOR sepsis_diagnosis: This field means "sepsis is present in the patient", NOT 
+   "a sepsis diagnosis was performed". Only set to true if the document explicitly states 
+   that the patient HAS sepsis, HAD sepsis, or was DIAGNOSED WITH sepsis (meaning sepsis 
+   is/was present). If the document only mentions "sepsis diagnosis" in the context of 
+   testing, ruling out, or performing diagnostic procedures, but does not confirm sepsis 
+   is present, set to null. Examples:
+   - TRUE: "Patient diagnosed with sepsis", "Sepsis present", "Active sepsis", "History of sepsis"
+   - NULL: "Rule out sepsis", "Sepsis protocol initiated", "Sepsis diagnosis pending", 
+           "Testing for sepsis", "Sepsis workup performed", "No sepsis found"
+
+ACCEPTANCE CRITERIA TO EXTRACT DATA FOR:
+{criteria_list}
+
+OUTPUT FORMAT:
+Return a JSON object where each key is a criterion name and the value is an object containing the extracted data points for that criterion.
 
+Example structure:
+{{
+  "Age": {{
+    "donor_age": 45,
+    "tissue_type": "femur",
+    "gender": "male"
+  }},
+  "Cancer": {{
+    "cancer_type": null,
+    "diagnosis_date": null,
+    "treatment": null,
+    "recurrence": null,
+    "time_since_death": null
+  }},
+  "HIV": {{
+    "hiv_history": false,
+    "hiv_exposure": null,
+    "hiv_test_results": "negative",
+    "hiv_test_date": "2024-01-15"
+  }}
+}}
+
+IMPORTANT:
+- Include ALL 79 criteria in your response, even if most data points are null
+- Use null (not false, not empty string) when data is not found
+- Extract exact values from the document
+- Be comprehensive - check medical history, social history, lab results, cause of death, etc.
+
+"""
+
+
+@lru_cache(maxsize=4)
+def _batched_criteria_prompt_prefix(criteria_list: str) -> str:
+    """Render the batched criteria prompt prefix for a criteria list (memoized)."""
+    return _BATCHED_CRITERIA_PROMPT_TEMPLATE.format(criteria_list=criteria_list)
+
+
+@lru_cache(maxsize=1)
 def load_acceptance_criteria_config() -> Dict[str, Any]:
-    """Load acceptance criteria configuration."""
+    """
+    Load acceptance criteria configuration.
+    
+    The file is static, so it is read once per process; callers must treat the
+    returned dictionary as read-only.
+    """
     criteria_path = os.path.join(_CONFIG_DIR, 'acceptance_criteria.json')
     with open(criteria_path, 'r') as f:
         return json.load(f)
 
 
+def _store_criterion_data(
+    db: Session,
+    document_id: int,
+    donor_id: int,
+    criterion_name: str,
+    criterion_info: Dict[str, Any],
+    extracted_data: Optional[Dict[str, Any]]
+) -> int:
+    """
+    Add CriteriaEvaluation rows for one criterion's extracted data (not committed).
+    
+    Returns:
+        Number of criteria evaluations added
+    """
+    if not extracted_data:
+        return 0
+    
+    # Add metadata
+    extracted_data['_criterion_name'] = criterion_name
+    extracted_data['_extraction_timestamp'] = str(os.path.getmtime(__file__))
+    
+    # Skip storing if there's no actual data (all values are null)
+    if not _has_actual_data(extracted_data):
+        logger.debug(f"Skipping criterion {criterion_name} - no actual extracted data")
+        return 0
+    
+    # Determine tissue types to evaluate
+    tissue_types = []
+    if criterion_info.get('tissue_specific', False):
+        tissue_types = [TissueType.MUSCULOSKELETAL, TissueType.SKIN]
+    else:
+        tissue_types = [TissueType.BOTH]
+    
+    # Store extracted data for each tissue type
+    for tissue_type in tissue_types:
+        # Store raw extracted data (evaluation will happen later)
+        criteria_eval = CriteriaEvaluation(
+            donor_id=donor_id,
+            document_id=document_id,
+            criterion_name=criterion_name,
+            tissue_type=tissue_type,
+            extracted_data=extracted_data,
+            evaluation_result=EvaluationResult.MD_DISCRETION  # Default, will be evaluated later
+        )
+        db.add(criteria_eval)
+    return len(tissue_types)
+
+
+def _iter_concurrent_results(func: Callable[[Any], Any], items: List[Any]) -> Iterator[Tuple[Any, Any]]:
+    """
+    Run func over items on a small thread pool, yielding (item, result) in input order.
+    
+    Results are consumed on the calling thread, so callers can write them to their
+    session safely. If a call raises, calls that have not started yet are cancelled.
+    
+    Args:
+        func: Function to run for each item (e.g. one LLM extraction)
+        items: Inputs, in the order results should be yielded
+    """
+    if len(items) <= 1:
+        for item in items:
+            yield item, func(item)
+        return
+    
+    with ThreadPoolExecutor(max_workers=min(MAX_CRITERIA_EXTRACTION_WORKERS, len(items))) as executor:
+        futures = [executor.submit(func, item) for item in items]
+        try:
+            for item, future in zip(items, futures):
+                yield item, future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
 def extract_criteria_data(
     document_id: int,
     donor_id: int,
@@ -62,6 +236,11 @@ def extract_criteria_data(
 ) -> int:
     """
     Extract data for all criteria from acceptance criteria config.
+    Criteria are sent to the LLM in groups of CRITERIA_FALLBACK_BATCH_SIZE, with up to
+    MAX_CRITERIA_EXTRACTION_WORKERS groups in flight. Criteria missing from their group
+    response are collected and re-requested together in one more grouped pass; only
+    those still missing are extracted individually.
+    Stops early (keeping what was already extracted) if the LLM stays rate limited.
     
     Returns:
         Number of criteria evaluations stored
@@ -69,57 +248,70 @@ def extract_criteria_data(
     try:
         # Load acceptance criteria config
         criteria_config = load_acceptance_criteria_config()
+        criteria_items = list(criteria_config.items())
+        # Lowercased page texts for the keyword fallback, shared by every criterion
+        page_texts = _index_page_texts(page_doc_list)
         
         count = 0
-        
-        # Extract data for each criterion
-        for criterion_name, criterion_info in criteria_config.items():
-            try:
-                # Extract data for this criterion
-                extracted_data = extract_single_criterion(
-                    criterion_name=criterion_name,
-                    criterion_info=criterion_info,
+        try:
+            # First pass over all criteria, then one regrouped pass over the misses
+            pending = criteria_items
+            for is_retry_pass in (False, True):
+                missing = []
+                criteria_batches = [
+                    pending[batch_start:batch_start + CRITERIA_FALLBACK_BATCH_SIZE]
+                    for batch_start in range(0, len(pending), CRITERIA_FALLBACK_BATCH_SIZE)
+                ]
+                for criteria_batch, batch_results in _iter_concurrent_results(
+                    lambda criteria_batch: extract_criteria_batch(
+                        criteria_batch=criteria_batch,
+                        document_chunks=page_doc_list,
+                        vectordb=vectordb,
+                        llm=llm,
+                        page_texts=page_texts,
+                        use_cache=not is_retry_pass
+                    ),
+                    criteria_batches
+                ):
+                    for criterion_name, criterion_info in criteria_batch:
+                        if criterion_name not in batch_results:
+                            missing.append((criterion_name, criterion_info))
+                            continue
+                        try:
+                            count += _store_criterion_data(
+                                db, document_id, donor_id, criterion_name, criterion_info,
+                                batch_results[criterion_name]
+                            )
+                        except Exception as e:
+                            logger.error(f"Error extracting data for criterion {criterion_name} in document {document_id}: {e}", exc_info=True)
+                pending = missing
+                if not pending or is_retry_pass:
+                    break
+                logger.info(f"Re-requesting {len(pending)} criteria missing from group responses in document {document_id}")
+            
+            # Not answered in any group response - extract these criteria on their own
+            # (extract_single_criterion handles its own errors; only rate limits propagate)
+            for (criterion_name, criterion_info), extracted_data in _iter_concurrent_results(
+                lambda criterion: extract_single_criterion(
+                    criterion_name=criterion[0],
+                    criterion_info=criterion[1],
                     document_chunks=page_doc_list,
                     vectordb=vectordb,
-                    llm=llm
-                )
-                
-                if not extracted_data:
-                    continue
-                
-                # Add metadata
-                extracted_data['_criterion_name'] = criterion_name
-                extracted_data['_extraction_timestamp'] = str(os.path.getmtime(__file__))
-                
-                # Skip storing if there's no actual data (all values are null)
-                if not _has_actual_data(extracted_data):
-                    logger.debug(f"Skipping criterion {criterion_name} - no actual extracted data")
-                    continue
-                
-                # Determine tissue types to evaluate
-                tissue_types = []
-                if criterion_info.get('tissue_specific', False):
-                    tissue_types = [TissueType.MUSCULOSKELETAL, TissueType.SKIN]
-                else:
-                    tissue_types = [TissueType.BOTH]
-                
-                # Store extracted data for each tissue type
-                for tissue_type in tissue_types:
-                    # Store raw extracted data (evaluation will happen later)
-                    criteria_eval = CriteriaEvaluation(
-                        donor_id=donor_id,
-                        document_id=document_id,
-                        criterion_name=criterion_name,
-                        tissue_type=tissue_type,
-                        extracted_data=extracted_data,
-                        evaluation_result=EvaluationResult.MD_DISCRETION  # Default, will be evaluated later
+                    llm=llm,
+                    page_texts=page_texts
+                ),
+                pending
+            ):
+                try:
+                    count += _store_criterion_data(
+                        db, document_id, donor_id, criterion_name, criterion_info, extracted_data
                     )
-                    db.add(criteria_eval)
-                    count += 1
-                
-            except Exception as e:
-                logger.error(f"Error extracting data for criterion {criterion_name} in document {document_id}: {e}", exc_info=True)
-                continue
+                except Exception as e:
+                    logger.error(f"Error extracting data for criterion {criterion_name} in document {document_id}: {e}", exc_info=True)
+                    continue
+        except LLMRateLimitError as e:
+            # Every remaining call would hit the same limit - stop instead of retrying each one
+            logger.warning(f"Stopping criteria extraction early for document {document_id}: {e}")
         
         db.commit()
         logger.info(f"Stored extracted data for {count} criteria evaluations in document {document_id}")
@@ -169,27 +361,15 @@ def extract_all_criteria_data_batched(
             "autopsy post-mortem examination"
         ]
         
-        # Retrieve relevant chunks using multiple queries
-        all_retrieved_docs = []
-        retriever = vectordb.as_retriever(search_type='similarity', search_kwargs={'k': 10})
-        
-        for query in queries:
-            retrieved_docs = retriever.invoke(query)
-            all_retrieved_docs.extend(retrieved_docs)
-        
-        # Deduplicate by page and content
-        seen = set()
-        unique_docs = []
-        for doc in all_retrieved_docs:
-            doc_key = (doc.metadata.get('page'), doc.page_content[:100])
-            if doc_key not in seen:
-                seen.add(doc_key)
-                unique_docs.append(doc)
-        
-        retrieved_docs = unique_docs[:50]  # Limit to top 50 unique chunks
+        # Retrieve relevant chunks using multiple queries (run concurrently, results in query order)
+        all_retrieved_docs = [
+            doc
+            for retrieved_docs in retrieve_for_queries(vectordb, queries, k=10)
+            for doc in retrieved_docs
+        ]
         
-        # Track source pages for citations
-        source_pages = []
+        # Track source pages for citations (dict keys keep first-seen order without duplicates)
+        source_pages = {}
         
         # Also include first 20 pages from page_doc_list for comprehensive coverage
         context_pages = []
@@ -201,30 +381,33 @@ def extract_all_criteria_data_batched(
                 if page_num is not None:
                     try:
                         page_int = int(page_num) if isinstance(page_num, (int, str)) and str(page_num).isdigit() else None
-                        if page_int and page_int not in source_pages:
-                            source_pages.append(page_int)
+                        if page_int:
+                            source_pages[page_int] = None
                     except (ValueError, TypeError):
                         pass
         
-        # Build comprehensive context
-        context_parts = []
+        # Deduplicate by page and content, skipping chunks contained in one already kept
+        # or in one of the full context pages (those pages are sent in full anyway)
+        retrieved_docs = dedupe_documents(all_retrieved_docs, limit=50, already_included=context_pages)  # Limit to top 50 unique chunks
+        
+        # Extract page numbers from retrieved docs
         for doc in retrieved_docs:
-            context_parts.append(f"Page {doc.metadata.get('page', '?')}: {doc.page_content}")
-            # Extract page number from retrieved docs
             page_num = doc.metadata.get('page')
             if page_num is not None:
                 try:
                     page_int = int(page_num) if isinstance(page_num, (int, str)) and str(page_num).isdigit() else None
-                    if page_int and page_int not in source_pages:
-                        source_pages.append(page_int)
+                    if page_int:
+                        source_pages[page_int] = None
                 except (ValueError, TypeError):
                     pass
-        for page_doc in context_pages:
-            page_num = getattr(page_doc, 'metadata', {}).get('page', '?')
-            content = getattr(page_doc, 'page_content', '')
-            context_parts.append(f"Page {page_num}: {content}")
         
-        context = "\n".join(context_parts)
+        # Nothing to extract from - skip building the prompt and the LLM call
+        if not retrieved_docs and not any(page_doc.page_content.strip() for page_doc in context_pages):
+            logger.info(f"No document content for batched criteria extraction in document {document_id}, skipping LLM call")
+            return 0
+        
+        # Build comprehensive context
+        context = format_page_context(retrieved_docs, context_pages)
         
         # Build comprehensive criteria list with data points
         criteria_list = []
@@ -236,83 +419,12 @@ def extract_all_criteria_data_batched(
         
         criteria_list_str = "\n".join(criteria_list)
         
-        # Build comprehensive prompt
-        prompt = f"""You are an expert medical document analyst specializing in donor eligibility assessment. Analyze the provided donor document and extract ALL required data points for each of the 79 acceptance criteria listed below.
-
-CRITICAL INSTRUCTIONS:
-1. Extract ONLY information that is explicitly present in the document
-2. If a data point is not found, set it to null (not false, not empty string, but null)
-3. Be thorough - check all pages and sections of the document
-4. Extract exact values as they appear (dates, numbers, text)
-5. For boolean/yes-no questions, extract as true/false/null based on what's stated
-6. For dates, extract in the format found in the document (or convert to YYYY-MM-DD if possible)
-7. STRICT RULE FOR DIAGNOSIS FIELDS (sepsis_diagnosis, tb_diagnosis, etc.):
-   - Extract true/Yes ONLY if the document contains a statement that indicates the patient 
-     HAS or HAD the condition as a medical fact/diagnosis
-   - The statement must indicate the condition is/was present in the patient, not just mentioned
-   - Accept ANY phrasing that clearly indicates a diagnosis (e.g., "diagnosed with", "has", 
-     "confirmed", "present", "active", "history of", "noted", "diagnosis:", etc.)
-   - Extract null (NOT true) if:
-     * The condition word appears only in test names (e.g., "Sepsis Protocol", "TB Test")
-     * The condition word appears only in lab results without a diagnosis statement
-     * Document says "rule out [condition]" or "R/O [condition]" (this means checking, not diagnosing)
-     * Document says "no evidence of [condition]" or "negative for [condition]"
-     * Document says "suspected [condition]" or "possible [condition]" (uncertainty, not diagnosis)
-     * Test results are positive/negative but no explicit diagnosis statement exists
-     * The word appears only in passing without indicating the patient has the condition
-   
-   KEY PRINCIPLE: A diagnosis field should be true ONLY when the document states that the 
-   patient has/had the condition as a medical fact. If you're inferring it from test results 
-   alone, or if it's only mentioned in test names/protocols, it must be null.
-   
-   CRITICAL FOR sepsis_diagnosis: This field means "sepsis is present in the patient", NOT 
-   "a sepsis diagnosis was performed". Only set to true if the document explicitly states 
-   that the patient HAS sepsis, HAD sepsis, or was DIAGNOSED WITH sepsis (meaning sepsis 
-   is/was present). If the document only mentions "sepsis diagnosis" in the context of 
-   testing, ruling out, or performing diagnostic procedures, but does not confirm sepsis 
-   is present, set to null. Examples:
-   - TRUE: "Patient diagnosed with sepsis", "Sepsis present", "Active sepsis", "History of sepsis"
-   - NULL: "Rule out sepsis", "Sepsis protocol initiated", "Sepsis diagnosis pending", 
-           "Testing for sepsis", "Sepsis workup performed", "No sepsis found"
-
-ACCEPTANCE CRITERIA TO EXTRACT DATA FOR:
-{criteria_list_str}
-
-OUTPUT FORMAT:
-Return a JSON object where each key is a criterion name and the value is an object containing the extracted data points for that criterion.
-
-Example structure:
-{{
-  "Age": {{
-    "donor_age": 45,
-    "tissue_type": "femur",
-    "gender": "male"
-  }},
-  "Cancer": {{
-    "cancer_type": null,
-    "diagnosis_date": null,
-    "treatment": null,
-    "recurrence": null,
-    "time_since_death": null
-  }},
-  "HIV": {{
-    "hiv_history": false,
-    "hiv_exposure": null,
-    "hiv_test_results": "negative",
-    "hiv_test_date": "2024-01-15"
-  }}
-}}
-
-IMPORTANT:
-- Include ALL 79 criteria in your response, even if most data points are null
-- Use null (not false, not empty string) when data is not found
-- Extract exact values from the document
-- Be comprehensive - check medical history, social history, lab results, cause of death, etc.
-
-Document content:
-{context}
-
-Return only the JSON object, no other text or markdown formatting:"""
+        # Build comprehensive prompt (static prefix first, document content last)
+        prompt = (
+            _batched_criteria_prompt_prefix(criteria_list_str)
+            + f"Document content:\n{context}\n\n"
+            + "Return only the JSON object, no other text or markdown formatting:"
+        )
         
         # Call LLM with longer timeout for comprehensive extraction
         response = call_llm_with_retry(
@@ -321,7 +433,8 @@ Return only the JSON object, no other text or markdown formatting:"""
             max_retries=3,
             base_delay=1.0,
             timeout=120,  # Longer timeout for batched extraction
-            context="batched criteria extraction"
+            context="batched criteria extraction",
+            use_cache=True
         )
         
         # Parse JSON response
@@ -332,34 +445,29 @@ Return only the JSON object, no other text or markdown formatting:"""
             # Fallback to individual extraction
             logger.info(f"Falling back to individual criteria extraction for document {document_id}")
             return extract_criteria_data(document_id, donor_id, vectordb, llm, db, page_doc_list)
+        cache_llm_response(llm, prompt, response)
         
         # Process extracted data and store in database
         count = 0
         for criterion_name, criterion_info in criteria_config.items():
             try:
-                # Get extracted data for this criterion
-                extracted_data = all_extracted_data.get(criterion_name)
-                
-                if not extracted_data:
-                    # If criterion not in response, create empty data structure
-                    required_data_points = criterion_info.get('required_data_points', [])
-                    extracted_data = {dp: None for dp in required_data_points}
+                # Get extracted data for this criterion (empty if not in response)
+                response_data = all_extracted_data.get(criterion_name)
+                if not isinstance(response_data, dict):
+                    response_data = {}
                 
-                # Ensure all required data points are present
+                # Keep exactly the required data points (missing ones as None) plus any
+                # metadata keys, building the normalized dict in a single pass
                 required_data_points = criterion_info.get('required_data_points', [])
-                for dp in required_data_points:
-                    if dp not in extracted_data:
-                        extracted_data[dp] = None
-                
-                # Remove any extra keys that aren't required data points
-                extracted_data = {k: v for k, v in extracted_data.items() if k in required_data_points or k.startswith('_')}
+                extracted_data = {dp: response_data.get(dp) for dp in required_data_points}
+                extracted_data.update((k, v) for k, v in response_data.items() if k.startswith('_'))
                 
                 # Add metadata
                 extracted_data['_criterion_name'] = criterion_name
                 extracted_data['_extraction_timestamp'] = str(os.path.getmtime(__file__))
                 # Add source pages for citations (sorted, deduplicated)
                 if source_pages:
-                    extracted_data['_source_pages'] = sorted(list(set(source_pages)))
+                    extracted_data['_source_pages'] = sorted(source_pages)
                 
                 # Skip storing if there's no actual data (all values are null)
                 if not _has_actual_data(extracted_data):
@@ -406,12 +514,202 @@ Return only the JSON object, no other text or markdown formatting:"""
             return 0
 
 
+def _index_page_texts(document_chunks: List[Any]) -> List[Tuple[Any, str]]:
+    """
+    Pair each page document with its lowercased text for keyword fallback search.
+    
+    Built once per document so the per-criterion fallback does not lowercase
+    every page again for each criterion.
+    
+    Returns:
+        List of (page document, lowercased page content)
+    """
+    return [
+        (page_doc, page_doc.page_content.lower())
+        for page_doc in document_chunks
+        if hasattr(page_doc, 'page_content')
+    ]
+
+
+def _retrieve_criterion_context(
+    criterion_name: str,
+    required_data_points: List[str],
+    document_chunks: List[Any],
+    vectordb: Any,
+    page_texts: Optional[List[Tuple[Any, str]]] = None
+) -> Tuple[List[Any], List[int]]:
+    """
+    Retrieve the chunks relevant to a single criterion.
+    
+    Args:
+        page_texts: Result of _index_page_texts(document_chunks), if already built
+    
+    Returns:
+        Tuple of (documents to use as context, source page numbers)
+    """
+    # Build search query from criterion name and required data points
+    search_query = f"{criterion_name} {' '.join(required_data_points)}"
+    
+    # Retrieve relevant chunks (cached, so a fallback re-extraction does not query again)
+    retrieved_docs = cached_retrieve(vectordb, search_query, k=5)
+    
+    # Track source pages for citations (dict keys keep first-seen order without duplicates)
+    source_pages = {}
+    
+    if retrieved_docs:
+        context_docs = retrieved_docs
+    else:
+        # Also try searching in page_doc_list by keyword
+        if page_texts is None:
+            page_texts = _index_page_texts(document_chunks)
+        search_terms = [criterion_name.lower()] + [dp.lower() for dp in required_data_points]
+        relevant_pages = [
+            page_doc
+            for page_doc, content in page_texts
+            if any(term in content for term in search_terms)
+        ]
+        context_docs = relevant_pages[:5]
+        retrieved_docs = relevant_pages
+    
+    # Extract page numbers
+    for doc in retrieved_docs:
+        page_num = getattr(doc, 'metadata', {}).get('page')
+        if page_num is not None:
+            try:
+                page_int = int(page_num) if isinstance(page_num, (int, str)) and str(page_num).isdigit() else None
+                if page_int:
+                    source_pages[page_int] = None
+            except (ValueError, TypeError):
+                pass
+    
+    return context_docs, list(source_pages)
+
+
+def extract_criteria_batch(
+    criteria_batch: List[Tuple[str, Dict[str, Any]]],
+    document_chunks: List[Any],
+    vectordb: Any,
+    llm: Any,
+    page_texts: Optional[List[Tuple[Any, str]]] = None,
+    use_cache: bool = True
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Extract data for a group of criteria in a single LLM call.
+    
+    Args:
+        criteria_batch: List of (criterion_name, criterion_info) pairs
+        document_chunks: Page documents used for keyword fallback retrieval
+        vectordb: Vector store for semantic search
+        llm: LLM instance
+        page_texts: Lowercased page index for keyword fallback (built if not given)
+        use_cache: Reuse a cached response for the same group prompt (False when
+            re-requesting criteria a previous response left out)
+    
+    Returns:
+        Dictionary mapping criterion name to extracted data. Criteria that were not
+        answered (or could not be parsed) are omitted so the caller can fall back.
+    """
+    try:
+        # Gather context for every criterion in the group, deduplicating shared chunks
+        seen = set()
+        context_parts = []
+        criteria_lines = []
+        source_pages_by_criterion = {}
+        data_points_by_criterion = {}
+        for criterion_name, criterion_info in criteria_batch:
+            required_data_points = criterion_info.get('required_data_points', [])
+            if not required_data_points:
+                continue
+            context_docs, source_pages = _retrieve_criterion_context(
+                criterion_name, required_data_points, document_chunks, vectordb, page_texts
+            )
+            if not context_docs:
+                continue
+            data_points_by_criterion[criterion_name] = required_data_points
+            source_pages_by_criterion[criterion_name] = source_pages
+            criteria_lines.append(f"- {criterion_name}: Extract [{', '.join(required_data_points)}]")
+            for doc in context_docs:
+                page_num = getattr(doc, 'metadata', {}).get('page', '?')
+                content = getattr(doc, 'page_content', '')
+                doc_key = (page_num, content[:100])
+                if doc_key not in seen:
+                    seen.add(doc_key)
+                    context_parts.append(f"Page {page_num}: {content}")
+        
+        if not criteria_lines:
+            return {}
+        
+        criteria_list_str = "\n".join(criteria_lines)
+        context = "\n".join(context_parts)
+        prompt = f"""You are a medical document analyst. Extract specific data points from the donor document for each of the criteria listed below.
+
+Criteria and required data points to extract:
+{criteria_list_str}
+
+Extract ONLY the information that is explicitly present in the document. If a data point is not found, set it to null.
+
+Return a JSON object where each key is a criterion name and the value is an object with keys matching that criterion's required data points.
+
+Example output format:
+{{
+  "Criterion Name": {{
+    "data_point": "extracted value or null",
+    "another_point": "extracted value or null"
+  }}
+}}
+
+Document content:
+{context}
+
+Return only the JSON object, no other text:"""
+        
+        response = call_llm_with_retry(
+            llm=llm,
+            prompt=prompt,
+            max_retries=3,
+            base_delay=1.0,
+            timeout=90,
+            context=f"criteria group extraction ({len(criteria_lines)} criteria)",
+            use_cache=use_cache
+        )
+        
+        try:
+            batch_data = safe_parse_llm_json(response.content)
+        except LLMResponseParseError as e:
+            logger.warning(f"Failed to parse group extraction response, falling back to single criteria: {e}")
+            return {}
+        
+        results = {}
+        for criterion_name, required_data_points in data_points_by_criterion.items():
+            extracted_data = batch_data.get(criterion_name)
+            if not isinstance(extracted_data, dict):
+                continue
+            # Keep only the required data points, filling in any that are missing
+            extracted_data = {dp: extracted_data.get(dp) for dp in required_data_points}
+            source_pages = source_pages_by_criterion.get(criterion_name)
+            if source_pages:
+                extracted_data['_source_pages'] = sorted(source_pages)
+            results[criterion_name] = extracted_data
+        
+        # Only a response that answered every criterion is worth replaying
+        if len(results) == len(data_points_by_criterion):
+            cache_llm_response(llm, prompt, response)
+        return results
+        
+    except LLMRateLimitError:
+        raise
+    except Exception as e:
+        logger.error(f"Error in group criteria extraction: {e}", exc_info=True)
+        return {}
+
+
 def extract_single_criterion(
     criterion_name: str,
     criterion_info: Dict[str, Any],
     document_chunks: List[Any],
     vectordb: Any,
-    llm: Any
+    llm: Any,
+    page_texts: Optional[List[Tuple[Any, str]]] = None
 ) -> Optional[Dict[str, Any]]:
     """
     Extract data for a single criterion.
@@ -424,58 +722,13 @@ def extract_single_criterion(
         if not required_data_points:
             return None
         
-        # Build search query from criterion name and required data points
-        search_query = f"{criterion_name} {' '.join(required_data_points)}"
-        
-        # Retrieve relevant chunks
-        retriever = vectordb.as_retriever(search_type='similarity', search_kwargs={'k': 5})
-        retrieved_docs = retriever.invoke(search_query)
-        
-        # Track source pages for citations
-        source_pages = []
-        
-        if not retrieved_docs:
-            # Also try searching in page_doc_list by keyword
-            relevant_pages = []
-            criterion_lower = criterion_name.lower()
-            for page_doc in document_chunks:
-                if hasattr(page_doc, 'page_content'):
-                    content = page_doc.page_content.lower()
-                    if criterion_lower in content or any(dp.lower() in content for dp in required_data_points):
-                        relevant_pages.append(page_doc)
-                        # Extract page number
-                        page_num = getattr(page_doc, 'metadata', {}).get('page')
-                        if page_num is not None:
-                            try:
-                                page_int = int(page_num) if isinstance(page_num, (int, str)) and str(page_num).isdigit() else None
-                                if page_int and page_int not in source_pages:
-                                    source_pages.append(page_int)
-                            except (ValueError, TypeError):
-                                pass
-            
-            if not relevant_pages:
-                return None
-            
-            # Build context from relevant pages
-            context = "\n".join([
-                f"Page {getattr(page_doc, 'metadata', {}).get('page', '?')}: {getattr(page_doc, 'page_content', '')}"
-                for page_doc in relevant_pages[:5]
-            ])
-        else:
-            context = "\n".join([
-                f"Page {doc.metadata.get('page', '?')}: {doc.page_content}"
-                for doc in retrieved_docs
-            ])
-            # Extract page numbers from retrieved docs
-            for doc in retrieved_docs:
-                page_num = doc.metadata.get('page')
-                if page_num is not None:
-                    try:
-                        page_int = int(page_num) if isinstance(page_num, (int, str)) and str(page_num).isdigit() else None
-                        if page_int and page_int not in source_pages:
-                            source_pages.append(page_int)
-                    except (ValueError, TypeError):
-                        pass
+        context_docs, source_pages = _retrieve_criterion_context(
+            criterion_name, required_data_points, document_chunks, vectordb, page_texts
+        )
+        if not context_docs:
+            return None
+        
+        context = format_page_context(context_docs)
         
         # Create extraction prompt
         data_points_list = ", ".join(required_data_points)
@@ -506,7 +759,8 @@ Return only the JSON object, no other text:"""
             max_retries=3,
             base_delay=1.0,
             timeout=60,
-            context=f"criteria extraction: {criterion_name}"
+            context=f"criteria extraction: {criterion_name}",
+            use_cache=True
         )
         
         # Parse JSON response
@@ -518,14 +772,17 @@ Return only the JSON object, no other text:"""
             extracted_data['_extraction_timestamp'] = str(os.path.getmtime(__file__))  # Simple timestamp
             # Add source pages for citations (sorted, deduplicated)
             if source_pages:
-                extracted_data['_source_pages'] = sorted(list(set(source_pages)))
+                extracted_data['_source_pages'] = sorted(source_pages)
             
+            cache_llm_response(llm, prompt, response)
             return extracted_data
             
         except LLMResponseParseError as e:
             logger.warning(f"Failed to parse extraction response for criterion {criterion_name}: {e}")
             return None
         
+    except LLMRateLimitError:
+        raise
     except Exception as e:
         logger.error(f"Error extracting single criterion {criterion_name}: {e}", exc_info=True)
         return None
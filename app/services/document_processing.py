@@ -3,10 +3,12 @@ Document processing service for extracting medical information from PDFs.
 Replaces simulated processing with real AI-powered extraction.
 """
 import asyncio
+import json
 import logging
 import os
-import tempfile
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, Tuple
 from sqlalchemy.orm import Session
 from app.models.document import Document, DocumentStatus
 from app.services.pdf_service import pdf_service
@@ -15,9 +17,97 @@ from app.services.processing.utils.llm_config import llm_setup
 from app.services.processing.utils.helper_functions import processing_dc
 from app.services.lab_test_extraction import extract_all_lab_tests
 from app.services.criteria_extraction import extract_all_criteria_data_batched
+from app.services.semantic_extraction import (
+    extract_recovery_information,
+    extract_terminal_information,
+    detect_document_presence,
+    extract_simple_medical_records,
+    extract_critical_lab_values
+)
+from app.services.drai_extraction import extract_drai_comprehensive
+from app.services.document_specific_extraction import extract_document_specific_data_batched
+from app.services.extraction_aggregation import extraction_aggregation_service
+from app.database.database import SessionLocal
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+_CONFIG_DIR = os.path.join(os.path.dirname(__file__), 'processing', 'config')
+
+# Prompt component config files, in the order load_prompt_components returns them
+_PROMPT_COMPONENT_FILES = (
+    'role.json',
+    'instruction.json',
+    'reminder_instruction.json',
+    'new_serology_dictionary.json',
+    'new_culture_dictionary.json'
+)
+
+
+def _load_config_file(filename: str) -> Any:
+    """Read and parse one JSON file from the processing config directory."""
+    with open(os.path.join(_CONFIG_DIR, filename), 'r') as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=1)
+def load_prompt_components() -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """
+    Load the prompt component config files used for lab test extraction.
+    
+    The files don't change while the process runs, so they are read once and the
+    same objects are shared by every document. Callers must not mutate them.
+    The files are independent, so they are read concurrently; on network-mounted
+    volumes each open is a round-trip.
+    
+    Returns:
+        Tuple of (role, basic_instruction, reminder_instructions,
+        serology_dictionary, culture_dictionary)
+    """
+    with ThreadPoolExecutor(max_workers=len(_PROMPT_COMPONENT_FILES)) as executor:
+        # executor.map preserves file order
+        return tuple(executor.map(_load_config_file, _PROMPT_COMPONENT_FILES))
+
+
+def _run_with_own_session(task: Callable[[Session], Any]) -> Any:
+    """
+    Run a database-writing extraction step with a dedicated session.
+    
+    Used when steps run concurrently in the executor, since a SQLAlchemy
+    session must not be shared between threads.
+    
+    Args:
+        task: Callable taking the session to use
+        
+    Returns:
+        Whatever the task returns
+    """
+    task_db = SessionLocal()
+    try:
+        return task(task_db)
+    finally:
+        task_db.close()
+
+
+async def _await_or_default(awaitable: Any, default: Any, description: str, document_id: int) -> Any:
+    """
+    Await an extraction step, logging failures instead of raising.
+    
+    Args:
+        awaitable: Extraction step to wait for
+        default: Value returned if the step fails
+        description: Step name for logging (e.g., "DRAI extraction")
+        document_id: Document being processed
+        
+    Returns:
+        The step's result, or default on error
+    """
+    try:
+        return await awaitable
+    except Exception as e:
+        logger.error(f"Error in {description} for document {document_id}: {e}", exc_info=True)
+        return default
+
 
 class DocumentProcessingService:
     """Service for processing documents and extracting medical information."""
@@ -99,25 +189,23 @@ class DocumentProcessingService:
             # Process PDF: load, chunk, and create embeddings
             logger.info(f"Processing PDF and creating embeddings...")
             loop = asyncio.get_event_loop()
-            page_doc_list, doc_list, vectordb = await loop.run_in_executor(
+            page_doc_list, doc_list, vectordb, chunk_embeddings = await loop.run_in_executor(
                 None,
                 processing_dc,
                 temp_pdf_path,
                 self.embeddings,
                 False,  # save_embeddings
-                False   # delete_after
+                False,  # delete_after
+                settings.EMBEDDING_CACHE_DIR or None
             )
             
             # Store document chunks in pgvector
             logger.info("Storing document chunks in database...")
+            # processing_dc returns the exact vectors it embedded for the FAISS index,
+            # so storage makes no embeddings API calls of its own
             chunks_data = []
-            for idx, chunk_doc in enumerate(doc_list):
-                # Generate embedding for chunk
+            for idx, (chunk_doc, chunk_embedding) in enumerate(zip(doc_list, chunk_embeddings)):
                 chunk_text = chunk_doc.page_content
-                chunk_embedding = await loop.run_in_executor(
-                    None,
-                    lambda: self.embeddings.embed_query(chunk_text)
-                )
                 
                 # Embeddings are now 3072 dimensions (text-embedding-3-large default)
                 # No truncation needed - database schema supports 3072 dimensions
@@ -147,6 +235,9 @@ class DocumentProcessingService:
                 chunks_data.append(chunk_data)
             
             db_storage_service.store_document_chunks(document_id, chunks_data, db)
+            # Chunks are now in pgvector and the FAISS docstore; drop the local lists and
+            # vectors so they aren't held for the rest of the extraction phase
+            del doc_list, chunk_embeddings, chunks_data
             
             # Update progress: 30-40% - Load prompts
             document.progress = 35.0
@@ -154,129 +245,143 @@ class DocumentProcessingService:
             
             # Load minimal prompt components for lab test extraction
             logger.info("Loading prompt components...")
-            import json
-            config_dir = os.path.join(os.path.dirname(__file__), 'processing', 'config')
-            
-            with open(os.path.join(config_dir, 'role.json'), 'r') as f:
-                role = json.load(f)
-            with open(os.path.join(config_dir, 'instruction.json'), 'r') as f:
-                basic_instruction = json.load(f)
-            with open(os.path.join(config_dir, 'reminder_instruction.json'), 'r') as f:
-                reminder_instructions = json.load(f)
-            with open(os.path.join(config_dir, 'new_serology_dictionary.json'), 'r') as f:
-                serology_dictionary = json.load(f)
-            with open(os.path.join(config_dir, 'new_culture_dictionary.json'), 'r') as f:
-                culture_dictionary = json.load(f)
+            (
+                role,
+                basic_instruction,
+                reminder_instructions,
+                serology_dictionary,
+                culture_dictionary
+            ) = load_prompt_components()
             
             # Update progress: 40-60% - Extraction
             document.progress = 45.0
             db.commit()
             
-            # Extract required lab tests (serology and culture) in a single LLM call
-            logger.info("Running combined lab test extraction (serology + culture)...")
-            serology_count, culture_count = await loop.run_in_executor(
-                None,
-                extract_all_lab_tests,
-                document_id, vectordb, self.llm, db, role,
-                basic_instruction, reminder_instructions,
-                serology_dictionary, culture_dictionary
-            )
-            
-            logger.info(f"Extracted {serology_count} serology tests and {culture_count} culture tests in one LLM call")
-            
-            document.progress = 60.0
-            db.commit()
-            
-            # Extract criteria-specific data (all 79 criteria in one LLM call)
-            logger.info("Running batched criteria data extraction (all 79 criteria in one call)...")
-            criteria_count = await loop.run_in_executor(
-                None,
-                extract_all_criteria_data_batched,
-                document_id, document.donor_id, vectordb, self.llm, db, page_doc_list
-            )
-            
-            logger.info(f"Extracted data for {criteria_count} criteria evaluations in one LLM call")
-            
-            document.progress = 60.0
-            db.commit()
-            
-            # Update progress: 60-70% - Semantic Extraction
-            logger.info("Running semantic extraction (recovery, terminal, document presence)...")
-            from app.services.semantic_extraction import (
-                extract_recovery_information,
-                extract_terminal_information,
-                detect_document_presence,
-                extract_simple_medical_records,
-                extract_critical_lab_values
-            )
-            
-            semantic_data = {}
+            # Lab test extraction and criteria extraction only share read-only inputs
+            # (vectordb, llm), so run them concurrently. Each writes its own rows and
+            # commits, so each gets its own session (sessions are not thread-safe).
+            logger.info("Running combined lab test extraction (serology + culture) and batched criteria extraction concurrently...")
+            donor_id = document.donor_id
+            # Extraction steps run as background tasks. If one step fails, the pending tasks
+            # are cancelled below; that only stops us waiting on them, since executor threads
+            # can't be interrupted and finish their current call in the background
+            background_tasks = []
             try:
-                semantic_data['recovery_information'] = await loop.run_in_executor(
-                    None,
-                    extract_recovery_information,
-                    vectordb, page_doc_list
-                )
-                semantic_data['terminal_information'] = await loop.run_in_executor(
-                    None,
-                    extract_terminal_information,
-                    vectordb, page_doc_list
+                lab_and_criteria = asyncio.gather(
+                    loop.run_in_executor(
+                        None,
+                        _run_with_own_session,
+                        lambda task_db: extract_all_lab_tests(
+                            document_id, vectordb, self.llm, task_db, role,
+                            basic_instruction, reminder_instructions,
+                            serology_dictionary, culture_dictionary
+                        )
+                    ),
+                    loop.run_in_executor(
+                        None,
+                        _run_with_own_session,
+                        lambda task_db: extract_all_criteria_data_batched(
+                            document_id, donor_id, vectordb, self.llm, task_db, page_doc_list
+                        )
+                    )
                 )
-                document_presence_data = await loop.run_in_executor(
-                    None,
-                    detect_document_presence,
-                    vectordb, page_doc_list, db, document_id
+                background_tasks.append(lab_and_criteria)
+                
+                # Semantic extraction only reads chunks/vectordb and writes nothing, so start it
+                # now too and let its retrieval and LLM calls overlap with lab and criteria
+                # extraction. It is submitted after lab/criteria so those get executor threads first.
+                logger.info("Starting semantic extraction in the background...")
+                semantic_tasks = {
+                    key: asyncio.ensure_future(_await_or_default(
+                        loop.run_in_executor(None, extractor, vectordb, page_doc_list),
+                        None, f"semantic extraction ({key})", document_id
+                    ))
+                    for key, extractor in (
+                        ('recovery_information', extract_recovery_information),
+                        ('terminal_information', extract_terminal_information),
+                        ('critical_lab_values', extract_critical_lab_values),
+                        ('medical_records_review_summary', extract_simple_medical_records),
+                    )
+                }
+                background_tasks.extend(semantic_tasks.values())
+                
+                (serology_count, culture_count), criteria_count = await lab_and_criteria
+                
+                logger.info(f"Extracted {serology_count} serology tests and {culture_count} culture tests in one LLM call")
+                logger.info(f"Extracted data for {criteria_count} criteria evaluations")
+                
+                document.progress = 60.0
+                db.commit()
+                
+                # DRAI and document-specific extraction commit their own rows, so they only
+                # start once lab and criteria extraction succeeded; a thread that is already
+                # running can't be cancelled and would still write rows for a failed document.
+                # They overlap with document presence detection and the semantic results below.
+                logger.info("Starting document-specific extraction (DRAI, MRR, Plasma Dilution) in the background...")
+                # Extract DRAI using comprehensive extraction (processes ALL pages)
+                drai_task = asyncio.ensure_future(_await_or_default(
+                    loop.run_in_executor(
+                        None,
+                        _run_with_own_session,
+                        lambda task_db: extract_drai_comprehensive(document_id, task_db, self.llm, page_doc_list)
+                    ),
+                    {'present': False, 'pages': [], 'summary': {}, 'extracted_data': {}},
+                    "DRAI extraction", document_id
+                ))
+                background_tasks.append(drai_task)
+                # Extract other document-specific data (MRR, Plasma Dilution, ID Summary)
+                # Note: DRAI is now handled separately, so this call won't extract DRAI
+                document_specific_task = asyncio.ensure_future(_await_or_default(
+                    loop.run_in_executor(
+                        None,
+                        _run_with_own_session,
+                        lambda task_db: extract_document_specific_data_batched(
+                            document_id, vectordb, self.llm, page_doc_list, task_db
+                        )
+                    ),
+                    {}, "document-specific extraction", document_id
+                ))
+                background_tasks.append(document_specific_task)
+                
+                # Update progress: 60-70% - Semantic Extraction
+                # Document presence checks stored lab results, so it runs after lab extraction
+                logger.info("Running semantic extraction (recovery, terminal, document presence)...")
+                document_presence_data = await _await_or_default(
+                    loop.run_in_executor(
+                        None,
+                        detect_document_presence,
+                        vectordb, page_doc_list, db, document_id
+                    ),
+                    {}, "document presence detection", document_id
                 )
+                semantic_data = {}
+                for key in ('recovery_information', 'terminal_information'):
+                    result = await semantic_tasks[key]
+                    if result is not None:
+                        semantic_data[key] = result
                 semantic_data.update(document_presence_data)
-                semantic_data['critical_lab_values'] = await loop.run_in_executor(
-                    None,
-                    extract_critical_lab_values,
-                    vectordb, page_doc_list
-                )
-                # Try simple medical records extraction
-                simple_mrr = await loop.run_in_executor(
-                    None,
-                    extract_simple_medical_records,
-                    vectordb, page_doc_list
-                )
+                critical_lab_values = await semantic_tasks['critical_lab_values']
+                if critical_lab_values is not None:
+                    semantic_data['critical_lab_values'] = critical_lab_values
+                # Simple medical records extraction is optional
+                simple_mrr = await semantic_tasks['medical_records_review_summary']
                 if simple_mrr:
                     semantic_data['medical_records_review_summary'] = simple_mrr
-            except Exception as e:
-                logger.error(f"Error in semantic extraction for document {document_id}: {e}", exc_info=True)
-            
-            document.progress = 70.0
-            db.commit()
-            
-            # Update progress: 70-80% - Document-Specific Extraction
-            logger.info("Running document-specific data extraction (DRAI, MRR, Plasma Dilution)...")
-            
-            # Extract DRAI using comprehensive extraction (processes ALL pages)
-            from app.services.drai_extraction import extract_drai_comprehensive
-            from app.services.document_specific_extraction import extract_document_specific_data_batched
-            
-            drai_data = {}
-            try:
-                drai_data = await loop.run_in_executor(
-                    None,
-                    extract_drai_comprehensive,
-                    document_id, db, self.llm, page_doc_list
-                )
+                
+                document.progress = 70.0
+                db.commit()
+                
+                # Update progress: 70-80% - Document-Specific Extraction
+                logger.info("Waiting for document-specific data extraction (DRAI, MRR, Plasma Dilution)...")
+                drai_data = await drai_task
                 logger.info(f"DRAI extraction completed for document {document_id}: present={drai_data.get('present', False)}")
-            except Exception as e:
-                logger.error(f"Error in DRAI extraction for document {document_id}: {e}", exc_info=True)
-                drai_data = {'present': False, 'pages': [], 'summary': {}, 'extracted_data': {}}
-            
-            # Extract other document-specific data (MRR, Plasma Dilution, ID Summary)
-            # Note: DRAI is now handled separately, so this call won't extract DRAI
-            document_specific_data = {}
-            try:
-                document_specific_data = await loop.run_in_executor(
-                    None,
-                    extract_document_specific_data_batched,
-                    document_id, vectordb, self.llm, page_doc_list, db
-                )
-            except Exception as e:
-                logger.error(f"Error in document-specific extraction for document {document_id}: {e}", exc_info=True)
+                document_specific_data = await document_specific_task
+            finally:
+                pending = [task for task in background_tasks if not task.done()]
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    await asyncio.gather(*pending, return_exceptions=True)
             
             # Merge DRAI data with other document-specific data
             # DRAI data structure: {'present': bool, 'pages': [], 'summary': {}, 'extracted_data': {}}
@@ -288,8 +393,9 @@ class DocumentProcessingService:
                 # If DRAI not found, ensure empty structure is present
                 document_specific_data['donor_risk_assessment_interview'] = drai_data
             
-            # Merge semantic and document-specific data
-            extracted_data = {**semantic_data, **document_specific_data}
+            # Merge semantic and document-specific data (semantic_data is built locally, so update in place)
+            semantic_data.update(document_specific_data)
+            extracted_data = semantic_data
             
             document.progress = 80.0
             db.commit()
@@ -324,9 +430,6 @@ class DocumentProcessingService:
             
             # Trigger aggregation service with separate session
             # This ensures aggregation doesn't block the main processing flow
-            from app.services.extraction_aggregation import extraction_aggregation_service
-            from app.database.database import SessionLocal
-            
             # Create new session specifically for aggregation
             agg_db = SessionLocal()
             try:
@@ -378,7 +481,6 @@ class DocumentProcessingService:
                         db.refresh(document)
                     else:
                         # Session was closed, create new one for error update
-                        from app.database.database import SessionLocal
                         error_db = SessionLocal()
                         try:
                             error_document = error_db.query(Document).filter(Document.id == document_id).first()
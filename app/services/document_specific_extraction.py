@@ -3,88 +3,18 @@ Document-specific extraction service.
 Extracts DRAI, Medical Records Review, Plasma Dilution, and Infectious Disease Summary in one batched LLM call.
 """
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List
 from sqlalchemy.orm import Session
-from app.services.processing.utils.llm_wrapper import call_llm_with_retry
+from app.services.processing.utils.llm_wrapper import call_llm_with_retry, cache_llm_response
 from app.services.processing.utils.json_parser import safe_parse_llm_json, LLMResponseParseError
+from app.services.processing.utils.retrieval import dedupe_documents, format_page_context, retrieve_for_queries
 
 logger = logging.getLogger(__name__)
 
 
-def extract_document_specific_data_batched(
-    document_id: int,
-    vectordb: Any,
-    llm: Any,
-    page_doc_list: List[Any],
-    db: Session
-) -> Dict[str, Any]:
-    """
-    Extract document-specific data (DRAI, Medical Records Review, Plasma Dilution, Infectious Disease Summary)
-    in a single batched LLM call.
-    
-    Returns:
-        Dictionary matching expected extracted_data structure
-    """
-    try:
-        # Build comprehensive semantic search queries
-        # Note: DRAI is now handled separately by drai_extraction.py, so we only extract:
-        # - Medical Records Review Summary
-        # - Plasma Dilution
-        # - Infectious Disease Testing Summary
-        queries = [
-            # Medical Records Review queries
-            "medical records review summary diagnoses procedures medications",
-            "medical review summary clinical summary patient summary",
-            # Plasma Dilution queries
-            "plasma dilution factor volumes measurements procedures",
-            "plasma dilution calculation volume measurement",
-            # Infectious Disease Testing Summary queries
-            "infectious disease testing summary test results laboratory information",
-            "serology culture test summary infectious disease report"
-        ]
-        
-        # Retrieve relevant chunks using multiple queries
-        all_retrieved_docs = []
-        retriever = vectordb.as_retriever(search_type='similarity', search_kwargs={'k': 15})
-        
-        for query in queries:
-            try:
-                retrieved_docs = retriever.invoke(query)
-                all_retrieved_docs.extend(retrieved_docs)
-            except Exception as e:
-                logger.debug(f"Error retrieving chunks for query '{query}': {e}")
-                continue
-        
-        # Deduplicate by page and content
-        seen = set()
-        unique_docs = []
-        for doc in all_retrieved_docs:
-            doc_key = (doc.metadata.get('page'), doc.page_content[:100])
-            if doc_key not in seen:
-                seen.add(doc_key)
-                unique_docs.append(doc)
-        
-        retrieved_docs = unique_docs[:50]  # Limit to top 50 unique chunks
-        
-        # Also include first 20 pages from page_doc_list for comprehensive coverage
-        context_pages = []
-        for page_doc in page_doc_list[:20]:
-            if hasattr(page_doc, 'page_content'):
-                context_pages.append(page_doc)
-        
-        # Build comprehensive context
-        context_parts = []
-        for doc in retrieved_docs:
-            context_parts.append(f"Page {doc.metadata.get('page', '?')}: {doc.page_content}")
-        for page_doc in context_pages:
-            page_num = getattr(page_doc, 'metadata', {}).get('page', '?')
-            content = getattr(page_doc, 'page_content', '')
-            context_parts.append(f"Page {page_num}: {content}")
-        
-        context = "\n".join(context_parts)
-        
-        # Build comprehensive prompt
-        prompt = f"""You are an expert medical document analyst specializing in donor eligibility assessment. Analyze the provided donor document and extract document-specific information for the following sections:
+# Static instructions and output schema, kept identical across calls so the prompt
+# shares a stable prefix; only the document content at the end varies
+_DOCUMENT_SPECIFIC_PROMPT_PREFIX = """You are an expert medical document analyst specializing in donor eligibility assessment. Analyze the provided donor document and extract document-specific information for the following sections:
 
 CRITICAL INSTRUCTIONS:
 1. Extract ONLY information that is explicitly present in the document
@@ -149,40 +79,40 @@ Return a JSON object with the following structure:
 
 Note: Do NOT include "donor_risk_assessment_interview" in the output - it is handled separately.
 
-{{
-  "medical_records_review_summary": {{
-    "extracted_data": {{
+{
+  "medical_records_review_summary": {
+    "extracted_data": {
       "Diagnoses": [],
       "Procedures": [],
       "Medications": [],
       "Significant_History": []
-    }},
-    "summary": {{
+    },
+    "summary": {
       "Diagnoses": "",
       "Procedures": "",
       "Medications": "",
       "Significant History": ""
-    }}
-  }},
-  "plasma_dilution": {{
-    "extracted_data": {{
+    }
+  },
+  "plasma_dilution": {
+    "extracted_data": {
       "Dilution_Factor": null,
       "Volumes": null,
       "Procedures": null,
       "Measurements": null
-    }},
-    "summary": {{
+    },
+    "summary": {
       "Dilution Factor": "",
       "Volumes": "",
       "Procedures": "",
       "Measurements": ""
-    }}
-  }},
-  "infectious_disease_testing": {{
-    "extracted_data": {{
+    }
+  },
+  "infectious_disease_testing": {
+    "extracted_data": {
       "Test_Results": [],
       "Test_Dates": [],
-      "Laboratory_Information": {{
+      "Laboratory_Information": {
         "testing_laboratory": null,
         "laboratory_address": null,
         "phone": null,
@@ -192,38 +122,109 @@ Note: Do NOT include "donor_risk_assessment_interview" in the output - it is han
         "category": null,
         "ashi": null,
         "client": null
-      }},
-      "Sample_Information": {{
+      },
+      "Sample_Information": {
         "sample_date": null,
         "sample_time": null,
         "sample_type_1": null,
         "sample_type_2": null,
         "report_generated": null
-      }},
+      },
       "Additional_Notes": null
-    }},
-    "summary": {{
+    },
+    "summary": {
       "Test Results": "",
       "Test Dates": "",
       "Laboratory Information": "",
       "Sample Information": "",
       "Additional Notes": ""
-    }}
-  }}
-}}
+    }
+  }
+}
 
 IMPORTANT:
 - Extract ONLY information explicitly present in the document
 - Use null for missing values (not empty strings, not false)
 - For lists, use empty arrays [] if no items found
-- For objects, use empty objects {{}} if no data found
+- For objects, use empty objects {} if no data found
 - Create meaningful summaries that capture the essence of each section
 - Be comprehensive - check all pages and sections
 
-Document content:
-{context}
+"""
+
+
+def _empty_document_specific_result() -> Dict[str, Any]:
+    """Empty structure returned when nothing could be extracted (DRAI is handled separately)."""
+    return {
+        'medical_records_review_summary': {'extracted_data': {}, 'summary': {}},
+        'plasma_dilution': {'extracted_data': {}, 'summary': {}},
+        'infectious_disease_testing': {'extracted_data': {}, 'summary': {}}
+    }
 
-Return only the JSON object, no other text or markdown formatting:"""
+
+def extract_document_specific_data_batched(
+    document_id: int,
+    vectordb: Any,
+    llm: Any,
+    page_doc_list: List[Any],
+    db: Session
+) -> Dict[str, Any]:
+    """
+    Extract document-specific data (DRAI, Medical Records Review, Plasma Dilution, Infectious Disease Summary)
+    in a single batched LLM call.
+    
+    Returns:
+        Dictionary matching expected extracted_data structure
+    """
+    try:
+        # Build comprehensive semantic search queries
+        # Note: DRAI is now handled separately by drai_extraction.py, so we only extract:
+        # - Medical Records Review Summary
+        # - Plasma Dilution
+        # - Infectious Disease Testing Summary
+        queries = [
+            # Medical Records Review queries
+            "medical records review summary diagnoses procedures medications",
+            "medical review summary clinical summary patient summary",
+            # Plasma Dilution queries
+            "plasma dilution factor volumes measurements procedures",
+            "plasma dilution calculation volume measurement",
+            # Infectious Disease Testing Summary queries
+            "infectious disease testing summary test results laboratory information",
+            "serology culture test summary infectious disease report"
+        ]
+        
+        # Retrieve relevant chunks using multiple queries (run concurrently; failed queries are skipped)
+        all_retrieved_docs = [
+            doc
+            for retrieved_docs in retrieve_for_queries(vectordb, queries, k=15, ignore_errors=True)
+            for doc in retrieved_docs
+        ]
+        
+        # Also include first 20 pages from page_doc_list for comprehensive coverage
+        context_pages = []
+        for page_doc in page_doc_list[:20]:
+            if hasattr(page_doc, 'page_content'):
+                context_pages.append(page_doc)
+        
+        # Deduplicate by page and content, skipping chunks contained in one already kept
+        # or in one of the full context pages (those pages are sent in full anyway)
+        retrieved_docs = dedupe_documents(all_retrieved_docs, limit=50, already_included=context_pages)  # Limit to top 50 unique chunks
+        
+        # Build comprehensive context
+        context = format_page_context(retrieved_docs, context_pages)
+        
+        # Nothing to extract from - skip building the prompt and the LLM call
+        if not retrieved_docs and not any(page_doc.page_content.strip() for page_doc in context_pages):
+            logger.info(f"No document content for document-specific extraction in document {document_id}, skipping LLM call")
+            return _empty_document_specific_result()
+        
+        # Build comprehensive prompt (static prefix first, document content last)
+        prompt = (
+            _DOCUMENT_SPECIFIC_PROMPT_PREFIX
+            + f"Document content:\n{context}\n\n"
+            + "Return only the JSON object, no other text or markdown formatting:"
+        )
         
         # Call LLM with longer timeout for comprehensive extraction
         response = call_llm_with_retry(
@@ -232,7 +233,8 @@ Return only the JSON object, no other text or markdown formatting:"""
             max_retries=3,
             base_delay=1.0,
             timeout=120,  # Longer timeout for batched extraction
-            context="document-specific extraction"
+            context="document-specific extraction",
+            use_cache=True
         )
         
         # Parse JSON response
@@ -254,6 +256,7 @@ Return only the JSON object, no other text or markdown formatting:"""
                     'summary': {}
                 })
             }
+            cache_llm_response(llm, prompt, response)
             
             logger.info(f"Successfully extracted document-specific data for document {document_id}")
             return result
@@ -261,18 +264,10 @@ Return only the JSON object, no other text or markdown formatting:"""
         except LLMResponseParseError as e:
             logger.error(f"Failed to parse document-specific extraction response for document {document_id}: {e}")
             # Return empty structure on parse error (DRAI is handled separately)
-            return {
-                'medical_records_review_summary': {'extracted_data': {}, 'summary': {}},
-                'plasma_dilution': {'extracted_data': {}, 'summary': {}},
-                'infectious_disease_testing': {'extracted_data': {}, 'summary': {}}
-            }
+            return _empty_document_specific_result()
         
     except Exception as e:
         logger.error(f"Error in document-specific extraction for document {document_id}: {e}", exc_info=True)
         # Return empty structure on error (DRAI is handled separately)
-        return {
-            'medical_records_review_summary': {'extracted_data': {}, 'summary': {}},
-            'plasma_dilution': {'extracted_data': {}, 'summary': {}},
-            'infectious_disease_testing': {'extracted_data': {}, 'summary': {}}
-        }
+        return _empty_document_specific_result()
 
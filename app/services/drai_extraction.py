@@ -4,89 +4,34 @@ Processes ALL pages and chunks to ensure complete extraction of all questions an
 """
 import logging
 import re
-from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Tuple
 from sqlalchemy.orm import Session
 from collections import defaultdict
 from app.models.document_chunk import DocumentChunk
-from app.services.processing.utils.llm_wrapper import call_llm_with_retry
+from app.services.processing.utils.llm_wrapper import call_llm_with_retry, cache_llm_response
 from app.services.processing.utils.json_parser import safe_parse_llm_json, LLMResponseParseError
 
 logger = logging.getLogger(__name__)
 
+# Max DRAI page batches sent to the LLM at the same time
+MAX_DRAI_BATCH_WORKERS = 4
 
-def identify_drai_pages(chunks_by_page: Dict[int, List[DocumentChunk]]) -> List[int]:
-    """
-    Identify which pages contain DRAI content.
-    
-    Detection criteria:
-    - Contains keywords: "DRAI", "donor risk assessment", "UDRAI"
-    - Contains numbered questions (1., 2., 3., etc.)
-    - Contains Yes/No answer patterns
-    - Contains question-answer pairs
-    
-    Args:
-        chunks_by_page: Dictionary mapping page numbers to lists of DocumentChunk objects
-        
-    Returns:
-        List of page numbers that contain DRAI content
-    """
-    drai_pages = []
-    drai_keywords = [
-        'drai', 'donor risk assessment', 'udrai', 'donor risk interview',
-        'risk assessment interview', 'donor interview', 'donor questionnaire'
-    ]
-    
-    question_patterns = [
-        r'^\d+\.',  # Numbered questions like "1.", "2."
-        r'^\d+[a-z]\.',  # Sub-questions like "3a.", "4b."
-        r'^\d+[a-z]\([i-v]+\)',  # Follow-up questions like "4a(i)", "4a(ii)"
-    ]
-    
-    for page_num, chunks in chunks_by_page.items():
-        # Combine all chunks on this page
-        page_text = " ".join([chunk.chunk_text for chunk in chunks if chunk.chunk_text])
-        page_text_lower = page_text.lower()
-        
-        # Check for DRAI keywords
-        has_drai_keyword = any(keyword in page_text_lower for keyword in drai_keywords)
-        
-        # Check for numbered questions
-        has_numbered_questions = any(re.search(pattern, line, re.MULTILINE) 
-                                   for pattern in question_patterns 
-                                   for line in page_text.split('\n')[:20])  # Check first 20 lines
-        
-        # Check for Yes/No answer patterns
-        has_yes_no = bool(re.search(r'\b(yes|no)\b', page_text_lower))
-        
-        # Check for question-answer patterns (question mark followed by answer)
-        has_qa_pattern = bool(re.search(r'\?[^\?]*\b(yes|no|flint|michigan|unemployed)', page_text_lower))
-        
-        # If page has DRAI indicators, include it
-        if has_drai_keyword or (has_numbered_questions and (has_yes_no or has_qa_pattern)):
-            drai_pages.append(page_num)
-            logger.debug(f"Identified page {page_num} as DRAI page (keywords: {has_drai_keyword}, questions: {has_numbered_questions}, Q&A: {has_qa_pattern})")
-    
-    logger.info(f"Identified {len(drai_pages)} DRAI pages: {sorted(drai_pages)}")
-    return sorted(drai_pages)
+# DRAI page detection (identify_drai_pages runs over every page of the document)
+_DRAI_KEYWORDS = (
+    'drai', 'donor risk assessment', 'udrai', 'donor risk interview',
+    'risk assessment interview', 'donor interview', 'donor questionnaire'
+)
+# Numbered questions like "1.", sub-questions like "3a." and follow-ups like "4a(i)"
+_DRAI_QUESTION_PATTERN = re.compile(r'\d+(?:[a-z]?\.|[a-z]\([i-v]+\))')
+# A Yes/No answer, or a question mark followed by an answer - one alternation so
+# each page is scanned once instead of once per indicator
+_ANSWER_PATTERN = re.compile(r'\b(?:yes|no)\b|\?[^\?]*\b(?:yes|no|flint|michigan|unemployed)')
 
 
-def extract_questions_answers(
-    page_text: str,
-    page_numbers: List[int],
-    llm: Any
-) -> Dict[str, Any]:
-    """
-    Extract questions and answers from DRAI pages using LLM.
-    
-    Args:
-        page_text: Combined text from pages to process
-        page_numbers: List of page numbers being processed
-        llm: LLM instance
-        
-    Returns:
-        Dictionary with extracted questions and answers categorized by type
-    """
-    prompt = f"""You are extracting data from a Donor Risk Assessment Interview (DRAI) form.
+# Static instructions and output example, kept identical across batches so every
+# DRAI call shares a stable prompt prefix; only the page content at the end varies
+_DRAI_PROMPT_PREFIX = """You are extracting data from a Donor Risk Assessment Interview (DRAI) form.
 The form contains numbered questions (1, 2, 3, 3a, 4a, 4a(i), etc.) with answers.
 
 CRITICAL INSTRUCTIONS:
@@ -110,8 +55,8 @@ CATEGORIZATION RULES:
 OUTPUT FORMAT:
 Return a JSON object with the following structure:
 
-{{
-  "Medical_History": {{
+{
+  "Medical_History": {
     "Question_3": "Did she/he* have any health problems due to exposure to toxic substances such as pesticides, lead, mercury, gold, asbestos, agent orange, etc.?",
     "Answer_3": "No",
     "Question_4a": "Did she/he* have a family physician or a specialist?",
@@ -123,15 +68,15 @@ Return a JSON object with the following structure:
     "Question_4a_iii": "Provide any contact information (e.g., name, group, facility, phone number, etc.):",
     "Answer_4a_iii": "Harmony Cares medical Group 810-230-9500",
     ...
-  }},
-  "Social_History": {{
+  },
+  "Social_History": {
     "Question_1": "Where was she/he* born?",
     "Answer_1": "Flint Michigan",
     "Question_2": "What was her/his* occupation?",
     "Answer_2": "unemployed",
     ...
-  }},
-  "Risk_Factors": {{
+  },
+  "Risk_Factors": {
     "Question_20": "In the past 5 years, did she/he* receive medication for a bleeding disorder such as hemophilia?",
     "Answer_20": "No",
     "Question_21": "Did she/he* EVER use or take drugs, such as steroids, cocaine, heroin, amphetamines, or anything NOT prescribed by her/his* doctor?",
@@ -141,12 +86,12 @@ Return a JSON object with the following structure:
     "Question_23": "Was she/he* EVER told by a physician that she/he* had a disease of the brain or a neurological disease such as Alzheimer's Parkinson's",
     "Answer_23": "No",
     ...
-  }},
-  "Additional_Information": {{
+  },
+  "Additional_Information": {
     "Introductory_Text": "I want to advise you of the sensitive and personal nature of some of these questions...",
     ...
-  }}
-}}
+  }
+}
 
 IMPORTANT:
 - Extract ALL questions, including those with "No" answers
@@ -156,10 +101,74 @@ IMPORTANT:
 - If a question has multiple parts or follow-ups, create separate entries for each
 - Be thorough - check all pages provided
 
-Document content (Pages {', '.join(map(str, page_numbers))}):
-{page_text}
+"""
+
 
-Return only the JSON object, no other text or markdown formatting:"""
+def identify_drai_pages(chunks_by_page: Dict[int, List[DocumentChunk]]) -> List[int]:
+    """
+    Identify which pages contain DRAI content.
+    
+    Detection criteria:
+    - Contains keywords: "DRAI", "donor risk assessment", "UDRAI"
+    - Contains numbered questions (1., 2., 3., etc.)
+    - Contains Yes/No answer patterns
+    - Contains question-answer pairs
+    
+    Args:
+        chunks_by_page: Dictionary mapping page numbers to lists of DocumentChunk objects
+        
+    Returns:
+        List of page numbers that contain DRAI content
+    """
+    drai_pages = []
+    
+    for page_num, chunks in chunks_by_page.items():
+        # Combine all chunks on this page
+        page_text = " ".join(chunk.chunk_text for chunk in chunks if chunk.chunk_text)
+        page_text_lower = page_text.lower()
+        
+        # Check for DRAI keywords
+        has_drai_keyword = any(keyword in page_text_lower for keyword in _DRAI_KEYWORDS)
+        
+        # Check for numbered questions at the start of a line (only needed without a keyword)
+        has_numbered_questions = not has_drai_keyword and any(
+            _DRAI_QUESTION_PATTERN.match(line)
+            for line in page_text.split('\n', 20)[:20]  # Check first 20 lines
+        )
+        
+        # Check for Yes/No or question-answer patterns (only needed with numbered questions)
+        has_answers = has_numbered_questions and bool(_ANSWER_PATTERN.search(page_text_lower))
+        
+        # If page has DRAI indicators, include it
+        if has_drai_keyword or has_answers:
+            drai_pages.append(page_num)
+            logger.debug(f"Identified page {page_num} as DRAI page (keywords: {has_drai_keyword}, questions with answers: {has_answers})")
+    
+    logger.info(f"Identified {len(drai_pages)} DRAI pages: {sorted(drai_pages)}")
+    return sorted(drai_pages)
+
+
+def extract_questions_answers(
+    page_text: str,
+    page_numbers: List[int],
+    llm: Any
+) -> Dict[str, Any]:
+    """
+    Extract questions and answers from DRAI pages using LLM.
+    
+    Args:
+        page_text: Combined text from pages to process
+        page_numbers: List of page numbers being processed
+        llm: LLM instance
+        
+    Returns:
+        Dictionary with extracted questions and answers categorized by type
+    """
+    prompt = (
+        _DRAI_PROMPT_PREFIX
+        + f"Document content (Pages {', '.join(map(str, page_numbers))}):\n{page_text}\n\n"
+        + "Return only the JSON object, no other text or markdown formatting:"
+    )
     
     try:
         response = call_llm_with_retry(
@@ -168,7 +177,8 @@ Return only the JSON object, no other text or markdown formatting:"""
             max_retries=3,
             base_delay=1.0,
             timeout=180,  # Longer timeout for comprehensive extraction
-            context=f"DRAI extraction for pages {page_numbers}"
+            context=f"DRAI extraction for pages {page_numbers}",
+            use_cache=True
         )
         
         extracted_data = safe_parse_llm_json(response.content)
@@ -180,6 +190,7 @@ Return only the JSON object, no other text or markdown formatting:"""
             'Risk_Factors': extracted_data.get('Risk_Factors', {}),
             'Additional_Information': extracted_data.get('Additional_Information', {})
         }
+        cache_llm_response(llm, prompt, response)
         
         logger.info(f"Extracted {sum(len(v) for v in result.values())} question-answer pairs from pages {page_numbers}")
         return result
@@ -220,11 +231,10 @@ def process_drai_pages_batch(
     Returns:
         List of extraction results from each batch
     """
-    batch_results = []
-    
     # Process pages in batches with overlap to ensure no questions are split
     overlap = 2  # Overlap 2 pages between batches
     
+    batches = []
     for i in range(0, len(drai_pages), batch_size - overlap):
         batch_pages = drai_pages[i:i + batch_size]
         
@@ -236,7 +246,7 @@ def process_drai_pages_batch(
         for page_num in batch_pages:
             if page_num in chunks_by_page:
                 page_chunks = chunks_by_page[page_num]
-                page_text = "\n".join([chunk.chunk_text for chunk in page_chunks if chunk.chunk_text])
+                page_text = "\n".join(chunk.chunk_text for chunk in page_chunks if chunk.chunk_text)
                 batch_text_parts.append(f"=== PAGE {page_num} ===\n{page_text}")
         
         batch_text = "\n\n".join(batch_text_parts)
@@ -245,16 +255,26 @@ def process_drai_pages_batch(
             logger.warning(f"No text found for batch pages {batch_pages}")
             continue
         
+        batches.append((batch_pages, batch_text))
+    
+    if not batches:
+        return []
+    
+    def _extract_batch(batch: Tuple[List[int], str]) -> Dict[str, Any]:
+        batch_pages, batch_text = batch
         logger.info(f"Processing DRAI batch: pages {batch_pages} ({len(batch_pages)} pages)")
-        
         # Extract questions and answers from this batch
-        batch_result = extract_questions_answers(batch_text, batch_pages, llm)
-        batch_results.append({
+        return {
             'pages': batch_pages,
-            'extracted_data': batch_result
-        })
+            'extracted_data': extract_questions_answers(batch_text, batch_pages, llm)
+        }
     
-    return batch_results
+    # Batches are independent LLM calls, so run them concurrently (the LLM wrapper
+    # caps in-flight requests). executor.map keeps batch order, which merge relies on.
+    if len(batches) == 1:
+        return [_extract_batch(batches[0])]
+    with ThreadPoolExecutor(max_workers=min(MAX_DRAI_BATCH_WORKERS, len(batches))) as executor:
+        return list(executor.map(_extract_batch, batches))
 
 
 def merge_drai_results(batch_results: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -393,7 +413,9 @@ def extract_drai_comprehensive(
         logger.info(f"Starting comprehensive DRAI extraction for document {document_id}")
         
         # Step 1: Get ALL chunks from database, ordered by page and chunk index
-        all_chunks = db.query(DocumentChunk).filter(
+        # (only the text and page columns - rows expose them as attributes like the
+        # ORM objects did, without loading each chunk's embedding vector)
+        all_chunks = db.query(DocumentChunk.page_number, DocumentChunk.chunk_text).filter(
             DocumentChunk.document_id == document_id
         ).order_by(
             DocumentChunk.page_number.asc().nullslast(),
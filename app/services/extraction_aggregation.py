@@ -131,10 +131,9 @@ class ExtractionAggregationService:
                                 elif value:
                                     # Merge nested structures if they're dictionaries
                                     if isinstance(aggregated[key], dict) and isinstance(value, dict):
-                                        # Deep merge for nested dictionaries
-                                        merged = aggregated[key].copy()
-                                        merged.update(value)
-                                        aggregated[key] = merged
+                                        # Merge nested dictionaries in place - values come from a fresh
+                                        # json.loads per document, so nothing else holds a reference
+                                        aggregated[key].update(value)
                                     elif isinstance(aggregated[key], list) and isinstance(value, list):
                                         # Combine lists, removing duplicates
                                         combined = aggregated[key] + value
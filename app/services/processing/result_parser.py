@@ -2,17 +2,23 @@
 Utility to parse and format extraction results from database.
 Updated for criteria-focused system with unified laboratory_results table.
 """
-import json
 import logging
-from typing import Dict, List, Any, Optional
+from operator import itemgetter
+from typing import Dict, Any
 from sqlalchemy.orm import Session
 from app.models.laboratory_result import LaboratoryResult, TestType
 from app.models.criteria_evaluation import CriteriaEvaluation
-from app.models.donor_eligibility import DonorEligibility
 from app.services.file_citation_service import get_file_citations_batch
 
 logger = logging.getLogger(__name__)
 
+# Citations always carry both fields, so the sort/dedup key is extracted in C
+# instead of through a per-element lambda with dict.get lookups
+_citation_sort_key = itemgetter("document_id", "page")
+
+# Bookkeeping keys stored alongside extracted criterion data
+_METADATA_FIELDS = frozenset(['_criterion_name', '_extraction_timestamp'])
+
 
 class ResultParser:
     """Utility class for parsing extraction results."""
@@ -40,6 +46,7 @@ class ResultParser:
             file_names = get_file_citations_batch(document_ids, db)
             
             serology_results = {}
+            serology_citation_keys = {}
             culture_results = []
             
             for result in results:
@@ -67,14 +74,13 @@ class ResultParser:
                     
                     # Add citation if available
                     if citation:
-                        # Check if citation already exists (deduplicate)
+                        # Check if citation already exists (deduplicate on the (document_id, page) key)
                         existing_citations = serology_results[test_name]["citations"]
-                        citation_key = (citation["document_id"], citation["page"])
-                        if not any(c.get("document_id") == citation["document_id"] and c.get("page") == citation["page"] 
-                                   for c in existing_citations):
+                        seen_keys = serology_citation_keys.setdefault(test_name, set())
+                        citation_key = _citation_sort_key(citation)
+                        if citation_key not in seen_keys:
+                            seen_keys.add(citation_key)
                             existing_citations.append(citation)
-                            # Sort citations by document_id and page
-                            existing_citations.sort(key=lambda x: (x.get("document_id", 0), x.get("page", 0)))
                 elif result.test_type == TestType.CULTURE:
                     culture_item = {
                         "test_name": result.test_name,
@@ -102,6 +108,11 @@ class ResultParser:
                     
                     culture_results.append(culture_item)
             
+            # Sort each test's citations by document_id and page once, after all are collected
+            for serology_item in serology_results.values():
+                if len(serology_item["citations"]) > 1:
+                    serology_item["citations"].sort(key=_citation_sort_key)
+            
             return {
                 "serology_results": {
                     "result": serology_results,
@@ -140,16 +151,15 @@ class ResultParser:
         if not extracted_data:
             return False
         
-        metadata_fields = {'_criterion_name', '_extraction_timestamp'}
         for key, value in extracted_data.items():
-            if key not in metadata_fields and value is not None:
-                # Check if value is not empty string, empty list, or empty dict
-                if isinstance(value, str) and value.strip():
-                    return True
-                elif isinstance(value, (list, dict)) and len(value) > 0:
-                    return True
-                elif not isinstance(value, (str, list, dict)):
+            if value is None or key in _METADATA_FIELDS:
+                continue
+            # Strings count when non-blank, lists/dicts when non-empty, anything else always
+            if isinstance(value, str):
+                if value.strip():
                     return True
+            elif not isinstance(value, (list, dict)) or value:
+                return True
         
         return False
     
@@ -201,11 +211,10 @@ class ResultParser:
                 # Add source pages if available and not already present
                 source_pages = extracted_data.get('_source_pages', [])
                 if source_pages:
-                    for page in source_pages:
-                        if page not in criteria_data[criterion_name]["source_pages"]:
-                            criteria_data[criterion_name]["source_pages"].append(page)
-                    # Sort and deduplicate
-                    criteria_data[criterion_name]["source_pages"] = sorted(list(set(criteria_data[criterion_name]["source_pages"])))
+                    # Deduplicate via dict keys, then sort
+                    merged_pages = dict.fromkeys(criteria_data[criterion_name]["source_pages"])
+                    merged_pages.update(dict.fromkeys(source_pages))
+                    criteria_data[criterion_name]["source_pages"] = sorted(merged_pages)
             
             return criteria_data
         except Exception as e:
@@ -3,27 +3,14 @@ Serology utility functions.
 Only parse_test_name_and_method is used in the new system.
 """
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
-
-def parse_test_name_and_method(full_test_name: str):
-    """
-    Parse a full test name to extract the test name and method separately.
-    
-    Args:
-        full_test_name: Full test name as extracted (e.g., "HCV II Antibody Abbott Alinity s CMIA")
-        
-    Returns:
-        Tuple of (test_name, test_method) where:
-        - test_name: Cleaned test name without method (e.g., "HCV II Antibody")
-        - test_method: Method/manufacturer name if found (e.g., "Abbott Alinity s CMIA")
-    """
-    if not full_test_name:
-        return full_test_name, ""
-    
-    # Common manufacturer patterns (order matters - more specific first)
-    manufacturer_patterns = [
+# Common manufacturer patterns (order matters - more specific first)
+_MANUFACTURER_PATTERNS = [
+    (re.compile(pattern, re.IGNORECASE), manufacturer)
+    for pattern, manufacturer in (
         # Specific combinations
         (r'\s+(Grifols\s+Procleix\s+Ultrio\s+Elite\s+Assay\s+NAT)\s*$', 'Grifols Procleix Ultrio Elite Assay NAT'),
         (r'\s+(Abbott\s+Alinity\s+s\s+CMIA)\s*$', 'Abbott Alinity s CMIA'),
@@ -41,27 +28,42 @@ def parse_test_name_and_method(full_test_name: str):
         (r'\s+(Siemens)\s+', 'Siemens'),
         (r'\s+(Bio-Rad)\s+', 'Bio-Rad'),
         (r'\s+(Ortho)\s+', 'Ortho'),
-    ]
-    
-    # Method type patterns
-    method_patterns = [
-        (r'\s+(CMIA|CLIA|EIA|ELISA|IFA|RIA|NAT|PCR|RT-PCR|qPCR)\s*$', None),  # Will extract from match
-        (r'\s+(Chemiluminescent|Enzyme\s+Immunoassay|Immunofluorescence|Radioimmunoassay)\s*$', None),
-    ]
+    )
+]
+
+# Method type patterns
+_METHOD_PATTERNS = [
+    re.compile(r'\s+(CMIA|CLIA|EIA|ELISA|IFA|RIA|NAT|PCR|RT-PCR|qPCR)\s*$', re.IGNORECASE),
+    re.compile(r'\s+(Chemiluminescent|Enzyme\s+Immunoassay|Immunofluorescence|Radioimmunoassay)\s*$', re.IGNORECASE),
+]
+
+
+def parse_test_name_and_method(full_test_name: str):
+    """
+    Parse a full test name to extract the test name and method separately.
     
-    import re
+    Args:
+        full_test_name: Full test name as extracted (e.g., "HCV II Antibody Abbott Alinity s CMIA")
+        
+    Returns:
+        Tuple of (test_name, test_method) where:
+        - test_name: Cleaned test name without method (e.g., "HCV II Antibody")
+        - test_method: Method/manufacturer name if found (e.g., "Abbott Alinity s CMIA")
+    """
+    if not full_test_name:
+        return full_test_name, ""
     
     # Try manufacturer patterns first
-    for pattern, manufacturer in manufacturer_patterns:
-        match = re.search(pattern, full_test_name, re.IGNORECASE)
+    for pattern, manufacturer in _MANUFACTURER_PATTERNS:
+        match = pattern.search(full_test_name)
         if match:
             test_name = full_test_name[:match.start()].strip()
             test_method = match.group(1) if match.groups() else manufacturer
             return test_name, test_method
     
     # Try method patterns
-    for pattern, _ in method_patterns:
-        match = re.search(pattern, full_test_name, re.IGNORECASE)
+    for pattern in _METHOD_PATTERNS:
+        match = pattern.search(full_test_name)
         if match:
             test_name = full_test_name[:match.start()].strip()
             test_method = match.group(1) if match.groups() else match.group(0).strip()
@@ -1,14 +1,21 @@
 import os
-import pandas as pd
+import copy
 import json
+import math
+import hashlib
 import logging
-from langchain.text_splitter import CharacterTextSplitter, RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyMuPDFLoader
-from langchain_community.vectorstores import FAISS
+import shutil
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+import tiktoken
+from langchain.text_splitter import RecursiveCharacterTextSplitter
 # from langchain_core.documents import Document
-from langchain_community.document_loaders import PDFMinerLoader
-from langchain_community.document_loaders import PDFPlumberLoader
 from langchain.schema import Document
+from app.services.processing.utils.llm_config import get_http_client
+from app.services.processing.utils.llm_wrapper import call_api_with_retry
+# PDF loaders and the FAISS vector store are imported where they are used: they pull in
+# pdf/faiss/numpy modules that callers importing only the light helpers don't need
 
 # OCR imports (optional - will fail gracefully if not available)
 try:
@@ -19,21 +26,294 @@ try:
 except ImportError:
     OCR_AVAILABLE = False
 
+# SIMD base64 encoding for OCR page images (optional - falls back to the standard library)
+try:
+    import pybase64
+    PYBASE64_AVAILABLE = True
+except ImportError:
+    PYBASE64_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 # Get the base directory for config files (relative to this file)
 _CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config')
 
+# Chunks sent per embeddings API request, and how many requests run at once.
+# The embeddings client is configured with chunk_size=1, so batching is explicit here.
+EMBEDDING_BATCH_SIZE = 64
+MAX_EMBEDDING_WORKERS = 4
+
+# Pages sent to GPT-4 Vision at once when OCR-ing a scanned PDF, and the most
+# worker processes used to render pages to images
+MAX_OCR_WORKERS = 4
+MAX_OCR_RENDER_WORKERS = 4
+# OCR jobs with fewer pages than this render on one thread instead of starting processes
+OCR_PROCESS_POOL_MIN_PAGES = 8
+# Resolution of the JPEG page images sent for OCR, and of the PNG retry for pages that
+# returned no text (the previous fixed 3x zoom, ~216 DPI)
+OCR_DPI = int(os.getenv("OCR_DPI", "144"))
+OCR_JPEG_QUALITY = 85
+# Render first-pass page images in grayscale: a third of the raw RGB samples to encode
+# and a smaller upload, with the text unchanged. The PNG retry keeps color.
+OCR_GRAYSCALE = os.getenv("OCR_GRAYSCALE", "true").lower() in ("true", "1", "yes")
+OCR_RETRY_DPI = 216
+# When text extraction fails, pages with less PyMuPDF text than this count as having no
+# text layer and are OCR-ed; the rest keep their extracted text
+OCR_PAGE_MIN_CHARS = 50
+# Pages sampled to decide whether a PDF is scanned, so text parsers can be skipped
+OCR_PROBE_PAGES = 4
+# (filename, fitz document) opened by _init_ocr_render_worker in a render worker process
+_render_worker_document = None
+# Bump when the OCR prompt changes so cached page text is not reused
+OCR_PROMPT_VERSION = "1"
+# OCR prompt text is identical for every page and comes before the page image, so the
+# shared prefix is eligible for Azure OpenAI prompt caching (API versions 2024-10-01-preview+)
+_OCR_SYSTEM_PROMPT = "You are an expert at extracting text from medical documents. Extract ALL text from the image, preserving the original structure, formatting, and layout as much as possible. Include all numbers, dates, names, and medical terms exactly as they appear."
+_OCR_USER_PROMPT = "Extract all text from this document page. Preserve the original formatting, line breaks, and structure. Include everything: headers, body text, tables, lists, and any other text content."
+# Message parts shared by every page request, built once rather than per page
+_OCR_SYSTEM_MESSAGE = {"role": "system", "content": _OCR_SYSTEM_PROMPT}
+_OCR_USER_TEXT_PART = {"type": "text", "text": _OCR_USER_PROMPT}
+OCR_DEFAULT_API_VERSION = "2024-10-01-preview"
+
+# Documents with fewer chunks than this keep exact (IndexFlatL2) search. Measured on
+# 3072-d embeddings with one OpenMP thread: ~1ms per query at 2k vectors and ~3ms at
+# 5k, rising to ~20ms at 10k, where approximate search starts to pay off
+FAISS_IVF_MIN_VECTORS = 5000
+# Inverted lists scanned per query on an IVF index (nlist = 4*sqrt(n), so 64 probes
+# scan roughly a fifth of the lists at 5k-10k vectors)
+FAISS_IVF_NPROBE = 64
+# Documents with at least this many chunks get an HNSW graph index instead of IVF:
+# search cost grows ~log(n) rather than with the size of the scanned lists
+FAISS_HNSW_MIN_VECTORS = 10000
+# HNSW graph degree, build-time and query-time candidate list sizes (~99% recall@10)
+FAISS_HNSW_M = 32
+FAISS_HNSW_EF_CONSTRUCTION = 200
+FAISS_HNSW_EF_SEARCH = 64
+# Scalar quantizer type for the IVF and HNSW indexes: 8-bit codes are a quarter of the
+# float32 memory scanned per search (QT_fp16 for closer reconstruction)
+FAISS_SQ_TYPE = "QT_8bit"
+# OpenMP threads per FAISS search. Retrieval already runs queries on a thread pool and
+# each query searches a single vector, so per-search OpenMP teams only oversubscribe cores
+FAISS_OMP_THREADS = 1
+
+# Bump when parsing, chunking or index construction changes so cached indexes are rebuilt
+EMBEDDING_CACHE_VERSION = "8"
+# Page documents stored next to a cached FAISS index
+_CACHED_PAGES_FILE = 'pages.json'
+# SQLite file (in the cache directory) mapping chunk content hashes to embedding vectors
+_CHUNK_EMBEDDING_DB = 'chunk_embeddings.sqlite3'
+# Keys per SELECT ... IN (...) query, below SQLite's bound-parameter limit
+_CHUNK_EMBEDDING_LOOKUP_BATCH = 500
+
+# PyMuPDF extracts plain page text several times faster than pdfplumber, which
+# builds character/edge layouts meant for table extraction
+DEFAULT_PDF_PARSER = 'pymupdf'
+# All text parsers, in fallback preference order
+_PDF_PARSERS = ('pymupdf', 'pdfplumber', 'pdfminer')
+
+# Chunks shorter than this (after stripping) are dropped before embedding
+MIN_CHUNK_CHARS = 10
+
+# Splitter settings never change, so one instance (and its tiktoken encoder) is shared
+# by every PDF load. Chunks are measured in embedding-model tokens, so none exceed the
+# model's input budget, and split on paragraph/line/sentence boundaries before spaces.
+# ~750 tokens is about the size of the previous 3000-character chunks.
+CHUNK_SIZE_TOKENS = 750
+
+
+@lru_cache(maxsize=1)
+def _get_token_encoding():
+    """Load the cl100k encoding on first use (tiktoken may download it), not at import."""
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def _token_count(text):
+    """Count cl100k tokens; special-token strings in PDF text are counted as plain text."""
+    return len(_get_token_encoding().encode(text, disallowed_special=()))
+
 
+@lru_cache(maxsize=2048)
+def _cached_token_count(text):
+    """Memoized _token_count; the splitter measures each piece when recursing and again when merging."""
+    return _token_count(text)
 
 
-def extract_text_with_ocr(filename, llm=None):
+_TEXT_SPLITTER = RecursiveCharacterTextSplitter(
+    chunk_size=CHUNK_SIZE_TOKENS,
+    chunk_overlap=64,
+    separators=["\n\n", "\n", ". ", " ", ""],
+    length_function=_cached_token_count
+)
+
+
+def _split_pages(page_docs):
+    '''
+    Split page documents into chunk documents.
+    
+    A page that already fits in one chunk becomes that chunk directly; the splitter
+    would only cut it at every separator, count each piece and join them back up.
+    Longer pages go through _TEXT_SPLITTER.
+    '''
+    for doc in page_docs:
+        text = doc.page_content
+        if _token_count(text) <= CHUNK_SIZE_TOKENS:
+            text = text.strip()
+            if text:
+                yield Document(page_content=text, metadata=copy.deepcopy(doc.metadata))
+        else:
+            yield from _TEXT_SPLITTER.split_documents([doc])
+
+
+def _init_ocr_render_worker(filename):
+    """Open the PDF once per render worker process instead of once per page."""
+    global _render_worker_document
+    _render_worker_document = (filename, fitz.open(filename))
+
+
+def _render_page_for_ocr(filename, page_num, dpi=None):
+    """
+    Render a PDF page to an image data URL for the Vision model.
+    
+    Runs in a render worker, so it uses the worker's own document handle (fitz
+    documents cannot be shared across processes or threads) and returns only the
+    encoded string.
+    
+    Args:
+        filename: Path to PDF file
+        page_num: 0-based page index
+        dpi: Render resolution; None uses OCR_DPI as a JPEG, anything else renders a
+            lossless PNG (used to retry pages the smaller image failed on)
+    
+    Returns:
+        "data:image/...;base64,..." URL
+    """
+    if _render_worker_document is not None and _render_worker_document[0] == filename:
+        return _encode_page_for_ocr(_render_worker_document[1][page_num], dpi)
+    with fitz.open(filename) as pdf_document:
+        return _encode_page_for_ocr(pdf_document[page_num], dpi)
+
+
+def _encode_page_for_ocr(page, dpi):
+    """Rasterize a fitz page and return it as an image data URL (see _render_page_for_ocr)."""
+    zoom = (dpi or OCR_DPI) / 72
+    colorspace = fitz.csGRAY if dpi is None and OCR_GRAYSCALE else fitz.csRGB
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=colorspace)
+    if dpi is None:
+        # JPEG at ~150 DPI is several times smaller than PNG at 216 DPI; upload time
+        # and image tokens both scale with the payload
+        mime_type, img_bytes = "image/jpeg", pix.tobytes("jpeg", jpg_quality=OCR_JPEG_QUALITY)
+    else:
+        mime_type, img_bytes = "image/png", pix.tobytes("png")
+    if PYBASE64_AVAILABLE:
+        img_base64 = pybase64.b64encode_as_string(img_bytes)
+    else:
+        img_base64 = base64.b64encode(img_bytes).decode('ascii')
+    return f"data:{mime_type};base64,{img_base64}"
+
+
+@lru_cache(maxsize=4)
+def _get_ocr_client(api_key, api_base, api_version):
+    """Return a shared Azure OpenAI client for the given credentials (clients are thread-safe)."""
+    return AzureOpenAI(
+        api_key=api_key,
+        api_version=api_version,
+        azure_endpoint=api_base,
+        http_client=get_http_client(),
+        max_retries=0  # call_api_with_retry paces retries for OCR requests
+    )
+
+
+def _ocr_cache_path(cache_dir, deployment_name, image_url):
+    """Build the cache file for a page image's OCR text from a hash of the image and prompt version."""
+    digest = hashlib.sha256()
+    digest.update(f"{OCR_PROMPT_VERSION}|{deployment_name}|".encode('utf-8'))
+    digest.update(image_url.encode('utf-8'))
+    return os.path.join(cache_dir, f"{digest.hexdigest()[:32]}.txt")
+
+
+def _ocr_page_image(client, deployment_name, page_num, image_url, cache_dir=None):
+    """
+    Extract the text of one rendered page with GPT-4 Vision.
+    
+    If cache_dir is set, text is cached there keyed by the rendered image, so
+    re-processing the same PDF skips the Vision calls.
+    
+    Returns:
+        Extracted text, or None if the call failed or returned nothing
+    """
+    cache_path = _ocr_cache_path(cache_dir, deployment_name, image_url) if cache_dir else None
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                logger.debug(f"Using cached OCR text for page {page_num + 1}")
+                return f.read()
+        except Exception as e:
+            logger.warning(f"Could not read cached OCR text {cache_path}: {e}")
+    
+    try:
+        response = call_api_with_retry(
+            client.chat.completions.create,
+            context=f"OCR page {page_num + 1}",
+            model=deployment_name,
+            messages=[
+                _OCR_SYSTEM_MESSAGE,
+                {
+                    "role": "user",
+                    "content": [
+                        _OCR_USER_TEXT_PART,
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": image_url
+                            }
+                        }
+                    ]
+                }
+            ],
+            max_tokens=4000,  # Adjust based on expected text length
+            temperature=0  # Deterministic extraction
+        )
+        text = response.choices[0].message.content.strip()
+        usage = getattr(response, 'usage', None)
+        prompt_details = getattr(usage, 'prompt_tokens_details', None)
+        if prompt_details is not None:
+            logger.debug(
+                f"OCR page {page_num + 1}: {usage.prompt_tokens} prompt tokens, "
+                f"{getattr(prompt_details, 'cached_tokens', 0) or 0} served from the prompt cache"
+            )
+    except Exception as ocr_error:
+        # Other pages continue even if one fails
+        logger.warning(f"OCR failed for page {page_num + 1}: {ocr_error}")
+        return None
+    
+    if text:
+        logger.debug(f"GPT-4 Vision extracted {len(text)} characters from page {page_num + 1}")
+        if cache_path:
+            # Write to a temporary file first so concurrent workers never read a partial entry
+            tmp_path = f"{cache_path}.tmp-{os.getpid()}-{page_num}"
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                os.replace(tmp_path, cache_path)
+            except Exception as e:
+                logger.warning(f"Could not cache OCR text at {cache_path}: {e}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+    else:
+        logger.warning(f"No text extracted from page {page_num + 1} using GPT-4 Vision")
+    return text or None
+
+
+def extract_text_with_ocr(filename, llm=None, cache_dir=None, page_numbers=None):
     """
     Extract text from PDF using Azure OpenAI GPT-4 Vision (for image-based/scanned PDFs).
     
     Args:
         filename: Path to PDF file
-        llm: Optional Azure OpenAI client (will create one if not provided)
+        llm: Optional Azure OpenAI client (a shared client is used if not provided)
+        cache_dir: Directory for OCR text cached by page image hash (None disables)
+        page_numbers: 0-based pages to OCR (None for all pages)
         
     Returns:
         List of Document objects with extracted text
@@ -44,7 +324,7 @@ def extract_text_with_ocr(filename, llm=None):
     # Get Azure OpenAI credentials from environment
     api_key = os.getenv("OPENAI_API_KEY")
     api_base = os.getenv("OPENAI_API_BASE")
-    api_version = os.getenv("OPENAI_API_VERSION", "2023-07-01-preview")
+    api_version = os.getenv("OPENAI_API_VERSION", OCR_DEFAULT_API_VERSION)
     deployment_name = os.getenv("AZURE_OPENAI_CHAT_DEPLOYMENT_NAME", "gpt-4o")
     
     if not api_key or not api_base:
@@ -57,84 +337,77 @@ def extract_text_with_ocr(filename, llm=None):
     page_docs = []
     
     try:
-        # Initialize Azure OpenAI client if not provided
-        if llm is None:
-            client = AzureOpenAI(
-                api_key=api_key,
-                api_version=api_version,
-                azure_endpoint=api_base
-            )
+        # Use the provided OpenAI client if it is one; otherwise the shared client, whose
+        # connection pool keeps connections alive across pages and documents
+        if llm is not None and hasattr(llm, 'chat'):
+            client = llm
         else:
-            # If llm is provided, extract client from it (for LangChain compatibility)
-            # For now, create a new client
-            client = AzureOpenAI(
-                api_key=api_key,
-                api_version=api_version,
-                azure_endpoint=api_base
-            )
+            client = _get_ocr_client(api_key, api_base, api_version)
         
-        # Open PDF with PyMuPDF
-        pdf_document = fitz.open(filename)
+        with fitz.open(filename) as pdf_document:
+            page_count = len(pdf_document)
+        target_pages = list(range(page_count)) if page_numbers is None else [
+            page_num for page_num in page_numbers if 0 <= page_num < page_count
+        ]
         
-        for page_num in range(len(pdf_document)):
-            page = pdf_document[page_num]
-            
-            try:
-                # Convert PDF page to image (PNG format)
-                # Use higher DPI for better OCR accuracy
-                # Matrix(3, 3) = 3x zoom ≈ 216 DPI, good balance of quality and API cost
-                pix = page.get_pixmap(matrix=fitz.Matrix(3, 3))
-                
-                # Convert pixmap to base64-encoded PNG
-                img_bytes = pix.tobytes("png")
-                img_base64 = base64.b64encode(img_bytes).decode('utf-8')
-                
-                # Use GPT-4 Vision to extract text from the image
-                response = client.chat.completions.create(
-                    model=deployment_name,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are an expert at extracting text from medical documents. Extract ALL text from the image, preserving the original structure, formatting, and layout as much as possible. Include all numbers, dates, names, and medical terms exactly as they appear."
-                        },
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "text",
-                                    "text": "Extract all text from this document page. Preserve the original formatting, line breaks, and structure. Include everything: headers, body text, tables, lists, and any other text content."
-                                },
-                                {
-                                    "type": "image_url",
-                                    "image_url": {
-                                        "url": f"data:image/png;base64,{img_base64}"
-                                    }
-                                }
-                            ]
-                        }
-                    ],
-                    max_tokens=4000,  # Adjust based on expected text length
-                    temperature=0  # Deterministic extraction
-                )
+        # Rasterizing and encoding pages is CPU bound, so larger jobs render in worker
+        # processes (each opens the PDF once); small jobs, where process startup would
+        # dominate, render on a single background thread. The Vision calls for a window
+        # of pages run concurrently on threads while the next window renders. Windows
+        # keep only a few page images in memory at a time. Workers are spawned, not
+        # forked: forking the multithreaded server process can copy held locks.
+        page_texts_by_num = {}
+        if len(target_pages) >= OCR_PROCESS_POOL_MIN_PAGES:
+            render_workers = max(1, min(os.cpu_count() or 1, MAX_OCR_RENDER_WORKERS))
+            render_executor = ProcessPoolExecutor(
+                max_workers=render_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_ocr_render_worker,
+                initargs=(filename,)
+            )
+        else:
+            # One thread only: MuPDF must not be used from several threads at once
+            render_executor = ThreadPoolExecutor(max_workers=1)
+        with render_executor, ThreadPoolExecutor(max_workers=MAX_OCR_WORKERS) as ocr_executor:
+            def _ocr_pages(page_nums, dpi=None):
+                windows = [page_nums[start:start + MAX_OCR_WORKERS] for start in range(0, len(page_nums), MAX_OCR_WORKERS)]
                 
-                # Extract text from response
-                text = response.choices[0].message.content.strip()
+                def _submit_renders(window):
+                    return [render_executor.submit(_render_page_for_ocr, filename, page_num, dpi) for page_num in window]
                 
-                if text:  # Only add if text was extracted
-                    page_docs.append(Document(
-                        page_content=text,
-                        metadata={'source': filename, 'page': page_num + 1}
-                    ))
-                    logger.debug(f"GPT-4 Vision extracted {len(text)} characters from page {page_num + 1}")
-                else:
-                    logger.warning(f"No text extracted from page {page_num + 1} using GPT-4 Vision")
+                next_renders = _submit_renders(windows[0]) if windows else []
+                for window_index, window in enumerate(windows):
+                    renders = next_renders
+                    next_renders = _submit_renders(windows[window_index + 1]) if window_index + 1 < len(windows) else []
                     
-            except Exception as ocr_error:
-                logger.warning(f"OCR failed for page {page_num + 1}: {ocr_error}")
-                # Continue with other pages even if one fails
-                continue
+                    page_images = []
+                    for page_num, render in zip(window, renders):
+                        try:
+                            page_images.append((page_num, render.result()))
+                        except Exception as render_error:
+                            logger.warning(f"OCR failed for page {page_num + 1}: {render_error}")
+                    
+                    page_texts = ocr_executor.map(
+                        lambda page_image: _ocr_page_image(client, deployment_name, *page_image, cache_dir=cache_dir),
+                        page_images
+                    )
+                    # executor.map preserves page order
+                    for (page_num, _), text in zip(page_images, page_texts):
+                        page_texts_by_num[page_num] = text
+            
+            _ocr_pages(target_pages)
+            
+            # Retry pages that came back empty with a higher-resolution lossless render
+            retry_pages = [page_num for page_num in target_pages if not page_texts_by_num.get(page_num)]
+            if retry_pages:
+                logger.info(f"Retrying OCR for {len(retry_pages)} pages at {OCR_RETRY_DPI} DPI")
+                _ocr_pages(retry_pages, OCR_RETRY_DPI)
         
-        pdf_document.close()
+        page_docs.extend(
+            Document(page_content=text, metadata={'source': filename, 'page': page_num + 1})
+            for page_num, text in sorted(page_texts_by_num.items())
+            if text  # Only add if text was extracted
+        )
         
         if not page_docs:
             raise ValueError(f"OCR extraction produced no text from PDF: {filename}")
@@ -146,15 +419,115 @@ def extract_text_with_ocr(filename, llm=None):
         raise Exception(f"OCR extraction failed for PDF '{filename}': {str(e)}") from e
 
 
-def data_load(filename, parser_name=None, use_fallback=True):
+def _looks_scanned(pdf_document):
+    '''
+    Cheaply check whether a PDF has no text layer, i.e. is a scanned document.
+    
+    Samples up to OCR_PROBE_PAGES pages spread across the document; it looks scanned
+    if the samples hold fewer than OCR_PAGE_MIN_CHARS characters of text in total and
+    every sampled page contains an image.
+    '''
+    page_count = len(pdf_document)
+    if not page_count:
+        return False
+    sample_pages = sorted({page_count * i // OCR_PROBE_PAGES for i in range(OCR_PROBE_PAGES)})
+    sampled_chars = 0
+    for page_num in sample_pages:
+        page = pdf_document[page_num]
+        if not page.get_images():
+            return False
+        sampled_chars += len(page.get_text().strip())
+        if sampled_chars >= OCR_PAGE_MIN_CHARS:
+            return False
+    return True
+
+
+def _load_pages_with_parser(filename, parser, pdf_document=None):
+    '''
+    Extract page documents from a PDF with one text parser.
+    
+    pdf_document is an already open PyMuPDF document for filename; the pymupdf
+    parser reads it instead of opening the file again.
+    
+    Raises:
+        ValueError: If the parser is unknown or extracts too little text
+    '''
+    logger.info(f"Attempting to extract text using {parser} for {filename}")
+    
+    if parser == "pymupdf":
+        # Read page text with PyMuPDF directly: the LangChain loader also collects
+        # per-page PDF metadata and images that are never used downstream
+        import fitz
+        pdf = pdf_document if pdf_document is not None else fitz.open(filename)
+        try:
+            page_docs = [
+                Document(page_content=page.get_text(), metadata={'source': filename, 'page': num + 1})
+                for num, page in enumerate(pdf)
+            ]
+        finally:
+            if pdf is not pdf_document:
+                pdf.close()
+    elif parser == "pdfminer":
+        from langchain_community.document_loaders import PDFMinerLoader
+        loader = PDFMinerLoader(filename, concatenate_pages=False)
+        # lazy_load yields freshly built page documents (metadata is just source and
+        # page), so page numbers are set in place instead of copying every page
+        page_docs = []
+        for num, doc in enumerate(loader.lazy_load()):
+            doc.metadata['page'] = num + 1
+            doc.metadata.setdefault('source', filename)
+            page_docs.append(doc)
+    elif parser == "pdfplumber":
+        from langchain_community.document_loaders import PDFPlumberLoader
+        loader = PDFPlumberLoader(filename)
+        # PDFPlumberLoader may not preserve page numbers in metadata, so we add them explicitly
+        page_docs = []
+        for num, doc in enumerate(loader.lazy_load()):
+            if doc.metadata is None:
+                doc.metadata = {}
+            doc.metadata['page'] = num + 1  # Ensure page number is set (1-indexed)
+            doc.metadata.setdefault('source', filename)
+            page_docs.append(doc)
+    else:
+        raise ValueError(f"Unknown parser name: {parser}")
+    
+    if not page_docs or len(page_docs) == 0:
+        raise ValueError(f"PDF file appears to be empty or could not be parsed: {filename}")
+    
+    # Check if we got any actual text content (stripping each page once for both checks)
+    total_chars = sum(len(doc.page_content.strip()) for doc in page_docs if doc.page_content)
+    if not total_chars:
+        raise ValueError(f"Parser {parser} extracted no text content from PDF: {filename}")
+    
+    # Check if we got sufficient text content (at least 50 characters per page on average)
+    # This helps detect cases where only a tiny fragment was extracted
+    avg_chars_per_page = total_chars / len(page_docs)
+    
+    if avg_chars_per_page < 50:
+        logger.warning(
+            f"Parser {parser} extracted very little text ({total_chars} chars total, "
+            f"{avg_chars_per_page:.1f} chars/page avg) from PDF: {filename}. "
+            f"This may indicate a scanned/image-based PDF. Will try other parsers or OCR."
+        )
+        raise ValueError(
+            f"Parser {parser} extracted insufficient text content "
+            f"({total_chars} chars, {avg_chars_per_page:.1f} chars/page avg) from PDF: {filename}"
+        )
+    
+    logger.info(f"Successfully extracted text using {parser} ({total_chars} chars, {avg_chars_per_page:.1f} chars/page avg), proceeding with chunking")
+    return page_docs
+
+
+def data_load(filename, parser_name=None, use_fallback=True, cache_dir=None):
     '''
     Loads data from PDF file and chunks it.
     Tries multiple parsers with fallback to OCR if text extraction fails.
     
     Args:
         filename: Path to PDF file
-        parser_name: Preferred parser to try first ('pdfplumber', 'pymupdf', 'pdfminer', or None for auto)
-        use_fallback: If True, tries alternative parsers and OCR if initial parser fails
+        parser_name: Parser to use ('pdfplumber', 'pymupdf', 'pdfminer'), or None to try each in turn
+        use_fallback: If True, falls back to OCR if text extraction fails
+        cache_dir: Base directory for cached OCR text (None disables)
         
     Returns:
         Tuple of (page_docs, chunk_docs)
@@ -163,156 +536,104 @@ def data_load(filename, parser_name=None, use_fallback=True):
     if not os.path.exists(filename):
         raise FileNotFoundError(f"PDF file not found: {filename}")
     
-    # List of parsers to try in order
-    parsers_to_try = []
-    if parser_name:
-        parsers_to_try = [parser_name]
-    else:
-        # Default order: pdfplumber (best for text), pymupdf (good fallback), pdfminer (last resort)
-        parsers_to_try = ['pdfplumber', 'pymupdf', 'pdfminer']
+    # List of parsers to try in order: a named parser alone, otherwise every parser in
+    # the default order: pymupdf (fastest), pdfplumber (good fallback), pdfminer (last resort)
+    parsers_to_try = [parser_name] if parser_name else list(_PDF_PARSERS)
     
+    page_docs = None
     last_error = None
     
-    # Try each parser
-    for parser in parsers_to_try:
+    # The pymupdf parser, the scanned-PDF probe and the OCR fallback's page check all
+    # read the PDF through PyMuPDF; open it once for all of them
+    pdf_document = None
+    if OCR_AVAILABLE and ('pymupdf' in parsers_to_try or use_fallback):
         try:
-            logger.info(f"Attempting to extract text using {parser} for {filename}")
-            
-            if parser == "pymupdf":
-                loader = PyMuPDFLoader(filename)
-                temp_page_docs = loader.load()
-                # PyMuPDFLoader may not preserve page numbers in metadata, so we add them explicitly
-                page_docs = []
-                for num, doc in enumerate(temp_page_docs):
-                    # Preserve existing metadata and ensure page number is set
-                    metadata = doc.metadata.copy() if hasattr(doc, 'metadata') and doc.metadata else {}
-                    metadata['page'] = num + 1  # Ensure page number is set (1-indexed)
-                    metadata['source'] = metadata.get('source', filename)
-                    new_doc = Document(
-                        page_content=doc.page_content,
-                        metadata=metadata
-                    )
-                    page_docs.append(new_doc)
-            elif parser == "pdfminer":
-                loader = PDFMinerLoader(filename, concatenate_pages=False)
-                temp_page_docs = loader.load()
-                page_docs = []
-                for num, doc in enumerate(temp_page_docs):
-                    new_doc = Document(
-                        page_content=doc.page_content, 
-                        metadata={'source': doc.metadata.get('source', filename), 'page': num+1}
-                    )
-                    page_docs.append(new_doc)
-            elif parser == "pdfplumber":
-                loader = PDFPlumberLoader(filename)
-                temp_page_docs = loader.load()
-                # PDFPlumberLoader may not preserve page numbers in metadata, so we add them explicitly
-                page_docs = []
-                for num, doc in enumerate(temp_page_docs):
-                    # Preserve existing metadata and ensure page number is set
-                    metadata = doc.metadata.copy() if hasattr(doc, 'metadata') and doc.metadata else {}
-                    metadata['page'] = num + 1  # Ensure page number is set (1-indexed)
-                    metadata['source'] = metadata.get('source', filename)
-                    new_doc = Document(
-                        page_content=doc.page_content,
-                        metadata=metadata
-                    )
-                    page_docs.append(new_doc)
-            else:
-                raise ValueError(f"Unknown parser name: {parser}")
-            
-            if not page_docs or len(page_docs) == 0:
-                raise ValueError(f"PDF file appears to be empty or could not be parsed: {filename}")
-            
-            # Check if we got any actual text content
-            has_text = any(doc.page_content and doc.page_content.strip() for doc in page_docs)
-            if not has_text:
-                raise ValueError(f"Parser {parser} extracted no text content from PDF: {filename}")
-            
-            # Check if we got sufficient text content (at least 50 characters per page on average)
-            # This helps detect cases where only a tiny fragment was extracted
-            total_chars = sum(len(doc.page_content.strip()) for doc in page_docs if doc.page_content)
-            avg_chars_per_page = total_chars / len(page_docs) if page_docs else 0
-            
-            if avg_chars_per_page < 50:
-                logger.warning(
-                    f"Parser {parser} extracted very little text ({total_chars} chars total, "
-                    f"{avg_chars_per_page:.1f} chars/page avg) from PDF: {filename}. "
-                    f"This may indicate a scanned/image-based PDF. Will try next parser or OCR."
-                )
-                raise ValueError(
-                    f"Parser {parser} extracted insufficient text content "
-                    f"({total_chars} chars, {avg_chars_per_page:.1f} chars/page avg) from PDF: {filename}"
-                )
-            
-            # Successfully extracted text, proceed with chunking
-            logger.info(f"Successfully extracted text using {parser} ({total_chars} chars, {avg_chars_per_page:.1f} chars/page avg), proceeding with chunking")
-            break
-            
+            pdf_document = fitz.open(filename)
         except Exception as e:
-            last_error = e
-            logger.warning(f"Parser {parser} failed for {filename}: {str(e)}")
+            logger.warning(f"Could not open {filename} with PyMuPDF: {e}")
+    
+    try:
+        # Parsers run one at a time and stop at the first success; pdfplumber and
+        # pdfminer are pure Python, so running them side by side would gain nothing
+        for attempt, parser in enumerate(parsers_to_try):
+            try:
+                page_docs = _load_pages_with_parser(filename, parser, pdf_document)
+                break
+            except Exception as e:
+                last_error = e
+                logger.warning(f"Parser {parser} failed for {filename}: {str(e)}")
             
-            # If this was the last parser and fallback is enabled, try OCR
-            if parser == parsers_to_try[-1] and use_fallback:
-                logger.info(f"All text extraction parsers failed, attempting OCR fallback for {filename}")
+            # Other parsers read the same (missing) text layer, so a scanned PDF goes
+            # straight to OCR instead of through more full-document parses
+            if attempt == 0 and len(parsers_to_try) > 1 and use_fallback and pdf_document is not None:
                 try:
-                    page_docs = extract_text_with_ocr(filename)
-                    logger.info(f"OCR successfully extracted text from {filename}")
-                    break
-                except Exception as ocr_error:
-                    # OCR also failed, raise combined error
-                    raise Exception(
-                        f"All extraction methods failed for PDF '{filename}'. "
-                        f"Text parsers failed: {str(last_error)}. "
-                        f"OCR failed: {str(ocr_error)}"
-                    ) from ocr_error
-            elif parser != parsers_to_try[-1]:
-                # Not the last parser, continue to next one
-                continue
-            else:
-                # Last parser and no fallback, raise error
-                raise Exception(f"Failed to load PDF file '{filename}' using {parser}: {str(e)}") from e
-    else:
-        # All parsers failed and OCR wasn't tried or failed
-        if use_fallback and OCR_AVAILABLE:
-            raise Exception(
-                f"All text extraction methods failed for PDF '{filename}'. "
-                f"Last error: {str(last_error)}"
+                    if _looks_scanned(pdf_document):
+                        logger.info(f"{filename} looks like a scanned PDF, skipping fallback text parsers")
+                        break
+                except Exception as e:
+                    logger.debug(f"Scanned PDF probe failed for {filename}: {e}")
+        
+        if page_docs is None:
+            if not use_fallback:
+                raise Exception(f"Failed to load PDF file '{filename}': {str(last_error)}") from last_error
+            
+            # All text parsers failed, try OCR. Only pages without a text layer go to the
+            # Vision model; pages that do have text keep PyMuPDF's text.
+            text_docs = []
+            ocr_pages = None  # None OCRs every page
+            if pdf_document is not None:
+                ocr_pages = []
+                for num, page in enumerate(pdf_document):
+                    text = page.get_text()
+                    if len(text.strip()) < OCR_PAGE_MIN_CHARS:
+                        ocr_pages.append(num)
+                    else:
+                        text_docs.append(Document(page_content=text, metadata={'source': filename, 'page': num + 1}))
+            logger.info(
+                f"All text extraction parsers failed, attempting OCR fallback for "
+                f"{'all' if ocr_pages is None else len(ocr_pages)} pages of {filename}"
             )
-        else:
-            raise Exception(f"Failed to load PDF file '{filename}': {str(last_error)}") from last_error
-    
-    # Chunk the documents
-    text_splitter = CharacterTextSplitter(
-        separator=" ",
-        chunk_size=3000,
-        chunk_overlap=250
-    )
-    chunk_docs = text_splitter.split_documents(page_docs)
+            try:
+                ocr_docs = []
+                if ocr_pages is None or ocr_pages:
+                    ocr_docs = extract_text_with_ocr(
+                        filename,
+                        cache_dir=os.path.join(cache_dir, 'ocr') if cache_dir else None,
+                        page_numbers=ocr_pages
+                    )
+                page_docs = sorted(text_docs + ocr_docs, key=lambda doc: doc.metadata['page'])
+                logger.info(f"OCR successfully extracted text from {filename}")
+            except Exception as ocr_error:
+                # OCR also failed, raise combined error
+                raise Exception(
+                    f"All extraction methods failed for PDF '{filename}'. "
+                    f"Text parsers failed: {str(last_error)}. "
+                    f"OCR failed: {str(ocr_error)}"
+                ) from ocr_error
+    finally:
+        if pdf_document is not None:
+            pdf_document.close()
     
-    # Verify metadata preservation and ensure page numbers are set
-    # CharacterTextSplitter should preserve metadata, but let's verify
+    # Chunk the documents, dropping empty/very short chunks (they cause embedding API
+    # issues) and checking page metadata in the same pass
+    # The splitter should preserve metadata, but let's verify
+    chunk_docs = []
     chunks_with_pages = 0
     chunks_without_pages = 0
-    for chunk_doc in chunk_docs:
-        if hasattr(chunk_doc, 'metadata') and chunk_doc.metadata and 'page' in chunk_doc.metadata:
+    for chunk_doc in _split_pages(page_docs):
+        if not chunk_doc.page_content or len(chunk_doc.page_content.strip()) < MIN_CHUNK_CHARS:
+            continue
+        chunk_docs.append(chunk_doc)
+        if chunk_doc.metadata and 'page' in chunk_doc.metadata:
             chunks_with_pages += 1
         else:
             chunks_without_pages += 1
     
     if chunks_without_pages > 0:
         logger.warning(f"PDF {filename}: {chunks_without_pages} chunks created without page metadata. This may indicate metadata is not being preserved during chunking.")
-        # Try to infer page numbers from original page_docs if metadata is missing
-        # This is a fallback - ideally CharacterTextSplitter should preserve metadata
-        logger.info(f"Attempting to restore page metadata for chunks...")
-        # Note: This is complex to do retroactively, so we'll log it for now
     
     logger.info(f"Chunked {len(page_docs)} pages into {len(chunk_docs)} chunks ({chunks_with_pages} with page metadata, {chunks_without_pages} without)")
     
-    # Filter out empty chunks (can cause embedding issues)
-    chunk_docs = [doc for doc in chunk_docs if doc.page_content and doc.page_content.strip()]
-    
     if not chunk_docs or len(chunk_docs) == 0:
         raise ValueError(f"PDF file produced no valid text chunks after splitting: {filename}")
     
@@ -320,12 +641,264 @@ def data_load(filename, parser_name=None, use_fallback=True):
     return page_docs, chunk_docs
     
 
-def get_embeddings(filename, chunk_docs, embeddings, save_embeddings=False, embeddings_dir='Embeddings'):
+def embed_texts(texts, embeddings, batch_size=EMBEDDING_BATCH_SIZE, as_array=False):
+    '''
+    Embed texts in batches, sending several texts per embeddings API request.
+    
+    Batches run concurrently on a small thread pool; vectors are returned in
+    the same order as texts. With as_array=True each batch is copied into one
+    preallocated float32 matrix as it arrives, so the whole document is never
+    held as Python lists of floats.
+    '''
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    
+    def _embed_batch(batch):
+        return call_api_with_retry(
+            embeddings.embed_documents, batch,
+            context=f"embedding {len(batch)} texts",
+            chunk_size=len(batch)
+        )
+    
+    if not as_array:
+        if len(batches) <= 1:
+            return _embed_batch(texts) if texts else []
+        
+        with ThreadPoolExecutor(max_workers=min(MAX_EMBEDDING_WORKERS, len(batches))) as executor:
+            return [vector for batch_vectors in executor.map(_embed_batch, batches) for vector in batch_vectors]
+    
+    import numpy as np
+    
+    matrix = None
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_EMBEDDING_WORKERS, len(batches)))) as executor:
+        # executor.map yields batches in order, so batch i fills rows from offset i * batch_size
+        for batch_num, batch_vectors in enumerate(executor.map(_embed_batch, batches)):
+            if matrix is None:
+                matrix = np.empty((len(texts), len(batch_vectors[0])), dtype='float32')
+            offset = batch_num * batch_size
+            matrix[offset:offset + len(batch_vectors)] = batch_vectors
+    return matrix if matrix is not None else np.empty((0, 0), dtype='float32')
+
+
+def embed_texts_cached(texts, embeddings, cache_dir=None):
+    '''
+    Embed texts into a float32 matrix, reusing vectors cached by text content.
+    
+    Vectors are stored in a SQLite table under cache_dir keyed by a hash of the
+    embedding model and the text, so chunks repeated within a PDF or shared with
+    previously processed PDFs (e.g. the same donor's forms) are embedded once.
+    Only the misses go to the embeddings API. Without cache_dir, or if the cache
+    can't be used, this is embed_texts(..., as_array=True).
+    '''
+    if not cache_dir or not texts:
+        return embed_texts(texts, embeddings, as_array=True)
+    
+    import sqlite3
+    import numpy as np
+    
+    model = getattr(embeddings, 'deployment', None) or getattr(embeddings, 'model', None) or ''
+    prefix = f"{model}|".encode('utf-8')
+    keys = [hashlib.blake2b(prefix + text.encode('utf-8'), digest_size=16).hexdigest() for text in texts]
+    
+    conn = None
+    cached = {}
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(cache_dir, _CHUNK_EMBEDDING_DB), timeout=30)
+        # WAL lets concurrent document workers read while another one writes
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS chunk_embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)')
+        unique_keys = list(dict.fromkeys(keys))
+        for start in range(0, len(unique_keys), _CHUNK_EMBEDDING_LOOKUP_BATCH):
+            batch = unique_keys[start:start + _CHUNK_EMBEDDING_LOOKUP_BATCH]
+            cached.update(conn.execute(
+                f"SELECT key, vector FROM chunk_embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                batch
+            ))
+    except Exception as e:
+        logger.warning(f"Could not read chunk embedding cache in {cache_dir}: {e}")
+        if conn is not None:
+            conn.close()
+        return embed_texts(texts, embeddings, as_array=True)
+    
+    try:
+        # Embed each missing text once, even if it repeats within the document
+        miss_positions = {}
+        for position, key in enumerate(keys):
+            if key not in cached and key not in miss_positions:
+                miss_positions[key] = position
+        miss_vectors = embed_texts([texts[position] for position in miss_positions.values()], embeddings, as_array=True)
+        logger.info(f"Chunk embedding cache: {len(texts) - len(miss_positions)} of {len(texts)} chunks cached")
+        
+        miss_rows = {key: row for row, key in enumerate(miss_positions)}
+        dimension = miss_vectors.shape[1] if miss_positions else len(cached[keys[0]]) // 4
+        matrix = np.empty((len(texts), dimension), dtype='float32')
+        for position, key in enumerate(keys):
+            if key in miss_rows:
+                matrix[position] = miss_vectors[miss_rows[key]]
+            else:
+                matrix[position] = np.frombuffer(cached[key], dtype='float32')
+        
+        if miss_positions:
+            try:
+                with conn:
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO chunk_embeddings (key, vector) VALUES (?, ?)',
+                        [(key, miss_vectors[row].tobytes()) for key, row in miss_rows.items()]
+                    )
+            except Exception as e:
+                logger.warning(f"Could not write chunk embedding cache in {cache_dir}: {e}")
+        return matrix
+    finally:
+        conn.close()
+
+
+def get_chunk_vectors(vectordb, chunk_docs, embeddings, cache_dir=None):
+    '''
+    Return the exact embedding vector of each chunk.
+    
+    get_embeddings adds chunks to the index in order, so position i holds chunk_docs[i].
+    Vectors are only read back from an exact flat index; quantized indexes (float16,
+    8-bit, IVF or HNSW) would return approximations. Otherwise the chunks are embedded
+    again through the chunk embedding cache in cache_dir, which normally holds them.
+    
+    Returns:
+        List of vectors (lists of floats) in the same order as chunk_docs
+    '''
+    index = getattr(vectordb, 'index', None)
+    if index is not None and index.ntotal == len(chunk_docs):
+        try:
+            import faiss
+            
+            if isinstance(index, faiss.IndexFlat):
+                return index.reconstruct_n(0, index.ntotal).tolist()
+        except Exception as e:
+            logger.warning(f"Could not read chunk vectors from FAISS index, re-embedding: {e}")
+    return embed_texts_cached([doc.page_content for doc in chunk_docs], embeddings, cache_dir).tolist()
+
+
+@lru_cache(maxsize=1)
+def configure_faiss():
+    '''
+    Apply process-wide FAISS settings once, before the first index is built or loaded.
+    '''
+    try:
+        import faiss
+        faiss.omp_set_num_threads(FAISS_OMP_THREADS)
+    except Exception as e:
+        logger.warning(f"Could not configure FAISS threads: {e}")
+
+
+def _build_faiss_index(xb):
+    '''
+    Build the FAISS index for a document's float32 embedding matrix.
+    
+    Documents below FAISS_IVF_MIN_VECTORS get an exact flat index. Very large
+    documents get an HNSW graph index and large ones an IVF index; both store
+    FAISS_SQ_TYPE codes. Rows are added in order, so vector i is chunk i.
+    If a compact index can't be built the exact flat index is used.
+    '''
+    import faiss
+    
+    n_vectors, dimension = xb.shape
+    if n_vectors >= FAISS_IVF_MIN_VECTORS:
+        try:
+            qtype = getattr(faiss.ScalarQuantizer, FAISS_SQ_TYPE)
+            if n_vectors >= FAISS_HNSW_MIN_VECTORS:
+                index = faiss.IndexHNSWSQ(dimension, qtype, FAISS_HNSW_M)
+                index.hnsw.efConstruction = FAISS_HNSW_EF_CONSTRUCTION
+                index.hnsw.efSearch = FAISS_HNSW_EF_SEARCH
+                description = f"HNSW {FAISS_SQ_TYPE} index (M={FAISS_HNSW_M}, efSearch={FAISS_HNSW_EF_SEARCH})"
+            else:
+                nlist = max(1, int(4 * math.sqrt(n_vectors)))
+                quantizer = faiss.IndexFlatL2(dimension)
+                index = faiss.IndexIVFScalarQuantizer(quantizer, dimension, nlist, qtype)
+                index.nprobe = min(FAISS_IVF_NPROBE, nlist)
+                description = f"IVF {FAISS_SQ_TYPE} index (nlist={nlist}, nprobe={index.nprobe})"
+            index.train(xb)
+            index.add(xb)
+            logger.info(f"Using {description} for {n_vectors} chunks")
+            return index
+        except Exception as e:
+            logger.warning(f"Could not build compact index, using flat index: {e}")
+    
+    index = faiss.IndexFlatL2(dimension)
+    index.add(xb)
+    return index
+
+
+def _embedding_cache_path(filename, embeddings, parser_name, cache_dir):
+    '''
+    Build the cache directory for a PDF's pages and FAISS index from a hash of its content.
+    
+    The key also covers the embedding model, parser and EMBEDDING_CACHE_VERSION
+    so a changed model, parser or chunking never reuses a stale index.
+    '''
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    model = getattr(embeddings, 'deployment', None) or getattr(embeddings, 'model', None) or ''
+    digest.update(f"|{EMBEDDING_CACHE_VERSION}|{model}|{parser_name}".encode('utf-8'))
+    return os.path.join(cache_dir, digest.hexdigest()[:32])
+
+
+def _load_cached_document(cache_path, embeddings):
+    '''
+    Load a PDF's page documents, chunk documents and FAISS index from the cache.
+    
+    Chunks are read back from the index's docstore in index order, so position i
+    of the returned chunk list still matches vector i of the index.
+    
+    Returns:
+        Tuple of (page_docs, chunk_docs, vectordb), or None if nothing is cached
+    '''
+    pages_path = os.path.join(cache_path, _CACHED_PAGES_FILE)
+    if not (os.path.exists(os.path.join(cache_path, 'index.faiss')) and os.path.exists(pages_path)):
+        return None
+    
+    from langchain_community.vectorstores import FAISS
+    configure_faiss()
+    
+    # The cache directory is written only by this service
+    vectordb = FAISS.load_local(cache_path, embeddings, allow_dangerous_deserialization=True)
+    with open(pages_path, 'r', encoding='utf-8') as f:
+        page_docs = [Document(page_content=page['page_content'], metadata=page['metadata']) for page in json.load(f)]
+    chunk_docs = [
+        vectordb.docstore.search(vectordb.index_to_docstore_id[position])
+        for position in range(vectordb.index.ntotal)
+    ]
+    return page_docs, chunk_docs, vectordb
+
+
+def _save_index_to_cache(vectordb, page_docs, cache_path):
+    '''
+    Save a PDF's FAISS index and page documents into the cache, writing to a temporary
+    directory first so concurrent workers never see a partially written entry.
+    '''
+    tmp_path = f"{cache_path}.tmp-{os.getpid()}"
+    try:
+        vectordb.save_local(tmp_path)
+        with open(os.path.join(tmp_path, _CACHED_PAGES_FILE), 'w', encoding='utf-8') as f:
+            json.dump([{'page_content': doc.page_content, 'metadata': doc.metadata} for doc in page_docs], f, default=str)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        # e.g. another worker cached the same file first
+        logger.warning(f"Could not cache FAISS index at {cache_path}: {e}")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def get_embeddings(filename, chunk_docs, embeddings, save_embeddings=False, embeddings_dir='Embeddings', cache_dir=None, return_vectors=False):
     '''
     Creates embeddings and optionally saves them locally
+    
+    If cache_dir is set, chunk vectors are reused from the content-hash cache there
+    (see embed_texts_cached) and only new chunks are sent to the embeddings API.
+    With return_vectors=True the exact float32 vector matrix (row i is the i-th valid
+    chunk) is returned as a third element, since quantized indexes can't give it back.
     '''
-    import logging
-    logger = logging.getLogger(__name__)
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+    configure_faiss()
     
     # Validate inputs
     if embeddings is None:
@@ -334,14 +907,19 @@ def get_embeddings(filename, chunk_docs, embeddings, save_embeddings=False, embe
     if not chunk_docs or len(chunk_docs) == 0:
         raise ValueError(f"No document chunks to embed for file: {filename}")
     
-    # Filter out empty or very short chunks (can cause embedding API issues)
+    # Filter out empty or very short chunks (can cause embedding API issues) while
+    # collecting texts and size statistics in the same pass.
+    # data_load already drops these, so the filter only matters for other callers.
     valid_chunks = []
+    texts = []
+    total_chars = 0
     for doc in chunk_docs:
-        content = doc.page_content.strip() if doc.page_content else ""
-        # Skip chunks that are too short (less than 10 characters)
-        # These often cause issues with embedding APIs
-        if len(content) >= 10:
-            valid_chunks.append(doc)
+        content = doc.page_content
+        if not content or len(content.strip()) < MIN_CHUNK_CHARS:
+            continue
+        valid_chunks.append(doc)
+        texts.append(content)
+        total_chars += len(content)
     
     if not valid_chunks:
         raise ValueError(f"PDF '{filename}' has no valid chunks to embed (all chunks are empty or too short)")
@@ -350,22 +928,34 @@ def get_embeddings(filename, chunk_docs, embeddings, save_embeddings=False, embe
         logger.warning(f"Filtered out {len(chunk_docs) - len(valid_chunks)} empty/short chunks from {filename}")
     
     # Log chunk statistics for debugging
-    total_chars = sum(len(doc.page_content) for doc in valid_chunks)
-    avg_chunk_size = total_chars / len(valid_chunks) if valid_chunks else 0
+    avg_chunk_size = total_chars / len(valid_chunks)
     logger.info(f"Creating embeddings for {filename}: {len(valid_chunks)} chunks, avg size: {avg_chunk_size:.0f} chars")
     
     try:
-        # FAISS.from_documents will call the embedding API for each chunk
+        # Embed chunks in batched API requests, then build the index from the vectors
         # This can fail for large PDFs or if there are API rate limits
-        vectordb = FAISS.from_documents(documents = valid_chunks, embedding = embeddings)
+        # Vectors go straight from the API batches into one float32 matrix and from
+        # there into the index, instead of via lists that FAISS.from_embeddings copies
+        xb = embed_texts_cached(texts, embeddings, cache_dir)
+        vectordb = FAISS(
+            embedding_function=embeddings,
+            index=_build_faiss_index(xb),
+            # The docstore holds the chunk documents themselves rather than copies, so
+            # the chunk list returned by processing_dc adds no memory on top of the index
+            docstore=InMemoryDocstore({str(i): doc for i, doc in enumerate(valid_chunks)}),
+            index_to_docstore_id={i: str(i) for i in range(len(valid_chunks))}
+        )
         
         if save_embeddings:
             em_dir_name = os.path.basename(filename).replace('.pdf','').replace(' ','_')
             embeddings_path = os.path.join(embeddings_dir, em_dir_name)
             os.makedirs(embeddings_path, exist_ok=True)
             vectordb.save_local(embeddings_path)
-            return vectordb, em_dir_name
-        return vectordb, None
+        else:
+            em_dir_name = None
+        if return_vectors:
+            return vectordb, em_dir_name, xb
+        return vectordb, em_dir_name
     except Exception as e:
         # Re-raise with more context about what failed
         error_msg = f"Failed to create embeddings for PDF '{filename}' ({len(valid_chunks)} chunks): {str(e)}"
@@ -398,7 +988,7 @@ def delete_pdf(file_path):
         print(f"Error deleting {file_path}: {str(e)}")
 
 
-def processing_dc(file_path, embeddings, save_embeddings=False, delete_after=False):
+def processing_dc(file_path, embeddings, save_embeddings=False, delete_after=False, cache_dir=None, parser_name=DEFAULT_PDF_PARSER):
     """
     Process PDF: load, chunk, and create embeddings.
     
@@ -407,9 +997,17 @@ def processing_dc(file_path, embeddings, save_embeddings=False, delete_after=Fal
         embeddings: Embeddings instance (must not be None)
         save_embeddings: Whether to save embeddings to disk
         delete_after: Whether to delete PDF after processing
+        cache_dir: Directory for pages and FAISS indexes cached by PDF content hash,
+            chunk embeddings cached by chunk text, and OCR text under its "ocr"
+            subdirectory (None disables). A cached PDF skips parsing, OCR and the
+            embeddings API entirely; a new PDF only embeds chunks not seen before.
+        parser_name: PDF text parser to use ('pymupdf', 'pdfplumber', 'pdfminer')
         
     Returns:
-        Tuple of (page_doc_list, doc_list, vectordb)
+        Tuple of (page_doc_list, doc_list, vectordb, chunk_vectors). doc_list holds the
+        same Document objects as the vectordb docstore, so it must be treated as
+        read-only. chunk_vectors holds the exact embedding of each chunk (lists of
+        floats, in doc_list order), for storing alongside the chunks.
         
     Raises:
         Exception: If PDF loading, chunking, or embedding creation fails
@@ -418,16 +1016,41 @@ def processing_dc(file_path, embeddings, save_embeddings=False, delete_after=Fal
     if embeddings is None:
         raise ValueError("Embeddings object is None. Check embedding deployment configuration in .env file.")
     
-    # Chunk & Create Embeddings
-    # data_load will try multiple parsers and fallback to OCR if needed
-    # It will raise an exception if all methods fail, which will be caught by the caller
-    page_doc_list, doc_list = data_load(file_path, parser_name='pdfplumber', use_fallback=True)
+    cache_path = None
+    cached = None
+    if cache_dir:
+        try:
+            cache_path = _embedding_cache_path(file_path, embeddings, parser_name, cache_dir)
+            cached = _load_cached_document(cache_path, embeddings)
+            if cached is not None:
+                logger.info(f"Loaded cached pages and FAISS index for {file_path} from {cache_path}")
+        except Exception as e:
+            logger.warning(f"Could not use embedding cache for {file_path}: {e}")
+            cached = None
     
-    # get_embeddings will raise an exception if it fails, which will be caught by the caller
-    vectordb, em_dir_name = get_embeddings(file_path, doc_list, embeddings, save_embeddings=save_embeddings)
+    if cached is not None:
+        page_doc_list, doc_list, vectordb = cached
+        chunk_vectors = get_chunk_vectors(vectordb, doc_list, embeddings, cache_dir)
+    else:
+        # Chunk & Create Embeddings
+        # data_load will try multiple parsers and fallback to OCR if needed
+        # It will raise an exception if all methods fail, which will be caught by the caller
+        page_doc_list, doc_list = data_load(file_path, parser_name=parser_name, use_fallback=True, cache_dir=cache_dir)
+        
+        # get_embeddings will raise an exception if it fails, which will be caught by the caller
+        vectordb, em_dir_name, xb = get_embeddings(
+            file_path, doc_list, embeddings, save_embeddings=save_embeddings,
+            cache_dir=cache_dir, return_vectors=True
+        )
+        # The index may store quantized vectors, so keep the exact ones for storage
+        chunk_vectors = xb.tolist()
+        del xb
+        if cache_path:
+            os.makedirs(cache_dir, exist_ok=True)
+            _save_index_to_cache(vectordb, page_doc_list, cache_path)
     
     # Optionally delete PDF (for Databricks/DBFS workflows)
     if delete_after:
         delete_pdf(file_path)
 
-    return page_doc_list, doc_list, vectordb
\ No newline at end of file
+    return page_doc_list, doc_list, vectordb, chunk_vectors
\ No newline at end of file
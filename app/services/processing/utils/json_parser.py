@@ -3,13 +3,64 @@ Robust JSON parsing utility for LLM responses.
 Handles various response formats with multiple fallback strategies.
 """
 import json
-import ast
 import re
 import logging
-from typing import Dict, Any, Optional, Union
+from typing import Dict, Any, Optional
+
+# Fast JSON parsing (optional - falls back to the standard library if not available)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Leading ```/```json/```python fence: captures the content up to the closing fence
+_CODE_FENCE_PATTERN = re.compile(r'^```(?:json|python)?(.*?)```', re.DOTALL)
+# Fallback strategy patterns, compiled once instead of on every parse
+_FENCED_JSON_PATTERN = re.compile(r'```(?:json)?\s*(\{.*?\})\s*```', re.DOTALL)
+_NESTED_OBJECT_PATTERN = re.compile(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', re.DOTALL)
+_OUTER_OBJECT_PATTERN = re.compile(r'\{.*\}', re.DOTALL)
+_ARTIFACT_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in (
+        r'^AI Response:\s*',
+        r'^Response:\s*',
+        r'^Output:\s*',
+        r'^Result:\s*',
+        r'Here is.*?:',
+        r'Here\'s.*?:',
+    )
+]
+# Prefixes stripped by _clean_response (matched case-insensitively)
+_RESPONSE_PREFIXES = (
+    "AI Response:",
+    "Response:",
+    "Output:",
+    "Result:",
+    "Here is the",
+    "Here's the",
+)
+
+
+def _loads(text: str) -> Any:
+    """
+    Parse a JSON string, using orjson when available.
+    
+    orjson is stricter than the json module (e.g. it rejects NaN), so anything it
+    refuses is retried with json.loads before the error is raised.
+    
+    Raises:
+        json.JSONDecodeError: If the text is not valid JSON
+    """
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(text)
+
 
 class LLMResponseParseError(Exception):
     """Custom exception for LLM response parsing errors."""
@@ -36,31 +87,40 @@ def safe_parse_llm_json(response_content: str, context: str = "") -> Dict[str, A
             f"Context: {context}"
         )
     
+    # Fast path: well-behaved responses are bare JSON, so parse them once
+    # without running the cleanup scans below
+    try:
+        return _loads(response_content)
+    except json.JSONDecodeError:
+        pass
+    
     # Strategy 1: Clean and try direct JSON parsing
     cleaned = _clean_response(response_content)
     
     try:
-        return json.loads(cleaned)
+        return _loads(cleaned)
     except json.JSONDecodeError:
         pass
     
     # Strategy 2: Try extracting JSON from markdown code blocks
     try:
-        json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', cleaned, re.DOTALL)
+        json_match = _FENCED_JSON_PATTERN.search(cleaned)
         if json_match:
-            return json.loads(json_match.group(1))
+            return _loads(json_match.group(1))
     except (json.JSONDecodeError, AttributeError):
         pass
     
     # Strategy 3: Try extracting JSON object using regex (more permissive)
     try:
-        json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', cleaned, re.DOTALL)
+        json_match = _NESTED_OBJECT_PATTERN.search(cleaned)
         if json_match:
-            return json.loads(json_match.group(0))
+            return _loads(json_match.group(0))
     except (json.JSONDecodeError, AttributeError):
         pass
     
     # Strategy 4: Try ast.literal_eval for Python dict syntax
+    # (imported here: only reached when every JSON strategy above has failed)
+    import ast
     try:
         result = ast.literal_eval(cleaned)
         if isinstance(result, dict):
@@ -72,31 +132,24 @@ def safe_parse_llm_json(response_content: str, context: str = "") -> Dict[str, A
     try:
         # Remove common prefixes/suffixes
         cleaned_alt = cleaned
-        for pattern in [
-            r'^AI Response:\s*',
-            r'^Response:\s*',
-            r'^Output:\s*',
-            r'^Result:\s*',
-            r'Here is.*?:',
-            r'Here\'s.*?:',
-        ]:
-            cleaned_alt = re.sub(pattern, '', cleaned_alt, flags=re.IGNORECASE)
+        for pattern in _ARTIFACT_PATTERNS:
+            cleaned_alt = pattern.sub('', cleaned_alt)
         
         cleaned_alt = cleaned_alt.strip()
         if cleaned_alt != cleaned:
-            return json.loads(cleaned_alt)
+            return _loads(cleaned_alt)
     except json.JSONDecodeError:
         pass
     
     # Strategy 6: Try lowercasing keys only (not entire response)
     try:
         # Find JSON-like structure and lowercase only keys
-        json_match = re.search(r'\{.*\}', cleaned, re.DOTALL)
+        json_match = _OUTER_OBJECT_PATTERN.search(cleaned)
         if json_match:
             json_str = json_match.group(0)
             # Replace "key": with "key_lower": but keep values intact
             # This is a last resort - may not work for all cases
-            parsed = json.loads(json_str)
+            parsed = _loads(json_str)
             return {k.lower(): v for k, v in parsed.items()}
     except (json.JSONDecodeError, AttributeError, TypeError):
         pass
@@ -123,30 +176,16 @@ def _clean_response(response_content: str) -> str:
     """
     cleaned = response_content.strip()
     
-    # Remove markdown code block markers
-    if cleaned.startswith("```"):
-        # Extract content from code blocks
-        parts = cleaned.split("```")
-        if len(parts) >= 3:
-            # Take the middle part (content between markers)
-            cleaned = parts[1]
-            # Remove language identifier if present
-            if cleaned.startswith("json"):
-                cleaned = cleaned[4:].strip()
-            elif cleaned.startswith("python"):
-                cleaned = cleaned[6:].strip()
-    
-    # Remove common prefixes
-    prefixes = [
-        "AI Response:",
-        "Response:",
-        "Output:",
-        "Result:",
-        "Here is the",
-        "Here's the",
-    ]
-    for prefix in prefixes:
-        if cleaned.lower().startswith(prefix.lower()):
+    # Remove markdown code block markers (and a json/python language identifier)
+    fence_match = _CODE_FENCE_PATTERN.match(cleaned)
+    if fence_match:
+        # Take the content between the first pair of markers
+        cleaned = fence_match.group(1).strip()
+    
+    # Remove common prefixes (only the leading characters are lowercased, not
+    # the whole response once per prefix)
+    for prefix in _RESPONSE_PREFIXES:
+        if cleaned[:len(prefix)].lower() == prefix.lower():
             cleaned = cleaned[len(prefix):].strip()
             # Remove colon if present
             if cleaned.startswith(":"):
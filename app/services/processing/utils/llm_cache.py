@@ -0,0 +1,83 @@
+"""
+In-process cache for LLM responses keyed by a hash of the prompt content.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bump when prompt templates change in a way that should invalidate cached responses
+PROMPT_CACHE_VERSION = "1"
+
+
+class LLMResponseCache:
+    """Thread-safe LRU cache with a per-entry TTL for LLM responses."""
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: int = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(llm: Any, prompt: str) -> str:
+        """
+        Build a cache key from the model deployment, temperature and prompt text.
+
+        Args:
+            llm: LLM instance the prompt is sent to
+            prompt: Prompt string
+
+        Returns:
+            Hex digest identifying the request
+        """
+        model = getattr(llm, 'deployment_name', None) or getattr(llm, 'model_name', '') or ''
+        temperature = getattr(llm, 'temperature', '')
+        digest = hashlib.sha256()
+        for part in (PROMPT_CACHE_VERSION, str(model), str(temperature), prompt):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\x00')
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached response for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a response, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached responses."""
+        with self._lock:
+            self._entries.clear()
+
+
+# Global cache instance
+llm_response_cache = LLMResponseCache(
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS
+)
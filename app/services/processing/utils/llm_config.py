@@ -1,8 +1,16 @@
 import os
-import langchain 
+import importlib.util
+from functools import lru_cache
+import httpx
 from langchain_openai import AzureChatOpenAI
 from langchain_openai import AzureOpenAIEmbeddings
 
+# HTTP/2 support (optional - needs the h2 package; falls back to HTTP/1.1)
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Connection pool shared by all Azure OpenAI clients (chat, embeddings, OCR)
+HTTP_MAX_CONNECTIONS = 64
+
 # Try to load environment variables from .env file if python-dotenv is available
 try:
     from dotenv import load_dotenv
@@ -11,6 +19,24 @@ except ImportError:
     pass  # python-dotenv is optional
 
 
+@lru_cache(maxsize=1)
+def get_http_client() -> httpx.Client:
+    """
+    Return the process-wide httpx client used for Azure OpenAI requests.
+    
+    One pooled client keeps connections alive across the chat, embedding and OCR
+    clients; with HTTP/2 concurrent requests are multiplexed over a few connections.
+    Timeouts are left to the OpenAI SDK, which sets them per request.
+    """
+    return httpx.Client(
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_CONNECTIONS
+        )
+    )
+
+
 def llm_setup():
     """
     Initialize Azure OpenAI LLM and embeddings from environment variables.
@@ -49,7 +75,8 @@ def llm_setup():
     llm = AzureChatOpenAI(
         deployment_name=chat_deployment,
         azure_endpoint=api_base,
-        temperature=0
+        temperature=0,
+        http_client=get_http_client()
     )
     
     # Ensure api_base doesn't have trailing slash for embeddings
@@ -63,7 +90,8 @@ def llm_setup():
         azure_endpoint=api_base_clean,
         openai_api_key=api_key,
         openai_api_version=embedding_api_version,
-        chunk_size=1
+        chunk_size=1,
+        http_client=get_http_client()
     )
     
     return llm, embeddings
\ No newline at end of file
@@ -3,14 +3,24 @@ Shared LLM call wrapper with retry logic, timeout handling, and error management
 """
 import asyncio
 import logging
+import random
+import threading
 import time
-from typing import Optional, Callable, Any, Dict
-from functools import wraps
+from typing import Any, Callable, Optional
 from langchain_openai import AzureChatOpenAI
-from openai import RateLimitError, APIError, Timeout
+from openai import RateLimitError, APIError, APIConnectionError, Timeout
+from app.core.config import settings
+from app.services.processing.utils.llm_cache import llm_response_cache
 
 logger = logging.getLogger(__name__)
 
+# Bounds in-flight LLM requests across all threads/tasks so concurrent fan-out
+# stays within the deployment's rate limits (sleeps between retries don't hold it)
+_llm_semaphore = threading.BoundedSemaphore(max(1, settings.LLM_MAX_CONCURRENT_CALLS))
+
+# Upper bound for a single retry wait, whether computed or requested by the server
+MAX_RETRY_DELAY_SECONDS = 60.0
+
 
 class LLMCallError(Exception):
     """Base exception for LLM call errors."""
@@ -27,13 +37,157 @@ class LLMRateLimitError(LLMCallError):
     pass
 
 
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Read the server-requested wait from a rate limit error's response headers.
+    
+    Args:
+        error: Exception raised by the OpenAI client
+        
+    Returns:
+        Seconds to wait, or None if the response carries no usable Retry-After header
+    """
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if not headers:
+        return None
+    try:
+        # Azure OpenAI sends a millisecond-precision variant alongside Retry-After
+        retry_after_ms = headers.get('retry-after-ms')
+        if retry_after_ms is not None:
+            return float(retry_after_ms) / 1000.0
+        retry_after = headers.get('retry-after')
+        if retry_after is not None:
+            return float(retry_after)
+    except (TypeError, ValueError):
+        # HTTP-date form or malformed value - fall back to computed backoff
+        pass
+    return None
+
+
+def _backoff_delay(base_delay: float, attempt: int, error: Optional[Exception] = None) -> float:
+    """
+    Compute the wait before the next retry.
+    
+    Honors the server's Retry-After when present; otherwise uses capped exponential
+    backoff with random jitter so concurrent callers don't retry in lockstep.
+    
+    Args:
+        base_delay: Base delay in seconds
+        attempt: Zero-based attempt number that just failed
+        error: Exception that triggered the retry, if any
+        
+    Returns:
+        Delay in seconds
+    """
+    retry_after = _retry_after_seconds(error) if error is not None else None
+    if retry_after is not None:
+        return min(MAX_RETRY_DELAY_SECONDS, max(0.0, retry_after))
+    return min(MAX_RETRY_DELAY_SECONDS, base_delay * (2 ** attempt)) + random.uniform(0, 1)
+
+
+def _is_transient_api_error(error: Exception) -> bool:
+    """Return True for rate limits, timeouts, connection failures and 5xx responses."""
+    if isinstance(error, (RateLimitError, Timeout, APIConnectionError)):
+        return True
+    status_code = getattr(error, 'status_code', None)
+    return isinstance(error, APIError) and bool(status_code) and 500 <= status_code < 600
+
+
+async def _acquire_llm_slot() -> None:
+    """
+    Acquire _llm_semaphore without blocking the event loop.
+    
+    The blocking acquire runs on a worker thread that cannot be interrupted, so if
+    the calling task is cancelled while waiting, the slot is released as soon as
+    that thread gets it instead of being held forever.
+    """
+    acquire = asyncio.ensure_future(asyncio.to_thread(_llm_semaphore.acquire))
+    try:
+        await asyncio.shield(acquire)
+    except asyncio.CancelledError:
+        acquire.add_done_callback(lambda _: _llm_semaphore.release())
+        raise
+
+
+def _is_cacheable(llm: AzureChatOpenAI) -> bool:
+    """Return True if responses from llm may be cached (caching enabled, temperature 0)."""
+    temperature = getattr(llm, 'temperature', None)
+    return settings.LLM_CACHE_ENABLED and temperature is not None and temperature <= 0
+
+
+def cache_llm_response(llm: AzureChatOpenAI, prompt: str, response: Any) -> None:
+    """
+    Store a response for reuse by later use_cache calls with the same prompt.
+    
+    Call this only after the response has been parsed and validated, so a
+    malformed response is never replayed from the cache. Sampled calls
+    (temperature > 0) are not cached.
+    
+    Args:
+        llm: LLM instance the prompt was sent to
+        prompt: Prompt string
+        response: LLM response object returned by call_llm_with_retry
+    """
+    if _is_cacheable(llm):
+        llm_response_cache.set(llm_response_cache.make_key(llm, prompt), response)
+
+
+def call_api_with_retry(
+    func: Callable[..., Any],
+    *args: Any,
+    max_retries: int = 6,
+    base_delay: float = 1.0,
+    context: str = "",
+    on_failed_attempt: Optional[Callable[[Exception, int], None]] = None,
+    **kwargs: Any
+) -> Any:
+    """
+    Call an Azure OpenAI API function, retrying transient failures with backoff.
+    
+    Used for the embedding and OCR requests made outside call_llm_with_retry, so a
+    single 429 or 5xx pauses that request instead of failing the whole document.
+    Callers bound concurrency with their own worker pools.
+    
+    Args:
+        func: Function making the API request
+        *args: Positional arguments for func
+        max_retries: Maximum number of attempts
+        base_delay: Base delay in seconds for exponential backoff
+        context: Context string for logging (e.g., "OCR page 3")
+        on_failed_attempt: Optional callback(error, attempt) run before each retry
+        **kwargs: Keyword arguments for func
+        
+    Returns:
+        Return value of func
+        
+    Raises:
+        The last exception raised by func, once retries are exhausted or the
+        error is not transient
+    """
+    for attempt in range(max_retries):
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if attempt == max_retries - 1 or not _is_transient_api_error(e):
+                raise
+            if on_failed_attempt is not None:
+                on_failed_attempt(e, attempt)
+            delay = _backoff_delay(base_delay, attempt, e)  # Retry-After or jittered exponential backoff
+            logger.warning(
+                f"Transient API error ({type(e).__name__}). Context: {context}. "
+                f"Retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})"
+            )
+            time.sleep(delay)
+
+
 def call_llm_with_retry(
     llm: AzureChatOpenAI,
     prompt: str,
     max_retries: int = 3,
     base_delay: float = 1.0,
     timeout: int = 60,
-    context: str = ""
+    context: str = "",
+    use_cache: bool = False
 ) -> Any:
     """
     Call LLM synchronously with retry logic, rate limit handling, and timeout.
@@ -45,6 +199,8 @@ def call_llm_with_retry(
         base_delay: Base delay in seconds for exponential backoff
         timeout: Timeout in seconds for each call
         context: Context string for logging (e.g., "culture extraction")
+        use_cache: Reuse a cached response for an identical prompt (deterministic calls only);
+            responses are stored only via cache_llm_response once the caller has parsed them
         
     Returns:
         LLM response object
@@ -54,6 +210,12 @@ def call_llm_with_retry(
         LLMRateLimitError: If rate limit is hit after all retries
         LLMCallError: For other LLM call errors
     """
+    if use_cache and _is_cacheable(llm):
+        cached_response = llm_response_cache.get(llm_response_cache.make_key(llm, prompt))
+        if cached_response is not None:
+            logger.debug(f"LLM cache hit. Context: {context}")
+            return cached_response
+    
     last_exception = None
     
     for attempt in range(max_retries):
@@ -63,7 +225,8 @@ def call_llm_with_retry(
             # Use invoke with timeout handling
             # Note: AzureChatOpenAI doesn't have built-in timeout, so we use asyncio
             # For sync calls, we'll rely on the underlying library's timeout
-            response = llm.invoke(prompt)
+            with _llm_semaphore:
+                response = llm.invoke(prompt)
             
             elapsed = time.time() - start_time
             logger.debug(
@@ -77,7 +240,7 @@ def call_llm_with_retry(
         except RateLimitError as e:
             last_exception = e
             if attempt < max_retries - 1:
-                delay = base_delay * (2 ** attempt)  # Exponential backoff
+                delay = _backoff_delay(base_delay, attempt, e)  # Retry-After or jittered exponential backoff
                 logger.warning(
                     f"Rate limit hit. Context: {context}. "
                     f"Retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})"
@@ -102,7 +265,7 @@ def call_llm_with_retry(
                     f"LLM call timed out after {timeout}s. Context: {context}"
                 ) from e
             # Retry on timeout
-            delay = base_delay * (2 ** attempt)
+            delay = _backoff_delay(base_delay, attempt)
             time.sleep(delay)
             
         except APIError as e:
@@ -112,7 +275,7 @@ def call_llm_with_retry(
             # Retry on 5xx errors (server errors)
             if error_code and 500 <= error_code < 600:
                 if attempt < max_retries - 1:
-                    delay = base_delay * (2 ** attempt)
+                    delay = _backoff_delay(base_delay, attempt)
                     logger.warning(
                         f"Server error {error_code}. Context: {context}. "
                         f"Retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})"
@@ -140,7 +303,7 @@ def call_llm_with_retry(
             # Check if it's a timeout-related error
             if "timeout" in str(e).lower() or "timed out" in str(e).lower():
                 if attempt < max_retries - 1:
-                    delay = base_delay * (2 ** attempt)
+                    delay = _backoff_delay(base_delay, attempt)
                     logger.warning(
                         f"Timeout error. Context: {context}. "
                         f"Retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})"
@@ -160,7 +323,7 @@ def call_llm_with_retry(
                     "service", "busy", "overloaded"
                 ]
                 if any(keyword in str(e).lower() for keyword in retryable_keywords):
-                    delay = base_delay * (2 ** attempt)
+                    delay = _backoff_delay(base_delay, attempt)
                     logger.warning(
                         f"Transient error: {str(e)}. Context: {context}. "
                         f"Retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})"
@@ -189,7 +352,8 @@ async def call_llm_async_with_retry(
     max_retries: int = 3,
     base_delay: float = 1.0,
     timeout: int = 60,
-    context: str = ""
+    context: str = "",
+    use_cache: bool = False
 ) -> Any:
     """
     Call LLM asynchronously with retry logic, rate limit handling, and timeout.
@@ -201,6 +365,8 @@ async def call_llm_async_with_retry(
         base_delay: Base delay in seconds for exponential backoff
         timeout: Timeout in seconds for each call
         context: Context string for logging
+        use_cache: Reuse a cached response for an identical prompt (deterministic calls only);
+            responses are stored only via cache_llm_response once the caller has parsed them
         
     Returns:
         LLM response object
@@ -210,17 +376,28 @@ async def call_llm_async_with_retry(
         LLMRateLimitError: If rate limit is hit after all retries
         LLMCallError: For other LLM call errors
     """
+    if use_cache and _is_cacheable(llm):
+        cached_response = llm_response_cache.get(llm_response_cache.make_key(llm, prompt))
+        if cached_response is not None:
+            logger.debug(f"LLM cache hit. Context: {context}")
+            return cached_response
+    
     last_exception = None
     
     for attempt in range(max_retries):
         try:
             start_time = time.time()
             
-            # Use asyncio.wait_for for timeout
-            response = await asyncio.wait_for(
-                llm.ainvoke(prompt),
-                timeout=timeout
-            )
+            # Acquire the shared slot without blocking the event loop
+            await _acquire_llm_slot()
+            try:
+                # Use asyncio.wait_for for timeout
+                response = await asyncio.wait_for(
+                    llm.ainvoke(prompt),
+                    timeout=timeout
+                )
+            finally:
+                _llm_semaphore.release()
             
             elapsed = time.time() - start_time
             logger.debug(
@@ -241,13 +418,13 @@ async def call_llm_async_with_retry(
                 raise LLMTimeoutError(
                     f"LLM call timed out after {timeout}s. Context: {context}"
                 ) from last_exception
-            delay = base_delay * (2 ** attempt)
+            delay = _backoff_delay(base_delay, attempt)
             await asyncio.sleep(delay)
             
         except RateLimitError as e:
             last_exception = e
             if attempt < max_retries - 1:
-                delay = base_delay * (2 ** attempt)
+                delay = _backoff_delay(base_delay, attempt, e)
                 logger.warning(
                     f"Rate limit hit (async). Context: {context}. "
                     f"Retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})"
@@ -267,7 +444,7 @@ async def call_llm_async_with_retry(
             
             if error_code and 500 <= error_code < 600:
                 if attempt < max_retries - 1:
-                    delay = base_delay * (2 ** attempt)
+                    delay = _backoff_delay(base_delay, attempt)
                     logger.warning(
                         f"Server error {error_code} (async). Context: {context}. "
                         f"Retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})"
@@ -290,7 +467,7 @@ async def call_llm_async_with_retry(
             last_exception = e
             if "timeout" in str(e).lower() or "timed out" in str(e).lower():
                 if attempt < max_retries - 1:
-                    delay = base_delay * (2 ** attempt)
+                    delay = _backoff_delay(base_delay, attempt)
                     logger.warning(
                         f"Timeout error (async). Context: {context}. "
                         f"Retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})"
@@ -308,7 +485,7 @@ async def call_llm_async_with_retry(
                     "service", "busy", "overloaded"
                 ]
                 if any(keyword in str(e).lower() for keyword in retryable_keywords):
-                    delay = base_delay * (2 ** attempt)
+                    delay = _backoff_delay(base_delay, attempt)
                     logger.warning(
                         f"Transient error (async): {str(e)}. Context: {context}. "
                         f"Retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})"
@@ -327,12 +504,3 @@ async def call_llm_async_with_retry(
     raise LLMCallError(
         f"LLM call failed after {max_retries} attempts. Context: {context}"
     ) from last_exception
-
-
-
-
-
-
-
-
-
@@ -0,0 +1,274 @@
+"""
+Shared vector store retrieval helpers.
+"""
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Each retriever query embeds the query text through the embeddings API, so the
+# work is I/O bound and can be overlapped safely with a small thread pool.
+MAX_RETRIEVAL_WORKERS = 8
+
+# Per-vector-store cache of query results: {vectordb: {(search_type, query): (k, docs)}}.
+# Weak keys drop a document's entries as soon as its vector store is released.
+_query_cache: "weakref.WeakKeyDictionary[Any, Dict[Tuple[str, str], Tuple[int, List[Any]]]]" = weakref.WeakKeyDictionary()
+_query_cache_lock = threading.Lock()
+
+# Process-wide LRU of query embeddings: {(embedding model, query): vector}. Extraction
+# queries are fixed strings, so every document re-embeds the same texts; caching them
+# skips the embeddings API call on all but the first document.
+QUERY_EMBEDDING_CACHE_SIZE = 512
+_query_embedding_cache: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+_query_embedding_lock = threading.Lock()
+_cache_stats = {'result_hits': 0, 'embedding_hits': 0, 'embedding_misses': 0}
+# Cache keys filled by a batched prefetch and not yet looked up. The prefetch already
+# counted them as misses, so their first lookup is not counted as a hit.
+_prefetched_query_keys = set()
+
+
+def get_retrieval_cache_stats() -> Dict[str, int]:
+    """Return hit/miss counters for the query result and query embedding caches."""
+    with _query_embedding_lock:
+        return dict(_cache_stats)
+
+
+def _embedding_model_key(embedding: Any) -> str:
+    """Name identifying an embeddings object's model in the query embedding cache."""
+    return str(getattr(embedding, 'deployment', None) or getattr(embedding, 'model', None) or type(embedding).__name__)
+
+
+def _prefetch_query_embeddings(vectordb: Any, queries: Sequence[str]) -> None:
+    """
+    Embed all uncached queries in one batched embeddings API request.
+    
+    Fills the query embedding cache so the per-query searches that follow don't
+    each make their own request. Failures are ignored; those queries are then
+    embedded individually as before.
+    
+    Args:
+        vectordb: Vector store whose embedding model should embed the queries
+        queries: Query strings about to be searched
+    """
+    embedding = getattr(vectordb, 'embedding_function', None)
+    embed_documents = getattr(embedding, 'embed_documents', None)
+    if embed_documents is None:
+        return
+    
+    model = _embedding_model_key(embedding)
+    with _query_embedding_lock:
+        missing = [
+            query for query in dict.fromkeys(queries)
+            if (model, query) not in _query_embedding_cache
+        ]
+    if len(missing) < 2:
+        return
+    
+    try:
+        vectors = embed_documents(missing, chunk_size=len(missing))
+    except Exception as e:
+        logger.debug(f"Batched query embedding failed, embedding queries individually: {e}")
+        return
+    
+    with _query_embedding_lock:
+        _cache_stats['embedding_misses'] += len(missing)
+        for query, vector in zip(missing, vectors):
+            _query_embedding_cache[(model, query)] = vector
+            _prefetched_query_keys.add((model, query))
+        while len(_query_embedding_cache) > QUERY_EMBEDDING_CACHE_SIZE:
+            _prefetched_query_keys.discard(_query_embedding_cache.popitem(last=False)[0])
+
+
+def _embed_query_cached(vectordb: Any, query: str) -> Optional[List[float]]:
+    """
+    Embed a query with the vector store's embedding model, reusing cached vectors.
+    
+    Args:
+        vectordb: Vector store whose embedding model should embed the query
+        query: Query string
+    
+    Returns:
+        Query vector, or None if the store has no embeddings object to call
+    """
+    embedding = getattr(vectordb, 'embedding_function', None)
+    embed_query = getattr(embedding, 'embed_query', None)
+    if embed_query is None:
+        return None
+    
+    cache_key = (_embedding_model_key(embedding), query)
+    with _query_embedding_lock:
+        vector = _query_embedding_cache.get(cache_key)
+        if vector is not None:
+            _query_embedding_cache.move_to_end(cache_key)
+            if cache_key in _prefetched_query_keys:
+                _prefetched_query_keys.discard(cache_key)
+            else:
+                _cache_stats['embedding_hits'] += 1
+            return vector
+        _cache_stats['embedding_misses'] += 1
+    
+    vector = embed_query(query)
+    with _query_embedding_lock:
+        _query_embedding_cache[cache_key] = vector
+        while len(_query_embedding_cache) > QUERY_EMBEDDING_CACHE_SIZE:
+            _prefetched_query_keys.discard(_query_embedding_cache.popitem(last=False)[0])
+    return vector
+
+
+def cached_retrieve(vectordb: Any, query: str, k: int = 10, search_type: str = 'similarity') -> List[Any]:
+    """
+    Retrieve documents for a query, reusing earlier results for the same vector store.
+
+    Similarity results are ranked, so a cached result for a larger k also answers
+    a smaller k by slicing. Query embeddings are also cached across vector stores,
+    so a fixed query is only sent to the embeddings API once per process.
+
+    Args:
+        vectordb: Vector store (e.g. FAISS) to query
+        query: Query string
+        k: Number of documents to retrieve
+        search_type: Retriever search type
+
+    Returns:
+        List of retrieved documents
+    """
+    cache_key = (search_type, query)
+    try:
+        with _query_cache_lock:
+            cached = _query_cache.get(vectordb, {}).get(cache_key)
+    except TypeError:
+        # Vector store does not support weak references - query without caching
+        cached = None
+        vectordb_cacheable = False
+    else:
+        vectordb_cacheable = True
+
+    if cached is not None:
+        cached_k, cached_docs = cached
+        if cached_k == k or (search_type == 'similarity' and cached_k > k):
+            with _query_embedding_lock:
+                _cache_stats['result_hits'] += 1
+            return list(cached_docs[:k])
+
+    query_vector = _embed_query_cached(vectordb, query) if search_type == 'similarity' else None
+    if query_vector is not None:
+        # Same search the similarity retriever runs, minus re-embedding the query
+        docs = vectordb.similarity_search_by_vector(query_vector, k=k)
+    else:
+        retriever = vectordb.as_retriever(search_type=search_type, search_kwargs={'k': k})
+        docs = retriever.invoke(query)
+
+    if vectordb_cacheable:
+        with _query_cache_lock:
+            entries = _query_cache.setdefault(vectordb, {})
+            previous = entries.get(cache_key)
+            if previous is None or previous[0] <= k:
+                entries[cache_key] = (k, list(docs))
+    return docs
+
+
+def retrieve_for_queries(
+    vectordb: Any,
+    queries: Sequence[str],
+    k: int = 10,
+    search_type: str = 'similarity',
+    ignore_errors: bool = False
+) -> List[List[Any]]:
+    """
+    Run several retriever queries against a vector store concurrently.
+
+    Args:
+        vectordb: Vector store (e.g. FAISS) to query
+        queries: Query strings to run
+        k: Number of documents to retrieve per query
+        search_type: Retriever search type
+        ignore_errors: If True, a failed query yields an empty list instead of raising
+
+    Returns:
+        List of retrieved document lists, in the same order as ``queries``
+    """
+    if not queries:
+        return []
+
+    def _invoke(query: str) -> List[Any]:
+        try:
+            return cached_retrieve(vectordb, query, k=k, search_type=search_type)
+        except Exception as e:
+            if not ignore_errors:
+                raise
+            logger.debug(f"Error retrieving documents for query '{query}': {e}")
+            return []
+
+    if len(queries) == 1:
+        return [_invoke(queries[0])]
+
+    if search_type == 'similarity':
+        # One embeddings request for every new query instead of one per query
+        _prefetch_query_embeddings(vectordb, queries)
+
+    with ThreadPoolExecutor(max_workers=min(MAX_RETRIEVAL_WORKERS, len(queries))) as executor:
+        # executor.map preserves input order, so downstream dedupe/ranking is unchanged
+        return list(executor.map(_invoke, queries))
+
+
+def dedupe_documents(
+    docs: Sequence[Any],
+    limit: Optional[int] = None,
+    already_included: Optional[Sequence[Any]] = None
+) -> List[Any]:
+    """
+    Deduplicate retrieved documents, preserving retrieval order.
+
+    A document is dropped when it has the same page and leading text as one
+    already kept, or when its (whitespace-normalized) text is contained in a kept
+    document, so overlapping chunks are not sent to the LLM twice.
+
+    Args:
+        docs: Retrieved documents, best matches first
+        limit: Maximum number of documents to keep
+        already_included: Documents the prompt contains anyway (e.g. full pages);
+            retrieved chunks contained in one of them are dropped
+
+    Returns:
+        List of unique documents
+    """
+    seen = set()
+    kept_texts = [
+        " ".join(getattr(doc, 'page_content', '').split())
+        for doc in (already_included or ())
+    ]
+    unique_docs = []
+    for doc in docs:
+        if limit is not None and len(unique_docs) >= limit:
+            break
+        doc_key = (doc.metadata.get('page'), doc.page_content[:100])
+        if doc_key in seen:
+            continue
+        seen.add(doc_key)
+        text = " ".join(doc.page_content.split())
+        if any(text in kept_text for kept_text in kept_texts):
+            continue
+        kept_texts.append(text)
+        unique_docs.append(doc)
+    return unique_docs
+
+
+def format_page_context(*doc_groups: Iterable[Any]) -> str:
+    """
+    Join documents into the "Page N: text" context block used in prompts.
+
+    Args:
+        doc_groups: One or more sequences of documents, joined in order
+
+    Returns:
+        Context string with one "Page N: text" entry per document
+    """
+    return "\n".join(
+        f"Page {getattr(doc, 'metadata', {}).get('page', '?')}: {getattr(doc, 'page_content', '')}"
+        for docs in doc_groups
+        for doc in docs
+    )
@@ -7,11 +7,36 @@ import logging
 from typing import Dict, Any, List, Optional
 from sqlalchemy.orm import Session
 from app.models.document_chunk import DocumentChunk
-from app.models.laboratory_result import LaboratoryResult, TestType
+from app.models.laboratory_result import LaboratoryResult
+from app.services.processing.utils.retrieval import retrieve_for_queries
 
 logger = logging.getLogger(__name__)
 
 
+# Time of death cleanup patterns (compiled once; clean_time_of_death runs per match)
+_TIME_OF_DEATH_LABEL_PATTERN = re.compile(
+    r'(?:death\s+date[-:]?\s*time|date[-:]?\s*time|time\s+of\s+death)[:\s]*', re.IGNORECASE
+)
+# Common timezone abbreviations
+_TIMEZONE_ABBREVS = r'(?:EDT|EST|PDT|PST|CDT|CST|MDT|MST|AKDT|AKST|HST|UTC|GMT)'
+# Date patterns: MM/DD/YYYY, MM-DD-YYYY, YYYY-MM-DD, DD/MM/YYYY, etc.
+_DATE_PATTERNS = (
+    r'(\d{1,2}[/-]\d{1,2}[/-]\d{4})',  # MM/DD/YYYY or MM-DD-YYYY
+    r'(\d{4}[/-]\d{1,2}[/-]\d{1,2})',  # YYYY-MM-DD or YYYY/MM/DD
+    r'(\d{1,2}[/-]\d{1,2}[/-]\d{2})',  # MM/DD/YY or MM-DD-YY
+)
+_DATE_ONLY_PATTERNS = tuple(re.compile(pattern) for pattern in _DATE_PATTERNS)
+# Date, time (HH:MM or HH:MM:SS) and timezone together
+_DATE_TIME_TZ_PATTERNS = tuple(
+    re.compile(pattern + r'\s+(\d{1,2}:\d{2}(?::\d{2})?)\s*(' + _TIMEZONE_ABBREVS + r')\b', re.IGNORECASE)
+    for pattern in _DATE_PATTERNS
+)
+_TIME_PATTERN = re.compile(r'(\d{1,2}:\d{2}(?::\d{2})?)')
+_TIMEZONE_PATTERN = re.compile(r'\b(' + _TIMEZONE_ABBREVS + r')\b', re.IGNORECASE)
+_DEATH_WORDS_PATTERN = re.compile(r'\b(asystole|death|expired|deceased)\b', re.IGNORECASE)
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
 def clean_time_of_death(raw_time: str) -> str:
     """
     Clean and extract date, time, and timezone from time of death string.
@@ -27,23 +52,11 @@ def clean_time_of_death(raw_time: str) -> str:
         return raw_time
     
     # Remove common prefixes/labels but keep the original for fallback
-    cleaned = re.sub(r'(?:death\s+date[-:]?\s*time|date[-:]?\s*time|time\s+of\s+death)[:\s]*', '', raw_time, flags=re.IGNORECASE)
-    
-    # Common timezone abbreviations
-    timezone_abbrevs = r'(?:EDT|EST|PDT|PST|CDT|CST|MDT|MST|AKDT|AKST|HST|UTC|GMT)'
+    cleaned = _TIME_OF_DEATH_LABEL_PATTERN.sub('', raw_time)
     
-    # Date patterns: MM/DD/YYYY, MM-DD-YYYY, YYYY-MM-DD, DD/MM/YYYY, etc.
-    date_patterns = [
-        r'(\d{1,2}[/-]\d{1,2}[/-]\d{4})',  # MM/DD/YYYY or MM-DD-YYYY
-        r'(\d{4}[/-]\d{1,2}[/-]\d{1,2})',  # YYYY-MM-DD or YYYY/MM/DD
-        r'(\d{1,2}[/-]\d{1,2}[/-]\d{2})',  # MM/DD/YY or MM-DD-YY
-    ]
-    
-    # Pattern to match date, time (HH:MM or HH:MM:SS), and timezone
     # Try to find date + time + timezone together
-    for date_pattern in date_patterns:
-        full_pattern = date_pattern + r'\s+(\d{1,2}:\d{2}(?::\d{2})?)\s*(' + timezone_abbrevs + r')\b'
-        match = re.search(full_pattern, cleaned, re.IGNORECASE)
+    for full_pattern in _DATE_TIME_TZ_PATTERNS:
+        match = full_pattern.search(cleaned)
         if match:
             date_part = match.group(1)
             time_part = match.group(2)
@@ -52,13 +65,12 @@ def clean_time_of_death(raw_time: str) -> str:
     
     # Fallback: try to find date and time separately, then timezone
     date_match = None
-    for date_pattern in date_patterns:
-        date_match = re.search(date_pattern, cleaned)
+    for date_pattern in _DATE_ONLY_PATTERNS:
+        date_match = date_pattern.search(cleaned)
         if date_match:
             break
     
-    time_pattern = r'(\d{1,2}:\d{2}(?::\d{2})?)'
-    time_match = re.search(time_pattern, cleaned)
+    time_match = _TIME_PATTERN.search(cleaned)
     
     if date_match and time_match:
         date_part = date_match.group(1)
@@ -66,7 +78,7 @@ def clean_time_of_death(raw_time: str) -> str:
         # Look for timezone within reasonable distance after the time
         time_pos = time_match.end()
         remaining_text = cleaned[time_pos:time_pos+30]
-        tz_match = re.search(r'\b(' + timezone_abbrevs + r')\b', remaining_text, re.IGNORECASE)
+        tz_match = _TIMEZONE_PATTERN.search(remaining_text)
         if tz_match:
             return f"{date_part} {time_part} {tz_match.group(1).upper()}"
         return f"{date_part} {time_part}"
@@ -76,7 +88,7 @@ def clean_time_of_death(raw_time: str) -> str:
         time_part = time_match.group(1)
         time_pos = time_match.end()
         remaining_text = cleaned[time_pos:time_pos+30]
-        tz_match = re.search(r'\b(' + timezone_abbrevs + r')\b', remaining_text, re.IGNORECASE)
+        tz_match = _TIMEZONE_PATTERN.search(remaining_text)
         if tz_match:
             return f"{time_part} {tz_match.group(1).upper()}"
         return time_part
@@ -87,8 +99,8 @@ def clean_time_of_death(raw_time: str) -> str:
     
     # If no structured pattern found, clean unwanted words but preserve the rest
     # Remove words like "Asystole", "Death", etc. but keep date/time info
-    cleaned_result = re.sub(r'\b(asystole|death|expired|deceased)\b', '', cleaned, flags=re.IGNORECASE)
-    cleaned_result = re.sub(r'\s+', ' ', cleaned_result).strip()
+    cleaned_result = _DEATH_WORDS_PATTERN.sub('', cleaned)
+    cleaned_result = _WHITESPACE_PATTERN.sub(' ', cleaned_result).strip()
     
     # If we still have something meaningful, return it
     if cleaned_result and len(cleaned_result) > 3:
@@ -102,6 +114,33 @@ def clean_time_of_death(raw_time: str) -> str:
     return raw_time
 
 
+# Recovery information patterns, tried in order
+# e.g. "Recovery Window: 24 hours" or "Window: 24 hours"
+_RECOVERY_WINDOW_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'recovery\s+window[:\s]+([0-9]+\s*(?:hours?|days?|minutes?))',
+    r'window[:\s]+([0-9]+\s*(?:hours?|days?))',
+    r'within\s+([0-9]+\s*(?:hours?|days?))',
+    r'recovery\s+time[:\s]+([0-9]+\s*(?:hours?|days?))'
+))
+# e.g. "Location: [location]" or "Recovery Location: [location]"
+_RECOVERY_LOCATION_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'recovery\s+location[:\s]+([^\n,]+)',
+    r'location[:\s]+([^\n,]+)',
+    r'facility[:\s]+([^\n,]+)',
+    r'recovery\s+facility[:\s]+([^\n,]+)'
+))
+_LOCATION_SUFFIX_PATTERN = re.compile(r'\s*(ICU|ER|ED|OR|floor|room).*$', re.IGNORECASE)
+# e.g. "Consent: [status]" or "Consent Status: [status]"
+_CONSENT_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'consent\s+status[:\s]+([^\n,]+)',
+    r'consent[:\s]+([^\n,]+)',
+    r'authorization[:\s]+([^\n,]+)',
+    r'tissue\s+donation\s+consent[:\s]+([^\n,]+)'
+))
+_CONSENT_OBTAINED_PATTERN = re.compile(r'yes|obtained|signed|approved', re.IGNORECASE)
+_CONSENT_NOT_OBTAINED_PATTERN = re.compile(r'no|not|declined|refused', re.IGNORECASE)
+
+
 def extract_recovery_information(vectordb: Any, page_doc_list: List[Any]) -> Dict[str, Any]:
     """
     Extract recovery information using semantic search + pattern matching.
@@ -117,17 +156,12 @@ def extract_recovery_information(vectordb: Any, page_doc_list: List[Any]) -> Dic
             "consent status authorization tissue donation"
         ]
         
-        # Retrieve relevant chunks
-        all_chunks = []
-        retriever = vectordb.as_retriever(search_type='similarity', search_kwargs={'k': 10})
-        
-        for query in queries:
-            try:
-                chunks = retriever.invoke(query)
-                all_chunks.extend(chunks)
-            except Exception as e:
-                logger.debug(f"Error retrieving chunks for query '{query}': {e}")
-                continue
+        # Retrieve relevant chunks (queries run concurrently; failed queries are skipped)
+        all_chunks = [
+            chunk
+            for chunks in retrieve_for_queries(vectordb, queries, k=10, ignore_errors=True)
+            for chunk in chunks
+        ]
         
         # Deduplicate chunks
         seen = set()
@@ -139,7 +173,7 @@ def extract_recovery_information(vectordb: Any, page_doc_list: List[Any]) -> Dic
                 unique_chunks.append(chunk)
         
         # Combine text from all chunks
-        text = " ".join([chunk.page_content for chunk in unique_chunks])
+        text = " ".join(chunk.page_content for chunk in unique_chunks)
         
         recovery_info = {
             'recovery_window': None,
@@ -148,49 +182,31 @@ def extract_recovery_information(vectordb: Any, page_doc_list: List[Any]) -> Dic
         }
         
         # Pattern: "Recovery Window: 24 hours" or "Window: 24 hours"
-        window_patterns = [
-            r'recovery\s+window[:\s]+([0-9]+\s*(?:hours?|days?|minutes?))',
-            r'window[:\s]+([0-9]+\s*(?:hours?|days?))',
-            r'within\s+([0-9]+\s*(?:hours?|days?))',
-            r'recovery\s+time[:\s]+([0-9]+\s*(?:hours?|days?))'
-        ]
-        for pattern in window_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _RECOVERY_WINDOW_PATTERNS:
+            match = pattern.search(text)
             if match:
                 recovery_info['recovery_window'] = match.group(1).strip()
                 break
         
         # Pattern: "Location: [location]" or "Recovery Location: [location]"
-        location_patterns = [
-            r'recovery\s+location[:\s]+([^\n,]+)',
-            r'location[:\s]+([^\n,]+)',
-            r'facility[:\s]+([^\n,]+)',
-            r'recovery\s+facility[:\s]+([^\n,]+)'
-        ]
-        for pattern in location_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _RECOVERY_LOCATION_PATTERNS:
+            match = pattern.search(text)
             if match:
                 location = match.group(1).strip()
                 # Clean up common suffixes
-                location = re.sub(r'\s*(ICU|ER|ED|OR|floor|room).*$', '', location, flags=re.IGNORECASE)
+                location = _LOCATION_SUFFIX_PATTERN.sub('', location)
                 recovery_info['location'] = location
                 break
         
         # Pattern: "Consent: [status]" or "Consent Status: [status]"
-        consent_patterns = [
-            r'consent\s+status[:\s]+([^\n,]+)',
-            r'consent[:\s]+([^\n,]+)',
-            r'authorization[:\s]+([^\n,]+)',
-            r'tissue\s+donation\s+consent[:\s]+([^\n,]+)'
-        ]
-        for pattern in consent_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _CONSENT_PATTERNS:
+            match = pattern.search(text)
             if match:
                 consent = match.group(1).strip()
                 # Normalize common values
-                if re.search(r'yes|obtained|signed|approved', consent, re.IGNORECASE):
+                if _CONSENT_OBTAINED_PATTERN.search(consent):
                     recovery_info['consent_status'] = 'Obtained'
-                elif re.search(r'no|not|declined|refused', consent, re.IGNORECASE):
+                elif _CONSENT_NOT_OBTAINED_PATTERN.search(consent):
                     recovery_info['consent_status'] = 'Not Obtained'
                 else:
                     recovery_info['consent_status'] = consent
@@ -203,6 +219,40 @@ def extract_recovery_information(vectordb: Any, page_doc_list: List[Any]) -> Dic
         return {'recovery_window': None, 'location': None, 'consent_status': None}
 
 
+# Terminal information patterns, tried in order
+_TIME_OF_DEATH_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'time\s+of\s+death[:\s]+([^\n,]+)',
+    r'TOD[:\s]+([^\n,]+)',
+    r'death\s+time[:\s]+([^\n,]+)',
+    r'expired\s+at[:\s]+([^\n,]+)',
+    r'date\s+and\s+time\s+of\s+death[:\s]+([^\n,]+)'
+))
+_DIGIT_PATTERN = re.compile(r'\d')
+_CAUSE_OF_DEATH_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'cause\s+of\s+death[:\s]+([^\n,]+)',
+    r'COD[:\s]+([^\n,]+)',
+    r'manner\s+of\s+death[:\s]+([^\n,]+)',
+    r'primary\s+cause[:\s]+([^\n,]+)'
+))
+_HYPOTENSION_PATTERN = re.compile(r'hypotension|low\s+blood\s+pressure|hypotensive', re.IGNORECASE)
+_HYPOTENSION_CONTEXT_PATTERN = re.compile(
+    r'hypotension[^\n]{0,200}|low\s+blood\s+pressure[^\n]{0,200}', re.IGNORECASE
+)
+_HYPOTENSION_PRESENT_PATTERN = re.compile(r'present|yes|positive|confirmed|noted|observed')
+_ABSENT_PATTERN = re.compile(r'absent|no|negative|none|not\s+present')
+_SEPSIS_PATTERN = re.compile(r'sepsis|septicemia|septic\s+shock', re.IGNORECASE)
+_SEPSIS_CONTEXT_PATTERN = re.compile(
+    r'sepsis[^\n]{0,200}|septicemia[^\n]{0,200}|septic\s+shock[^\n]{0,200}', re.IGNORECASE
+)
+_SEPSIS_UNCONFIRMED_PATTERN = re.compile(
+    r'rule\s+out|r\/o|testing\s+for|test\s+for|protocol|workup|pending|suspected|possible|no\s+sepsis|negative\s+for|no\s+evidence'
+)
+_SEPSIS_PRESENT_PATTERN = re.compile(
+    r'present|yes|positive|confirmed|diagnosed\s+with|has\s+sepsis|had\s+sepsis|active\s+sepsis|history\s+of\s+sepsis|evidence\s+of\s+sepsis'
+)
+_SEPSIS_ABSENT_PATTERN = re.compile(r'absent|no|negative|none|not\s+present|ruled\s+out')
+
+
 def extract_terminal_information(vectordb: Any, page_doc_list: List[Any]) -> Dict[str, Any]:
     """
     Extract terminal information using semantic search + pattern matching.
@@ -219,17 +269,12 @@ def extract_terminal_information(vectordb: Any, page_doc_list: List[Any]) -> Dic
             "sepsis infection septicemia septic shock"
         ]
         
-        # Retrieve relevant chunks
-        all_chunks = []
-        retriever = vectordb.as_retriever(search_type='similarity', search_kwargs={'k': 10})
-        
-        for query in queries:
-            try:
-                chunks = retriever.invoke(query)
-                all_chunks.extend(chunks)
-            except Exception as e:
-                logger.debug(f"Error retrieving chunks for query '{query}': {e}")
-                continue
+        # Retrieve relevant chunks (queries run concurrently; failed queries are skipped)
+        all_chunks = [
+            chunk
+            for chunks in retrieve_for_queries(vectordb, queries, k=10, ignore_errors=True)
+            for chunk in chunks
+        ]
         
         # Deduplicate chunks
         seen = set()
@@ -241,7 +286,7 @@ def extract_terminal_information(vectordb: Any, page_doc_list: List[Any]) -> Dic
                 unique_chunks.append(chunk)
         
         # Combine text from all chunks
-        text = " ".join([chunk.page_content for chunk in unique_chunks])
+        text = " ".join(chunk.page_content for chunk in unique_chunks)
         
         terminal_info = {
             'time_of_death': None,
@@ -251,22 +296,15 @@ def extract_terminal_information(vectordb: Any, page_doc_list: List[Any]) -> Dic
         }
         
         # Time of death patterns
-        tod_patterns = [
-            r'time\s+of\s+death[:\s]+([^\n,]+)',
-            r'TOD[:\s]+([^\n,]+)',
-            r'death\s+time[:\s]+([^\n,]+)',
-            r'expired\s+at[:\s]+([^\n,]+)',
-            r'date\s+and\s+time\s+of\s+death[:\s]+([^\n,]+)'
-        ]
-        for pattern in tod_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _TIME_OF_DEATH_PATTERNS:
+            match = pattern.search(text)
             if match:
                 raw_time = match.group(1).strip()
                 if raw_time:
                     # Clean the extracted time to only include date, time and timezone
                     cleaned_time = clean_time_of_death(raw_time)
                     # Only set if we got a meaningful result with digits (indicating date/time)
-                    if cleaned_time and cleaned_time.strip() and re.search(r'\d', cleaned_time):
+                    if cleaned_time and cleaned_time.strip() and _DIGIT_PATTERN.search(cleaned_time):
                         terminal_info['time_of_death'] = cleaned_time.strip()
                         logger.debug(f"Extracted time of death: {terminal_info['time_of_death']} from raw: {raw_time}")
                         break
@@ -275,49 +313,37 @@ def extract_terminal_information(vectordb: Any, page_doc_list: List[Any]) -> Dic
                         # Continue to try other patterns if this one didn't yield a result
         
         # Cause of death patterns
-        cod_patterns = [
-            r'cause\s+of\s+death[:\s]+([^\n,]+)',
-            r'COD[:\s]+([^\n,]+)',
-            r'manner\s+of\s+death[:\s]+([^\n,]+)',
-            r'primary\s+cause[:\s]+([^\n,]+)'
-        ]
-        for pattern in cod_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _CAUSE_OF_DEATH_PATTERNS:
+            match = pattern.search(text)
             if match:
                 terminal_info['cause_of_death'] = match.group(1).strip()
                 break
         
         # Hypotension patterns
-        if re.search(r'hypotension|low\s+blood\s+pressure|hypotensive', text, re.IGNORECASE):
+        if _HYPOTENSION_PATTERN.search(text):
             # Check for presence indicators
-            hypotension_context = re.search(
-                r'hypotension[^\n]{0,200}|low\s+blood\s+pressure[^\n]{0,200}',
-                text, re.IGNORECASE
-            )
+            hypotension_context = _HYPOTENSION_CONTEXT_PATTERN.search(text)
             if hypotension_context:
                 context_text = hypotension_context.group(0).lower()
-                if re.search(r'present|yes|positive|confirmed|noted|observed', context_text):
+                if _HYPOTENSION_PRESENT_PATTERN.search(context_text):
                     terminal_info['hypotension'] = 'Present'
-                elif re.search(r'absent|no|negative|none|not\s+present', context_text):
+                elif _ABSENT_PATTERN.search(context_text):
                     terminal_info['hypotension'] = 'Absent'
                 else:
                     terminal_info['hypotension'] = 'Present'  # Default if mentioned
         
         # Sepsis patterns
-        if re.search(r'sepsis|septicemia|septic\s+shock', text, re.IGNORECASE):
+        if _SEPSIS_PATTERN.search(text):
             # Check for presence indicators
-            sepsis_context = re.search(
-                r'sepsis[^\n]{0,200}|septicemia[^\n]{0,200}|septic\s+shock[^\n]{0,200}',
-                text, re.IGNORECASE
-            )
+            sepsis_context = _SEPSIS_CONTEXT_PATTERN.search(text)
             if sepsis_context:
                 context_text = sepsis_context.group(0).lower()
                 # Check for negative indicators first (testing, ruling out, protocols, etc.)
-                if re.search(r'rule\s+out|r\/o|testing\s+for|test\s+for|protocol|workup|pending|suspected|possible|no\s+sepsis|negative\s+for|no\s+evidence', context_text):
+                if _SEPSIS_UNCONFIRMED_PATTERN.search(context_text):
                     terminal_info['sepsis'] = None  # Not confirmed as present
-                elif re.search(r'present|yes|positive|confirmed|diagnosed\s+with|has\s+sepsis|had\s+sepsis|active\s+sepsis|history\s+of\s+sepsis|evidence\s+of\s+sepsis', context_text):
+                elif _SEPSIS_PRESENT_PATTERN.search(context_text):
                     terminal_info['sepsis'] = 'Present'
-                elif re.search(r'absent|no|negative|none|not\s+present|ruled\s+out', context_text):
+                elif _SEPSIS_ABSENT_PATTERN.search(context_text):
                     terminal_info['sepsis'] = 'Absent'
                 else:
                     # If sepsis is mentioned but context is unclear, don't assume it's present
@@ -331,6 +357,83 @@ def extract_terminal_information(vectordb: Any, page_doc_list: List[Any]) -> Dic
         return {'time_of_death': None, 'cause_of_death': None, 'hypotension': None, 'sepsis': None}
 
 
+# Map document types to search queries
+_DOC_PRESENCE_QUERIES = {
+    'donor_log_in_information_packet': [
+        'donor log in', 'log-in packet', 'ascension number', 'log in information'
+    ],
+    'donor_information': [
+        'donor information', 'donor demographics', 'patient information', 'donor profile'
+    ],
+    'donor_risk_assessment_interview': [
+        'DRAI', 'donor risk assessment', 'risk assessment interview', 'donor risk interview'
+    ],
+    'medical_records_review_summary': [
+        'medical records review', 'MRR summary', 'review summary', 'medical review'
+    ],
+    'tissue_recovery_information': [
+        'tissue recovery', 'recovery information', 'tissues recovered', 'recovery procedures'
+    ],
+    'plasma_dilution': [
+        'plasma dilution', 'dilution factor', 'plasma volume', 'dilution calculation'
+    ],
+    'authorization_for_tissue_donation': [
+        'authorization', 'tissue donation authorization', 'consent form', 'donation authorization'
+    ],
+    'infectious_disease_testing': [
+        'infectious disease', 'serology', 'culture results', 'infectious disease testing'
+    ],
+    'medical_records': [
+        'medical records', 'patient records', 'clinical records', 'medical chart'
+    ]
+}
+
+# Every document presence keyword (lowercased) in one alternation, longest first. Wrapped
+# in a lookahead so a match is attempted at every position, including inside another
+# keyword, and each chunk is scanned once for all document types.
+_DOC_PRESENCE_KEYWORDS = sorted(
+    {query.lower() for queries in _DOC_PRESENCE_QUERIES.values() for query in queries},
+    key=len,
+    reverse=True
+)
+_DOC_PRESENCE_KEYWORD_PATTERN = re.compile(
+    '(?=(' + '|'.join(re.escape(keyword) for keyword in _DOC_PRESENCE_KEYWORDS) + '))'
+)
+# Matched keyword -> document types it implies. The longest keyword starting at a
+# position wins the alternation, so a match also implies every keyword it contains.
+_DOC_PRESENCE_KEYWORD_TYPES = {
+    keyword: {
+        doc_type
+        for doc_type, queries in _DOC_PRESENCE_QUERIES.items()
+        if any(query.lower() in keyword for query in queries)
+    }
+    for keyword in _DOC_PRESENCE_KEYWORDS
+}
+
+
+def _find_document_type_pages(document_id: int, db: Session) -> Dict[str, Dict[int, None]]:
+    """
+    Find pages containing each document type's keywords in a single pass over the chunks.
+    
+    Returns:
+        Dictionary mapping document type to page numbers (dict keys, first-seen order)
+    """
+    pages_by_doc_type: Dict[str, Dict[int, None]] = {doc_type: {} for doc_type in _DOC_PRESENCE_QUERIES}
+    # Select only the needed columns (row tuples, no embedding vectors)
+    rows = db.query(DocumentChunk.page_number, DocumentChunk.chunk_text).filter(
+        DocumentChunk.document_id == document_id,
+        DocumentChunk.page_number.isnot(None)
+    ).all()
+    for page_number, chunk_text in rows:
+        if not chunk_text or not page_number:
+            continue
+        matched_keywords = {match.group(1) for match in _DOC_PRESENCE_KEYWORD_PATTERN.finditer(chunk_text.lower())}
+        for keyword in matched_keywords:
+            for doc_type in _DOC_PRESENCE_KEYWORD_TYPES[keyword]:
+                pages_by_doc_type[doc_type][page_number] = None
+    return pages_by_doc_type
+
+
 def detect_document_presence(
     vectordb: Any,
     page_doc_list: List[Any],
@@ -344,50 +447,15 @@ def detect_document_presence(
         Dictionary with document presence data for each document type
     """
     try:
-        # Map document types to search queries
-        doc_queries = {
-            'donor_log_in_information_packet': [
-                'donor log in', 'log-in packet', 'ascension number', 'log in information'
-            ],
-            'donor_information': [
-                'donor information', 'donor demographics', 'patient information', 'donor profile'
-            ],
-            'donor_risk_assessment_interview': [
-                'DRAI', 'donor risk assessment', 'risk assessment interview', 'donor risk interview'
-            ],
-            'medical_records_review_summary': [
-                'medical records review', 'MRR summary', 'review summary', 'medical review'
-            ],
-            'tissue_recovery_information': [
-                'tissue recovery', 'recovery information', 'tissues recovered', 'recovery procedures'
-            ],
-            'plasma_dilution': [
-                'plasma dilution', 'dilution factor', 'plasma volume', 'dilution calculation'
-            ],
-            'authorization_for_tissue_donation': [
-                'authorization', 'tissue donation authorization', 'consent form', 'donation authorization'
-            ],
-            'infectious_disease_testing': [
-                'infectious disease', 'serology', 'culture results', 'infectious disease testing'
-            ],
-            'medical_records': [
-                'medical records', 'patient records', 'clinical records', 'medical chart'
-            ]
-        }
-        
-        retriever = vectordb.as_retriever(search_type='similarity', search_kwargs={'k': 5})
+        # Run every document type's queries in one concurrent batch (failed queries are skipped)
+        all_queries = [query for queries in _DOC_PRESENCE_QUERIES.values() for query in queries]
+        chunks_by_query = dict(zip(all_queries, retrieve_for_queries(vectordb, all_queries, k=5, ignore_errors=True)))
         document_presence = {}
+        # Keyword pages for all document types, computed on first use
+        keyword_pages = None
         
-        for doc_type, queries in doc_queries.items():
-            found_chunks = []
-            
-            for query in queries:
-                try:
-                    chunks = retriever.invoke(query)
-                    found_chunks.extend(chunks)
-                except Exception as e:
-                    logger.debug(f"Error retrieving chunks for document type '{doc_type}', query '{query}': {e}")
-                    continue
+        for doc_type, queries in _DOC_PRESENCE_QUERIES.items():
+            found_chunks = [chunk for query in queries for chunk in chunks_by_query[query]]
             
             # Deduplicate
             seen = set()
@@ -398,26 +466,19 @@ def detect_document_presence(
                     seen.add(key)
                     unique_chunks.append(chunk)
             
-            # Extract pages
-            pages = []
+            # Extract pages (dict keys keep first-seen order without duplicates)
+            pages = {}
             for chunk in unique_chunks[:5]:  # Limit to top 5
                 page = chunk.metadata.get('page')
-                if page and page not in pages:
-                    pages.append(page)
+                if page:
+                    pages[page] = None
             
             # Also check database for page numbers
             if not pages:
-                chunks = db.query(DocumentChunk).filter(
-                    DocumentChunk.document_id == document_id,
-                    DocumentChunk.page_number.isnot(None)
-                ).all()
-                
                 # Check if any chunk text contains document type keywords
-                for chunk in chunks:
-                    chunk_text_lower = (chunk.chunk_text or '').lower()
-                    if any(keyword.lower() in chunk_text_lower for keyword in queries):
-                        if chunk.page_number and chunk.page_number not in pages:
-                            pages.append(chunk.page_number)
+                if keyword_pages is None:
+                    keyword_pages = _find_document_type_pages(document_id, db)
+                pages.update(keyword_pages[doc_type])
             
             # Special handling for infectious_disease_testing: also check for actual test results
             is_present = len(unique_chunks) > 0 or len(pages) > 0
@@ -430,17 +491,14 @@ def detect_document_presence(
                 if test_results:
                     # If we have test results, mark as present and extract page numbers from results
                     is_present = True
-                    result_pages = []
                     for result in test_results:
-                        if result.source_page and result.source_page not in result_pages:
-                            result_pages.append(result.source_page)
-                    if result_pages:
-                        pages.extend(result_pages)
+                        if result.source_page:
+                            pages[result.source_page] = None
                     logger.info(f"Found {len(test_results)} test results for document {document_id}, marking infectious_disease_testing as present")
             
             document_presence[doc_type] = {
                 'present': is_present,
-                'pages': [{'document_id': document_id, 'page': p} for p in sorted(set(pages))],
+                'pages': [{'document_id': document_id, 'page': p} for p in sorted(pages)],
                 'summary': {},
                 'extracted_data': {},
                 'confidence': min(len(unique_chunks) * 10.0, 100.0) if unique_chunks else 0.0
@@ -453,6 +511,23 @@ def detect_document_presence(
         return {}
 
 
+# Simple medical records patterns (bullet points, numbered lists, or "Label:" lines)
+_DIAGNOSIS_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE | re.MULTILINE) for pattern in (
+    r'diagnos(?:is|es)[:\s]+(?:.*?\n)?(?:[-•*]\s*)?([^\n]+)',
+    r'diagnos(?:is|es)[:\s]+(?:.*?\n)?(?:[0-9]+\.\s*)?([^\n]+)'
+))
+_PROCEDURE_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE | re.MULTILINE) for pattern in (
+    r'procedures?[:\s]+(?:.*?\n)?(?:[-•*]\s*)?([^\n]+)',
+    r'procedures?[:\s]+(?:.*?\n)?(?:[0-9]+\.\s*)?([^\n]+)',
+    r'surger(?:y|ies)[:\s]+(?:.*?\n)?(?:[-•*]\s*)?([^\n]+)'
+))
+_MEDICATION_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE | re.MULTILINE) for pattern in (
+    r'medications?[:\s]+(?:.*?\n)?(?:[-•*]\s*)?([^\n]+)',
+    r'medications?[:\s]+(?:.*?\n)?(?:[0-9]+\.\s*)?([^\n]+)',
+    r'drugs?[:\s]+(?:.*?\n)?(?:[-•*]\s*)?([^\n]+)'
+))
+
+
 def extract_simple_medical_records(vectordb: Any, page_doc_list: List[Any]) -> Optional[Dict[str, Any]]:
     """
     Extract simple medical records data using semantic search + pattern matching.
@@ -469,17 +544,12 @@ def extract_simple_medical_records(vectordb: Any, page_doc_list: List[Any]) -> O
             "medications drugs prescriptions"
         ]
         
-        # Retrieve relevant chunks
-        all_chunks = []
-        retriever = vectordb.as_retriever(search_type='similarity', search_kwargs={'k': 10})
-        
-        for query in queries:
-            try:
-                chunks = retriever.invoke(query)
-                all_chunks.extend(chunks)
-            except Exception as e:
-                logger.debug(f"Error retrieving chunks for query '{query}': {e}")
-                continue
+        # Retrieve relevant chunks (queries run concurrently; failed queries are skipped)
+        all_chunks = [
+            chunk
+            for chunks in retrieve_for_queries(vectordb, queries, k=10, ignore_errors=True)
+            for chunk in chunks
+        ]
         
         # Deduplicate
         seen = set()
@@ -494,7 +564,7 @@ def extract_simple_medical_records(vectordb: Any, page_doc_list: List[Any]) -> O
             return None
         
         # Combine text
-        text = " ".join([chunk.page_content for chunk in unique_chunks])
+        text = " ".join(chunk.page_content for chunk in unique_chunks)
         
         medical_records = {
             'Diagnoses': [],
@@ -503,38 +573,24 @@ def extract_simple_medical_records(vectordb: Any, page_doc_list: List[Any]) -> O
         }
         
         # Extract diagnoses (look for bullet points, numbered lists, or "Diagnosis:" patterns)
-        diagnosis_patterns = [
-            r'diagnos(?:is|es)[:\s]+(?:.*?\n)?(?:[-•*]\s*)?([^\n]+)',
-            r'diagnos(?:is|es)[:\s]+(?:.*?\n)?(?:[0-9]+\.\s*)?([^\n]+)'
-        ]
-        for pattern in diagnosis_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE | re.MULTILINE)
+        for pattern in _DIAGNOSIS_PATTERNS:
+            matches = pattern.finditer(text)
             for match in matches:
                 diagnosis = match.group(1).strip()
                 if diagnosis and len(diagnosis) > 3 and diagnosis not in medical_records['Diagnoses']:
                     medical_records['Diagnoses'].append(diagnosis)
         
         # Extract procedures
-        procedure_patterns = [
-            r'procedures?[:\s]+(?:.*?\n)?(?:[-•*]\s*)?([^\n]+)',
-            r'procedures?[:\s]+(?:.*?\n)?(?:[0-9]+\.\s*)?([^\n]+)',
-            r'surger(?:y|ies)[:\s]+(?:.*?\n)?(?:[-•*]\s*)?([^\n]+)'
-        ]
-        for pattern in procedure_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE | re.MULTILINE)
+        for pattern in _PROCEDURE_PATTERNS:
+            matches = pattern.finditer(text)
             for match in matches:
                 procedure = match.group(1).strip()
                 if procedure and len(procedure) > 3 and procedure not in medical_records['Procedures']:
                     medical_records['Procedures'].append(procedure)
         
         # Extract medications
-        medication_patterns = [
-            r'medications?[:\s]+(?:.*?\n)?(?:[-•*]\s*)?([^\n]+)',
-            r'medications?[:\s]+(?:.*?\n)?(?:[0-9]+\.\s*)?([^\n]+)',
-            r'drugs?[:\s]+(?:.*?\n)?(?:[-•*]\s*)?([^\n]+)'
-        ]
-        for pattern in medication_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE | re.MULTILINE)
+        for pattern in _MEDICATION_PATTERNS:
+            matches = pattern.finditer(text)
             for match in matches:
                 medication = match.group(1).strip()
                 if medication and len(medication) > 3 and medication not in medical_records['Medications']:
@@ -558,6 +614,13 @@ def extract_simple_medical_records(vectordb: Any, page_doc_list: List[Any]) -> O
         return None
 
 
+# "Test Name: value (reference range)"
+_CRITICAL_LAB_PATTERN = re.compile(
+    r'([A-Za-z\s]+(?:glucose|creatinine|BUN|sodium|potassium|hemoglobin|hematocrit|WBC|platelet))[:\s]+([0-9.]+)\s*(?:\(([^)]+)\)|\[([^\]]+)\]|reference[:\s]+([^\n,]+))?',
+    re.IGNORECASE
+)
+
+
 def extract_critical_lab_values(vectordb: Any, page_doc_list: List[Any]) -> Dict[str, Any]:
     """
     Extract critical lab values using semantic search + pattern matching.
@@ -573,17 +636,12 @@ def extract_critical_lab_values(vectordb: Any, page_doc_list: List[Any]) -> Dict
             "abnormal laboratory results critical values"
         ]
         
-        # Retrieve relevant chunks
-        all_chunks = []
-        retriever = vectordb.as_retriever(search_type='similarity', search_kwargs={'k': 10})
-        
-        for query in queries:
-            try:
-                chunks = retriever.invoke(query)
-                all_chunks.extend(chunks)
-            except Exception as e:
-                logger.debug(f"Error retrieving chunks for query '{query}': {e}")
-                continue
+        # Retrieve relevant chunks (queries run concurrently; failed queries are skipped)
+        all_chunks = [
+            chunk
+            for chunks in retrieve_for_queries(vectordb, queries, k=10, ignore_errors=True)
+            for chunk in chunks
+        ]
         
         # Deduplicate
         seen = set()
@@ -598,14 +656,12 @@ def extract_critical_lab_values(vectordb: Any, page_doc_list: List[Any]) -> Dict
             return {}
         
         # Combine text
-        text = " ".join([chunk.page_content for chunk in unique_chunks])
+        text = " ".join(chunk.page_content for chunk in unique_chunks)
         
         critical_values = {}
         
         # Pattern: "Test Name: value (reference range)"
-        lab_pattern = r'([A-Za-z\s]+(?:glucose|creatinine|BUN|sodium|potassium|hemoglobin|hematocrit|WBC|platelet))[:\s]+([0-9.]+)\s*(?:\(([^)]+)\)|\[([^\]]+)\]|reference[:\s]+([^\n,]+))?'
-        
-        matches = re.finditer(lab_pattern, text, re.IGNORECASE)
+        matches = _CRITICAL_LAB_PATTERN.finditer(text)
         for match in matches:
             test_name = match.group(1).strip()
             value = match.group(2).strip()
@@ -0,0 +1,12 @@
+"""
+Shared pytest setup for the unit tests.
+
+The unit tests import app modules directly, so they need the repository root on
+sys.path and a DATABASE_URL for the engine created at import time (no
+connection is made).
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
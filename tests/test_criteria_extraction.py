@@ -0,0 +1,129 @@
+"""
+Unit tests for grouped criteria extraction.
+Usage: pytest tests/test_criteria_extraction.py
+"""
+import json
+from types import SimpleNamespace
+
+import pytest
+from langchain.schema import Document
+
+from app.services import criteria_extraction
+from app.services.processing.utils.llm_cache import llm_response_cache
+
+
+class FakeLLM:
+    """Deterministic LLM stand-in that replays canned responses in order."""
+
+    deployment_name = "test-deployment"
+    temperature = 0
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.prompts = []
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        return SimpleNamespace(content=self.responses.pop(0))
+
+
+class FakeSession:
+    def __init__(self):
+        self.added = []
+        self.committed = False
+
+    def add(self, row):
+        self.added.append(row)
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+
+CRITERIA = {
+    "Sepsis": {"required_data_points": ["sepsis_present", "blood_culture"]},
+}
+
+
+@pytest.fixture(autouse=True)
+def isolated_context(monkeypatch):
+    """Serve one fixed chunk as context and start each test with an empty LLM cache."""
+    page = Document(page_content="Blood culture negative. No signs of sepsis.", metadata={"page": 3})
+    monkeypatch.setattr(
+        criteria_extraction, "_retrieve_criterion_context",
+        lambda *args, **kwargs: ([page], [3])
+    )
+    llm_response_cache.clear()
+    yield
+    llm_response_cache.clear()
+
+
+def test_extract_criteria_batch_keeps_required_data_points():
+    llm = FakeLLM([json.dumps({
+        "Sepsis": {"sepsis_present": "No", "unexpected": "dropped"},
+    })])
+
+    results = criteria_extraction.extract_criteria_batch(list(CRITERIA.items()), [], None, llm)
+
+    assert results == {
+        "Sepsis": {"sepsis_present": "No", "blood_culture": None, "_source_pages": [3]},
+    }
+
+
+def test_extract_criteria_batch_omits_unanswered_criteria():
+    criteria = dict(CRITERIA, Malignancy={"required_data_points": ["cancer_history"]})
+    llm = FakeLLM([json.dumps({"Sepsis": {"sepsis_present": "No", "blood_culture": "Negative"}})])
+
+    results = criteria_extraction.extract_criteria_batch(list(criteria.items()), [], None, llm)
+
+    assert list(results) == ["Sepsis"]
+
+
+def test_extract_criteria_batch_does_not_cache_unparseable_response():
+    llm = FakeLLM([
+        "not json at all",
+        json.dumps({"Sepsis": {"sepsis_present": "No", "blood_culture": "Negative"}}),
+    ])
+
+    assert criteria_extraction.extract_criteria_batch(list(CRITERIA.items()), [], None, llm) == {}
+    assert "Sepsis" in criteria_extraction.extract_criteria_batch(list(CRITERIA.items()), [], None, llm)
+    assert len(llm.prompts) == 2
+
+
+def test_extract_criteria_batch_bypasses_cache_when_asked():
+    answer = json.dumps({"Sepsis": {"sepsis_present": "No", "blood_culture": "Negative"}})
+    llm = FakeLLM([answer, answer])
+
+    criteria_extraction.extract_criteria_batch(list(CRITERIA.items()), [], None, llm)
+    criteria_extraction.extract_criteria_batch(list(CRITERIA.items()), [], None, llm)
+    assert len(llm.prompts) == 1  # second call served from the cache
+
+    criteria_extraction.extract_criteria_batch(list(CRITERIA.items()), [], None, llm, use_cache=False)
+    assert len(llm.prompts) == 2
+
+
+def test_failed_group_is_retried_with_a_fresh_llm_call(monkeypatch):
+    monkeypatch.setattr(criteria_extraction, "load_acceptance_criteria_config", lambda: CRITERIA)
+    single_calls = []
+    monkeypatch.setattr(
+        criteria_extraction, "extract_single_criterion",
+        lambda **kwargs: single_calls.append(kwargs["criterion_name"])
+    )
+    # The first group response leaves the criterion out; the retry pass sends the
+    # identical prompt and must reach the LLM instead of replaying that response
+    llm = FakeLLM([
+        json.dumps({}),
+        json.dumps({"Sepsis": {"sepsis_present": "No", "blood_culture": "Negative"}}),
+    ])
+    db = FakeSession()
+
+    count = criteria_extraction.extract_criteria_data(1, 1, None, llm, db, [])
+
+    assert len(llm.prompts) == 2
+    assert llm.prompts[0] == llm.prompts[1]
+    assert single_calls == []
+    assert count == 1
+    assert db.committed
+    assert db.added[0].extracted_data["blood_culture"] == "Negative"
@@ -0,0 +1,151 @@
+"""
+Unit tests for the PDF processing and embedding helpers.
+Usage: pytest tests/test_helper_functions.py
+"""
+import faiss
+import fitz
+import numpy as np
+import pytest
+from langchain.schema import Document
+
+from app.services.processing.utils import helper_functions as h
+
+
+class FakeEmbeddings:
+    """Embeddings stand-in with a deterministic 4-d vector per text."""
+
+    deployment = "test-embeddings"
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts, chunk_size=None):
+        self.embedded.extend(texts)
+        return [[float(len(text)), float(text.count(" ")), 1.0, 0.0] for text in texts]
+
+
+@pytest.fixture
+def word_token_count(monkeypatch):
+    """Count tokens as words, since the tiktoken encoding can't be downloaded in tests."""
+    monkeypatch.setattr(h, "_token_count", lambda text: len(text.split()))
+    h._cached_token_count.cache_clear()
+    yield
+    h._cached_token_count.cache_clear()
+
+
+def _clustered_vectors(n_vectors, dimension=32, seed=0):
+    """Unit vectors grouped around topics, like chunk embeddings of one document."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(8, n_vectors // 50), dimension))
+    vectors = centers[rng.integers(0, len(centers), n_vectors)] + 0.5 * rng.standard_normal((n_vectors, dimension))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype('float32')
+
+
+def _recall_at_k(index, xb, k=5, n_queries=200):
+    exact = faiss.IndexFlatL2(xb.shape[1])
+    exact.add(xb)
+    rng = np.random.default_rng(1)
+    queries = (xb[rng.integers(0, len(xb), n_queries)] + 0.05 * rng.standard_normal((n_queries, xb.shape[1]))).astype('float32')
+    _, expected = exact.search(queries, k)
+    _, found = index.search(queries, k)
+    return np.mean([len(set(a) & set(b)) / k for a, b in zip(found, expected)])
+
+
+def test_small_documents_keep_exact_flat_index():
+    xb = _clustered_vectors(h.FAISS_IVF_MIN_VECTORS - 1)
+
+    index = h._build_faiss_index(xb)
+
+    assert type(index) is faiss.IndexFlatL2
+    assert index.ntotal == len(xb)
+    assert _recall_at_k(index, xb) == 1.0
+
+
+@pytest.mark.parametrize("n_vectors, index_type", [
+    (h.FAISS_IVF_MIN_VECTORS, faiss.IndexIVFScalarQuantizer),
+    (h.FAISS_HNSW_MIN_VECTORS, faiss.IndexHNSWSQ),
+])
+def test_approximate_indexes_keep_recall_against_flat(n_vectors, index_type):
+    xb = _clustered_vectors(n_vectors)
+
+    index = h._build_faiss_index(xb)
+
+    assert isinstance(index, index_type)
+    assert index.ntotal == n_vectors
+    assert _recall_at_k(index, xb) >= 0.95
+
+
+def test_embed_texts_cached_embeds_each_text_once(tmp_path):
+    embeddings = FakeEmbeddings()
+    texts = ["HIV non-reactive", "no growth", "HIV non-reactive"]
+
+    first = h.embed_texts_cached(texts, embeddings, cache_dir=str(tmp_path))
+    assert embeddings.embedded == ["HIV non-reactive", "no growth"]
+
+    # Another document sharing a chunk only embeds the new text
+    second = h.embed_texts_cached(["no growth", "HBsAg negative"], embeddings, cache_dir=str(tmp_path))
+
+    assert embeddings.embedded == ["HIV non-reactive", "no growth", "HBsAg negative"]
+    assert first.dtype == np.float32 and first.shape == (3, 4)
+    np.testing.assert_array_equal(first[0], first[2])
+    np.testing.assert_array_equal(second[0], first[1])
+    np.testing.assert_array_equal(second[1], [14.0, 1.0, 1.0, 0.0])
+
+
+def test_embed_texts_cached_without_cache_dir_embeds_everything():
+    embeddings = FakeEmbeddings()
+
+    matrix = h.embed_texts_cached(["a b", "a b"], embeddings)
+
+    assert embeddings.embedded == ["a b", "a b"]
+    assert matrix.shape == (2, 4)
+
+
+def _pdf(pages):
+    """In-memory PDF; each page is (text, with_image)."""
+    document = fitz.open()
+    for text, with_image in pages:
+        page = document.new_page()
+        if text:
+            page.insert_text((72, 72), text)
+        if with_image:
+            pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 8, 8), 0)
+            pixmap.clear_with(128)
+            page.insert_image(fitz.Rect(72, 100, 300, 400), pixmap=pixmap)
+    return fitz.open("pdf", document.tobytes())
+
+
+def test_looks_scanned_detects_image_only_pages():
+    assert h._looks_scanned(_pdf([("", True)] * 6))
+
+
+def test_looks_scanned_rejects_text_layers_and_text_only_pages():
+    text = "Serology results: HIV-1/HIV-2 antibody non-reactive, HBsAg non-reactive."
+    assert not h._looks_scanned(_pdf([(text, True)] * 6))
+    assert not h._looks_scanned(_pdf([("", True), ("", False)]))
+    assert not h._looks_scanned(fitz.open())
+
+
+def test_split_pages_keeps_short_pages_whole(word_token_count):
+    page = Document(page_content="  Blood culture: no growth.  ", metadata={"page": 2, "source": "a.pdf"})
+    blank = Document(page_content="   \n ", metadata={"page": 3})
+
+    chunks = list(h._split_pages([page, blank]))
+
+    assert [chunk.page_content for chunk in chunks] == ["Blood culture: no growth."]
+    assert chunks[0].metadata == page.metadata
+    assert chunks[0].metadata is not page.metadata
+
+
+def test_split_pages_splits_long_pages_with_page_metadata(word_token_count):
+    words = [f"word{i}" for i in range(h.CHUNK_SIZE_TOKENS * 2)]
+    page = Document(page_content=" ".join(words), metadata={"page": 7})
+
+    chunks = list(h._split_pages([page]))
+
+    assert len(chunks) >= 3
+    assert all(len(chunk.page_content.split()) <= h.CHUNK_SIZE_TOKENS for chunk in chunks)
+    assert all(chunk.metadata == {"page": 7} for chunk in chunks)
+    assert chunks[0].page_content.split()[0] == "word0"
+    assert chunks[-1].page_content.split()[-1] == words[-1]
@@ -0,0 +1,74 @@
+"""
+Unit tests for required lab test matching.
+Usage: pytest tests/test_lab_test_extraction.py
+"""
+import pytest
+
+from app.services.lab_test_extraction import (
+    _build_required_test_index,
+    _lab_keyword_pattern,
+    _match_required_test,
+    load_required_tests_config,
+    normalize_for_matching,
+)
+
+
+@pytest.fixture(scope="module")
+def serology_index():
+    required_tests = load_required_tests_config()['serology']['required_tests']
+    return _build_required_test_index(required_tests, normalize_for_matching)
+
+
+def _match(name, index):
+    return _match_required_test([normalize_for_matching(name)], index)
+
+
+@pytest.mark.parametrize("extracted_name, expected", [
+    ("HIV-1 NAT", "HIV-PCR"),
+    ("anti-HIV-1/2 Ab", "HIV-1/HIV-2"),
+    ("HIV", "HIV-1/HIV-2"),
+    ("HBsAg", "Hepatitis B Surface Antigen"),
+    ("Hepatitis B Surface Antigen (HBsAg)", "Hepatitis B Surface Antigen"),
+    ("HBc", "Hepatitis B Core Antibody"),
+    ("HBc Total", "Hepatitis B Core Antibody"),
+    ("HCV", "Hepatitis C Antibody"),
+    ("HCV NAT", "HCV-NAT"),
+])
+def test_ambiguous_serology_names(serology_index, extracted_name, expected):
+    assert _match(extracted_name, serology_index) == expected
+
+
+def test_unlisted_serology_names_are_not_required(serology_index):
+    # No configured name or alias is contained in (or contains) these
+    assert _match("HIV-1/2 Ab", serology_index) is None
+    assert _match("Lipid Panel", serology_index) is None
+
+
+def test_first_required_test_in_config_order_wins():
+    index = _build_required_test_index(
+        [
+            {"test_name": "HIV-1/HIV-2", "aliases": ["HIV"]},
+            {"test_name": "HIV-PCR", "aliases": ["HIV PCR"]},
+        ],
+        normalize_for_matching
+    )
+
+    # "HIV PCR" is an exact alias of the second test, but contains the first test's alias
+    assert _match("HIV PCR", index) == "HIV-1/HIV-2"
+
+
+def test_empty_candidates_match_nothing(serology_index):
+    assert _match_required_test(["", normalize_for_matching("---")], serology_index) is None
+
+
+
+@pytest.mark.parametrize("section", ["serology", "culture"])
+def test_keyword_pattern_matches_every_configured_test_name(section):
+    pattern = _lab_keyword_pattern()
+    for required_test in load_required_tests_config()[section]['required_tests']:
+        for name in [required_test['test_name']] + required_test.get('aliases', []):
+            assert pattern.search(f"Page 2: {name}: see report"), name
+
+
+def test_keyword_pattern_skips_chunks_without_lab_content():
+    assert _lab_keyword_pattern().search("Patient ambulated in hallway, vitals stable") is None
@@ -0,0 +1,76 @@
+"""
+Unit tests for the in-process LLM response cache.
+Usage: pytest tests/test_llm_cache.py
+"""
+from types import SimpleNamespace
+
+from app.services.processing.utils import llm_cache
+from app.services.processing.utils.llm_cache import LLMResponseCache
+
+
+def test_get_returns_stored_value_and_counts_hits_and_misses():
+    cache = LLMResponseCache(max_entries=4, ttl_seconds=60)
+
+    assert cache.get("key") is None
+    cache.set("key", "response")
+
+    assert cache.get("key") == "response"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted_when_full():
+    cache = LLMResponseCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "b" is now the least recently used
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "monotonic", lambda: now[0])
+    cache = LLMResponseCache(max_entries=4, ttl_seconds=60)
+    cache.set("key", "response")
+
+    now[0] += 60
+    assert cache.get("key") == "response"
+
+    now[0] += 1
+    assert cache.get("key") is None
+    assert cache.get("key") is None  # expired entry was dropped
+    assert cache.misses == 2
+
+
+def test_zero_ttl_never_expires(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(llm_cache.time, "monotonic", lambda: now[0])
+    cache = LLMResponseCache(max_entries=4, ttl_seconds=0)
+    cache.set("key", "response")
+
+    now[0] += 10 ** 6
+
+    assert cache.get("key") == "response"
+
+
+def test_clear_drops_all_entries():
+    cache = LLMResponseCache()
+    cache.set("key", "response")
+
+    cache.clear()
+
+    assert cache.get("key") is None
+
+
+def test_make_key_covers_model_temperature_and_prompt():
+    llm = SimpleNamespace(deployment_name="gpt-4o", temperature=0)
+    key = LLMResponseCache.make_key(llm, "prompt")
+
+    assert key == LLMResponseCache.make_key(SimpleNamespace(deployment_name="gpt-4o", temperature=0), "prompt")
+    assert key != LLMResponseCache.make_key(SimpleNamespace(deployment_name="gpt-4o-mini", temperature=0), "prompt")
+    assert key != LLMResponseCache.make_key(SimpleNamespace(deployment_name="gpt-4o", temperature=0.5), "prompt")
+    assert key != LLMResponseCache.make_key(llm, "other prompt")
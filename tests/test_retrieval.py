@@ -0,0 +1,157 @@
+"""
+Unit tests for the shared vector store retrieval helpers.
+Usage: pytest tests/test_retrieval.py
+"""
+import pytest
+from langchain.schema import Document
+
+from app.services.processing.utils import retrieval
+
+
+class FakeEmbeddings:
+    """Embeddings stand-in that records every API-style call."""
+
+    deployment = "test-embeddings"
+
+    def __init__(self):
+        self.query_calls = []
+        self.batch_calls = []
+
+    def embed_query(self, text):
+        self.query_calls.append(text)
+        return [float(len(text))]
+
+    def embed_documents(self, texts, chunk_size=None):
+        self.batch_calls.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+
+class FakeVectorStore:
+    """Vector store stand-in returning one document per page for any vector."""
+
+    def __init__(self, docs):
+        self.embedding_function = FakeEmbeddings()
+        self.docs = docs
+        self.searches = []
+
+    def similarity_search_by_vector(self, vector, k=4):
+        self.searches.append((vector, k))
+        return self.docs[:k]
+
+
+@pytest.fixture(autouse=True)
+def empty_caches(monkeypatch):
+    monkeypatch.setattr(retrieval, "_query_embedding_cache", type(retrieval._query_embedding_cache)())
+    monkeypatch.setattr(retrieval, "_prefetched_query_keys", set())
+    monkeypatch.setattr(retrieval, "_cache_stats", {'result_hits': 0, 'embedding_hits': 0, 'embedding_misses': 0})
+
+
+def _page_docs(count):
+    return [Document(page_content=f"page {page} text", metadata={"page": page}) for page in range(1, count + 1)]
+
+
+def test_prefetched_queries_are_counted_once_as_misses():
+    vectordb = FakeVectorStore(_page_docs(3))
+
+    retrieval.retrieve_for_queries(vectordb, ["hiv", "hepatitis b", "syphilis"], k=2)
+
+    assert len(vectordb.embedding_function.batch_calls) == 1
+    assert vectordb.embedding_function.query_calls == []
+    assert retrieval.get_retrieval_cache_stats() == {'result_hits': 0, 'embedding_hits': 0, 'embedding_misses': 3}
+
+
+def test_warm_query_embeddings_count_as_hits():
+    queries = ["hiv", "hepatitis b"]
+    retrieval.retrieve_for_queries(FakeVectorStore(_page_docs(3)), queries, k=2)
+
+    # A new document's store has no cached results, but the query vectors are reused
+    second_store = FakeVectorStore(_page_docs(3))
+    retrieval.retrieve_for_queries(second_store, queries, k=2)
+
+    assert second_store.embedding_function.batch_calls == []
+    assert retrieval.get_retrieval_cache_stats() == {'result_hits': 0, 'embedding_hits': 2, 'embedding_misses': 2}
+
+
+def test_dedupe_documents_drops_repeats_and_contained_chunks():
+    page = Document(page_content="HIV-1/HIV-2 Antibody: Non-reactive. HBsAg: Non-reactive.", metadata={"page": 4})
+    repeat = Document(page_content=page.page_content, metadata={"page": 4})
+    contained = Document(page_content="HBsAg:   Non-reactive.", metadata={"page": 5})
+    other = Document(page_content="Blood culture: no growth", metadata={"page": 6})
+
+    assert retrieval.dedupe_documents([page, repeat, contained, other]) == [page, other]
+
+
+def test_dedupe_documents_respects_limit_and_already_included():
+    docs = _page_docs(4)
+    full_page = Document(page_content="Header\npage 1 text\nFooter", metadata={"page": 1})
+
+    assert retrieval.dedupe_documents(docs, limit=2) == docs[:2]
+    assert retrieval.dedupe_documents(docs, limit=2, already_included=[full_page]) == docs[1:3]
+
+
+def test_cached_retrieve_reuses_results_per_vector_store():
+    vectordb = FakeVectorStore(_page_docs(5))
+
+    first = retrieval.cached_retrieve(vectordb, "hiv", k=3)
+    second = retrieval.cached_retrieve(vectordb, "hiv", k=3)
+
+    assert second == first
+    assert second is not first  # callers get their own list
+    assert len(vectordb.searches) == 1
+    assert retrieval.get_retrieval_cache_stats()['result_hits'] == 1
+
+
+def test_cached_retrieve_answers_smaller_k_from_larger_result():
+    vectordb = FakeVectorStore(_page_docs(5))
+    retrieval.cached_retrieve(vectordb, "hiv", k=4)
+
+    assert retrieval.cached_retrieve(vectordb, "hiv", k=2) == vectordb.docs[:2]
+    assert len(vectordb.searches) == 1
+
+    assert retrieval.cached_retrieve(vectordb, "hiv", k=5) == vectordb.docs[:5]
+    assert len(vectordb.searches) == 2
+
+
+def test_cached_retrieve_without_weakref_support_searches_every_time():
+    class SlottedStore:
+        __slots__ = ('embedding_function', 'docs', 'searches')
+        __init__ = FakeVectorStore.__init__
+        similarity_search_by_vector = FakeVectorStore.similarity_search_by_vector
+
+    vectordb = SlottedStore(_page_docs(2))
+
+    retrieval.cached_retrieve(vectordb, "hiv", k=1)
+    retrieval.cached_retrieve(vectordb, "hiv", k=1)
+
+    assert len(vectordb.searches) == 2
+    assert vectordb.embedding_function.query_calls == ["hiv"]  # query vector still cached
+
+
+def test_prefetch_embeds_only_uncached_queries_in_one_request():
+    vectordb = FakeVectorStore([])
+    retrieval._embed_query_cached(vectordb, "hiv")
+
+    retrieval._prefetch_query_embeddings(vectordb, ["hiv", "hepatitis b", "syphilis", "syphilis"])
+
+    assert vectordb.embedding_function.batch_calls == [["hepatitis b", "syphilis"]]
+
+
+def test_prefetch_leaves_a_single_missing_query_to_the_search():
+    vectordb = FakeVectorStore([])
+
+    retrieval._prefetch_query_embeddings(vectordb, ["hiv"])
+
+    assert vectordb.embedding_function.batch_calls == []
+
+
+def test_prefetch_failure_falls_back_to_individual_embedding():
+    vectordb = FakeVectorStore(_page_docs(2))
+
+    def failing_batch(texts, chunk_size=None):
+        raise RuntimeError("embeddings API unavailable")
+
+    vectordb.embedding_function.embed_documents = failing_batch
+    results = retrieval.retrieve_for_queries(vectordb, ["hiv", "hepatitis b"], k=1)
+
+    assert [len(docs) for docs in results] == [1, 1]
+    assert sorted(vectordb.embedding_function.query_calls) == ["hepatitis b", "hiv"]